@@ -762,6 +762,8 @@ try:
                 redis_config['host'] = config.get('Redis', 'host')
             if config.has_option('Redis', 'port'):
                 redis_config['port'] = config.getint('Redis', 'port')
+            if config.has_option('Redis', 'unix_socket_path'):
+                redis_config['unix_socket_path'] = config.get('Redis', 'unix_socket_path')
             if config.has_option('Redis', 'db'):
                 redis_config['db'] = config.getint('Redis', 'db')
             if config.has_option('Redis', 'password'):
@@ -770,6 +772,20 @@ try:
                 redis_config['socket_timeout'] = config.getfloat('Redis', 'socket_timeout')
             if config.has_option('Redis', 'socket_connect_timeout'):
                 redis_config['socket_connect_timeout'] = config.getfloat('Redis', 'socket_connect_timeout')
+            if config.has_option('Redis', 'max_retries'):
+                redis_config['max_retries'] = config.getint('Redis', 'max_retries')
+            if config.has_option('Redis', 'backoff_base'):
+                redis_config['backoff_base'] = config.getfloat('Redis', 'backoff_base')
+            if config.has_option('Redis', 'backoff_cap'):
+                redis_config['backoff_cap'] = config.getfloat('Redis', 'backoff_cap')
+            if config.has_option('Redis', 'max_connections'):
+                redis_config['max_connections'] = config.getint('Redis', 'max_connections')
+            if config.has_option('Redis', 'pool_timeout'):
+                redis_config['pool_timeout'] = config.getfloat('Redis', 'pool_timeout')
+            if config.has_option('Redis', 'socket_keepalive'):
+                redis_config['socket_keepalive'] = config.getboolean('Redis', 'socket_keepalive')
+            if config.has_option('Redis', 'client_name'):
+                redis_config['client_name'] = config.get('Redis', 'client_name')
         
         # Create Redis client with configuration
         r = create_redis_client(redis_config)
@@ -907,4 +923,6 @@ try:
 except Exception as e:
     _log.exception("an error has occurred: %s", e)
 finally:
-    _log.debug("finally")
\ No newline at end of file
+    _log.debug("finally")
+    if r is not None:
+        r.close()
\ No newline at end of file
@@ -11,6 +11,7 @@ import datetime
 import socket
 from typing import Any, Dict, List, Optional, Set, Tuple, Union, TypeVar, Callable, cast, Type, Sequence, IO
 import json
+import re
 from datetime import datetime, timedelta
 
 # monkeypatch to avoid a really slow getfqdn call
@@ -61,6 +62,9 @@ API_VERSIONS = {
 # Default API version for backward compatibility
 DEFAULT_API_VERSION = 'v1'
 
+# Version requested by an Accept header like application/vnd.bacmon.v2+json
+ACCEPT_VERSION_RE = re.compile(r'application/vnd\.bacmon\.v(\d+)')
+
 # some debugging
 _debug = 0
 _log = ModuleLogger(globals())
@@ -627,7 +631,7 @@ def auth_info() -> Dict[str, Any]:
             auth_status.update({
                 'authenticated': True,
                 'user_id': session_data['user_id'],
-                'permissions': session_data['permissions'],
+                'permissions': sorted(session_data['permissions']),
                 'auth_type': 'session'
             })
     
@@ -638,7 +642,7 @@ def auth_info() -> Dict[str, Any]:
         if key_data:
             auth_status.update({
                 'authenticated': True,
-                'permissions': key_data['permissions'],
+                'permissions': sorted(key_data['permissions']),
                 'auth_type': 'api_key',
                 'key_name': key_data['name']
             })
@@ -2312,46 +2316,27 @@ def api_extended_metrics():
         
         # Safely get Redis client and execute operation
         def get_metrics_operation():
+            import metrics
             redis_client = get_redis_client()
             
             # Build Redis key
             redis_key = f"{key}:{metric_type}:{interval}"
             
             # Get time series data
-            raw_data = redis_client.lrange(redis_key, 0, limit)
-            return raw_data, redis_key
+            samples = metrics.get_metric_manager(redis_client).get_samples(key, metric_type, interval, limit + 1)
+            return samples, redis_key
         
-        success, (raw_data, redis_key), error_msg, error_code = safe_redis_operation(
+        success, (samples, redis_key), error_msg, error_code = safe_redis_operation(
             get_metrics_operation, "extended metrics retrieval"
         )
         if not success:
             return create_api_response(error=error_msg, code=500, error_code=error_code)
         
         # Process the data
-        time_series = []
-        for item in raw_data:
-            try:
-                # Parse the sample
-                item_data = eval(item.decode('utf-8') if isinstance(item, bytes) else item)
-                timestamp = item_data[0]
-                
-                # Handle different value formats
-                value = item_data[1]
-                if isinstance(value, str) and (value.startswith('{') or value.startswith('[')):
-                    # Try to parse JSON
-                    try:
-                        import json
-                        value = json.loads(value)
-                    except json.JSONDecodeError:
-                        pass
-                
-                time_series.append({
-                    'timestamp': timestamp,
-                    'value': value
-                })
-            except Exception as e:
-                logger.error(f"Error processing metric data: {e}")
-                continue
+        time_series = [
+            {'timestamp': timestamp, 'value': value}
+            for timestamp, value in samples
+        ]
         
         # Sort by timestamp (newest first)
         time_series.sort(key=lambda x: x['timestamp'], reverse=True)
@@ -2430,18 +2415,11 @@ def api_metrics(key: str) -> Dict[str, Any]:
             # Get current value
             current_value = metrics_manager.get_metric_value(key, metric_type)
             
-            # Get time series data
-            samples = []
-            raw_samples = r.lrange(f"{key}:{metric_type}:s", 0, 50)  # Get last 50 samples
-            if raw_samples:
-                for sample in raw_samples:
-                    try:
-                        timestamp, value = eval(sample.decode('utf-8'))
-                        samples.append([timestamp, json.loads(value) if isinstance(value, str) else value])
-                    except Exception as e:
-                        if _debug: _log.debug("Error parsing sample: %s", e)
-                
-                samples.reverse()  # Most recent first
+            # Get time series data (last 50 samples, oldest first)
+            samples = [
+                [timestamp, value]
+                for timestamp, value in metrics_manager.get_samples(key, metric_type, 's', 50)
+            ]
             
             # Add to response
             response_data[metric_type] = {
@@ -2765,9 +2743,7 @@ def get_api_version_from_request() -> str:
     # Check Accept header for version preference
     accept_header = bottle.request.environ.get('HTTP_ACCEPT', '')
     if 'application/vnd.bacmon.v' in accept_header:
-        # Extract version from Accept header like application/vnd.bacmon.v2+json
-        import re
-        match = re.search(r'application/vnd\.bacmon\.v(\d+)', accept_header)
+        match = ACCEPT_VERSION_RE.search(accept_header)
         if match:
             version = f'v{match.group(1)}'
             if version in API_VERSIONS:
@@ -885,6 +885,26 @@ class RedisOptimizationValidator(SectionValidator):
             IntegerValidator("min_compression_size", min_value=50, max_value=10000, default=100)
         )
         
+        self.add_field_validator(
+            "zstd_level",
+            IntegerValidator("zstd_level", min_value=1, max_value=22, default=3)
+        )
+        
+        self.add_field_validator(
+            "time_series_block_size",
+            IntegerValidator("time_series_block_size", min_value=1, max_value=4096, default=1)
+        )
+        
+        self.add_field_validator(
+            "time_series_storage",
+            StringValidator("time_series_storage", pattern=r"^(list|stream)$", default="list")
+        )
+        
+        self.add_field_validator(
+            "time_series_write_behind",
+            BooleanValidator("time_series_write_behind", default=False)
+        )
+        
         # Cleanup settings
         self.add_field_validator(
             "auto_cleanup_enabled",
@@ -896,6 +916,11 @@ class RedisOptimizationValidator(SectionValidator):
             IntegerValidator("cleanup_interval_seconds", min_value=300, max_value=86400, default=3600)
         )
         
+        self.add_field_validator(
+            "cleanup_workers",
+            IntegerValidator("cleanup_workers", min_value=1, max_value=64, default=8)
+        )
+        
         # Memory management
         self.add_field_validator(
             "max_memory_usage_mb",
@@ -937,11 +962,11 @@ class RetentionPolicyValidator(Validator):
             return False, f"Expected string but got {type(value).__name__}"
         
         try:
-            # Expected format: "pattern, duration_hours, resolution_seconds, aggregation_func"
+            # Expected format: "pattern, duration_hours, resolution_seconds, aggregation_func[, policy_type]"
             parts = [part.strip().strip('"') for part in value.split(',')]
             
-            if len(parts) != 4:
-                return False, f"Invalid format. Expected 'pattern, duration_hours, resolution_seconds, aggregation_func' but got '{value}'"
+            if len(parts) not in (4, 5):
+                return False, f"Invalid format. Expected 'pattern, duration_hours, resolution_seconds, aggregation_func[, policy_type]' but got '{value}'"
             
             # Validate pattern
             pattern = parts[0]
@@ -964,6 +989,14 @@ class RetentionPolicyValidator(Validator):
             if aggregation_func not in valid_funcs:
                 return False, f"Invalid aggregation function '{aggregation_func}'. Valid options: {', '.join(valid_funcs)}"
             
+            # Validate policy type, binary ladders aggregate their own results again
+            policy_type = parts[4] if len(parts) == 5 else 'window'
+            if policy_type not in ('window', 'binary_ladder'):
+                return False, f"Invalid policy type '{policy_type}'. Valid options: window, binary_ladder"
+            ladder_funcs = ['sum', 'min', 'max', 'first', 'last']
+            if policy_type == 'binary_ladder' and aggregation_func not in ladder_funcs:
+                return False, f"Invalid aggregation function '{aggregation_func}' for binary_ladder. Valid options: {', '.join(ladder_funcs)}"
+            
             return True, "Valid"
             
         except ValueError as e:
@@ -70,10 +70,7 @@ class EnhancedCountInterval(OriginalCountInterval):
         self.metrics_manager = metrics.get_metric_manager()
         
         # Register metric processors for this key
-        self.metrics_manager.add_processor(key, metrics.CountMetricProcessor())
-        self.metrics_manager.add_processor(key, metrics.SizeMetricProcessor())
-        self.metrics_manager.add_processor(key, metrics.ProtocolMetricProcessor())
-        self.metrics_manager.add_processor(key, metrics.ErrorRateMetricProcessor())
+        self.metrics_manager.add_standard_processors(key)
         
         # For specific message types, add response time and connection processors
         if "request" in key.lower() or "ack" in key.lower():
@@ -202,18 +199,13 @@ class EnhancedSampleRateTask(OriginalSampleRateTask):
         # Use default metric type if not specified
         metric_type = metric_type or self.metric_type
         
-        # Create Redis key
-        redis_key = f"{self.key}:{metric_type}:s"  # Use seconds samples
-        
-        # Get samples from Redis
-        samples = r.lrange(redis_key, 0, 1000)
+        # Get seconds samples from Redis, oldest first
+        samples = metrics.get_metric_manager(r).get_samples(
+            self.key, metric_type, 's', MetricManager.SAMPLES_RETAINED
+        )
         
         # Process samples
         if samples:
-            # Reverse and parse the samples
-            samples.reverse()
-            samples = [eval(s) for s in samples]
-            
             # Yield samples within the requested time range
             nt = st
             for t, v in samples:
@@ -19,13 +19,30 @@ providing more sophisticated metric collection capabilities.
 """
 
 import logging
+import math
+import sys
 import time
-import statistics
-from typing import Dict, List, Tuple, Any, Optional, Set, Union, DefaultDict
-from collections import defaultdict, deque
+from typing import Dict, List, Tuple, Any, Optional, Set, Union, DefaultDict, Callable, Sequence
+from collections import defaultdict, deque, OrderedDict
+from dataclasses import dataclass, field
 import json
 import redis
 import struct
+import numpy as np
+
+from metrics_kernel import SummaryT, summarize_batch
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -35,6 +52,63 @@ logger = logging.getLogger(__name__)
 MetricValueT = Union[int, float, Dict[str, Union[int, float]]]
 MetricSampleT = Tuple[int, MetricValueT]  # (timestamp, value) pairs
 TimeSeriesT = List[MetricSampleT]  # List of samples
+ScalarsT = List[Tuple[str, float]]  # (field suffix, value) pairs for time series storage
+PacketHandlerT = Callable[[Dict[str, Any]], None]  # Function processing a packet
+
+
+def _flatten_value(value: Any, prefix: str = "") -> ScalarsT:
+    """
+    Flatten a (possibly nested) metric value into scalar pairs.
+    
+    Nested dictionary fields are joined into dotted suffixes and fields
+    without a numeric value are skipped, since a time series sample can
+    only hold a number.
+    
+    Args:
+        value: Metric value to flatten
+        prefix: Suffix of the enclosing field
+        
+    Returns:
+        List of (suffix, value) pairs
+    """
+    if isinstance(value, dict):
+        scalars: ScalarsT = []
+        for field, field_value in value.items():
+            field_prefix = f"{prefix}.{field}" if prefix else str(field)
+            scalars.extend(_flatten_value(field_value, field_prefix))
+        return scalars
+    if isinstance(value, (int, float)):
+        return [(prefix or "value", float(value))]
+    return []
+
+
+def _unflatten_value(scalars: Dict[str, float]) -> MetricValueT:
+    """
+    Rebuild a metric value from scalar pairs produced by _flatten_value.
+    
+    Args:
+        scalars: Mapping of dotted suffix to value
+        
+    Returns:
+        The rebuilt metric value
+    """
+    # Time series hold doubles, restore integral values as ints
+    scalars = {
+        suffix: int(scalar) if float(scalar).is_integer() else scalar
+        for suffix, scalar in scalars.items()
+    }
+    if set(scalars) == {"value"}:
+        return scalars["value"]
+        
+    result: Dict[str, Any] = {}
+    for suffix, scalar in scalars.items():
+        node = result
+        *parents, leaf = suffix.split(".")
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[leaf] = scalar
+    return result
+
 
 class MetricType:
     """Enumeration of supported metric types."""
@@ -46,9 +120,266 @@ class MetricType:
     CONNECTION = "connection"           # Connection metrics (new, duration)
     SERVICE = "service"                 # Service-specific metrics
 
+# Maximum number of distinct protocols counted, once all ids are taken
+# further protocols are counted as OTHER_PROTOCOL
+MAX_PROTOCOLS = 256
+OTHER_PROTOCOL = "other"
+
+# Column types of packet batches, sizes take 32 bits so that no captured
+# frame overflows them, protocol ids fit in a byte and response times need
+# no double precision
+SIZE_DTYPE = np.uint32
+PROTOCOL_ID_DTYPE = np.uint8
+RESPONSE_TIME_DTYPE = np.float32
+
+# Protocol names indexed by protocol id, shared by all processors so that
+# packets are counted by small integer ids instead of strings
+_protocol_names: List[str] = [OTHER_PROTOCOL]
+_protocol_ids: Dict[str, int] = {OTHER_PROTOCOL: 0}
+
+def protocol_id(protocol: str) -> int:
+    """
+    Get the id of a protocol, registering it on first use.
+    
+    Args:
+        protocol: Protocol name
+        
+    Returns:
+        The protocol id
+    """
+    pid = _protocol_ids.get(protocol)
+    if pid is None:
+        if len(_protocol_names) >= MAX_PROTOCOLS:
+            return _protocol_ids[OTHER_PROTOCOL]
+        protocol = sys.intern(protocol)
+        pid = _protocol_ids[protocol] = len(_protocol_names)
+        _protocol_names.append(protocol)
+    return pid
+
+
+@dataclass
+class PacketBatch:
+    """
+    A batch of packets in columnar form, one array entry per packet.
+    
+    Sizes and protocols are optional, packets without one are flagged in
+    has_size or has_protocol and left out of its statistics, the flags are
+    None when every packet has one. Response times are optional and NaN
+    for packets without one. The packet dictionaries the batch was built
+    from are kept for the processors without a vectorized update.
+    """
+    sizes: np.ndarray                            # Packet sizes, 0 if none
+    errors: np.ndarray                           # Error flags
+    protocol_ids: np.ndarray                     # Ids from protocol_id(), 0 if none
+    response_times: Optional[np.ndarray] = None  # Response times, NaN if none
+    has_size: Optional[np.ndarray] = None        # Size flags, None if all set
+    has_protocol: Optional[np.ndarray] = None    # Protocol flags, None if all set
+    packets: Optional[Sequence[Dict[str, Any]]] = None  # Source packets, if any
+    _summary: Optional[SummaryT] = field(default=None, init=False, repr=False, compare=False)
+    
+    def __len__(self) -> int:
+        return len(self.sizes)
+        
+    @property
+    def size_count(self) -> int:
+        """Number of packets with a size."""
+        return len(self) if self.has_size is None else int(np.count_nonzero(self.has_size))
+        
+    @property
+    def protocol_count(self) -> int:
+        """Number of packets with a protocol."""
+        return len(self) if self.has_protocol is None else int(np.count_nonzero(self.has_protocol))
+        
+    def summary(self) -> SummaryT:
+        """
+        Get the size, error and protocol statistics of the batch.
+        
+        The statistics are computed in one pass on first use and shared by
+        all processors of the batch. Packets without a size or protocol are
+        left out of the size statistics or protocol counts.
+        
+        Returns:
+            Tuple of (size total, size min, size max, error count, protocol counts)
+        """
+        if self._summary is None:
+            self._summary = summarize_batch(
+                self.sizes, self.errors, self.protocol_ids, MAX_PROTOCOLS,
+                has_size=self.has_size, has_protocol=self.has_protocol
+            )
+        return self._summary
+        
+    @classmethod
+    def from_packets(cls, packets: List[Dict[str, Any]]) -> "PacketBatch":
+        """
+        Build a batch from packet dictionaries.
+        
+        Args:
+            packets: Packet information as passed to process_packet()
+            
+        Returns:
+            A new packet batch
+        """
+        response_times = None
+        if any("response_time" in packet for packet in packets):
+            response_times = np.array(
+                [packet.get("response_time", np.nan) for packet in packets], dtype=RESPONSE_TIME_DTYPE
+            )
+            
+        sizes = [packet.get("size") for packet in packets]
+        protocols = [packet.get("protocol") for packet in packets]
+        has_size = np.array([size is not None for size in sizes], dtype=bool)
+        has_protocol = np.array([protocol is not None for protocol in protocols], dtype=bool)
+        
+        return cls(
+            sizes=np.array([size or 0 for size in sizes], dtype=SIZE_DTYPE),
+            errors=np.array([bool(packet.get("error")) for packet in packets], dtype=bool),
+            protocol_ids=np.array(
+                [0 if protocol is None else protocol_id(protocol) for protocol in protocols],
+                dtype=PROTOCOL_ID_DTYPE
+            ),
+            response_times=response_times,
+            has_size=None if has_size.all() else has_size,
+            has_protocol=None if has_protocol.all() else has_protocol,
+            packets=packets
+        )
+        
+    def iter_packets(self):
+        """
+        Iterate over the batch as packet dictionaries.
+        
+        The source packets are yielded when the batch has them, otherwise
+        packets are rebuilt from the columns.
+        
+        Yields:
+            Packet information dictionaries
+        """
+        if self.packets is not None:
+            yield from self.packets
+            return
+            
+        for i in range(len(self)):
+            packet = {"error": bool(self.errors[i])}
+            if self.has_size is None or self.has_size[i]:
+                packet["size"] = int(self.sizes[i])
+            if self.has_protocol is None or self.has_protocol[i]:
+                packet["protocol"] = _protocol_names[self.protocol_ids[i]]
+            if self.response_times is not None and not np.isnan(self.response_times[i]):
+                packet["response_time"] = float(self.response_times[i])
+            yield packet
+
+
+class PacketRing:
+    """
+    Single-producer, single-consumer ring buffer of packets.
+    
+    A capture thread pushes packets into preallocated columns and a single
+    metrics thread drains them as a PacketBatch, instead of handing every
+    packet to the metric processors as it arrives. The producer only
+    writes the tail index and the consumer only writes the head index, and
+    each index is published after the slots it covers, so no lock is
+    needed while the interpreter serializes attribute stores (GIL).
+    """
+    
+    def __init__(self, capacity: int = 1 << 16):
+        """
+        Initialize the ring buffer.
+        
+        Args:
+            capacity: Number of packet slots, a power of two
+        """
+        if capacity <= 0 or capacity & (capacity - 1):
+            raise ValueError(f"Ring capacity must be a power of two: {capacity}")
+            
+        self._mask = capacity - 1
+        self._sizes = np.zeros(capacity, dtype=SIZE_DTYPE)
+        self._has_size = np.zeros(capacity, dtype=bool)
+        self._errors = np.zeros(capacity, dtype=bool)
+        self._protocol_ids = np.zeros(capacity, dtype=PROTOCOL_ID_DTYPE)
+        self._has_protocol = np.zeros(capacity, dtype=bool)
+        self._response_times = np.full(capacity, np.nan, dtype=RESPONSE_TIME_DTYPE)
+        self._packets = np.empty(capacity, dtype=object)  # Source packets
+        self._head = 0  # Next slot to read, written by the consumer only
+        self._tail = 0  # Next slot to write, written by the producer only
+        
+    def __len__(self) -> int:
+        return self._tail - self._head
+        
+    def push(self, packet: Dict[str, Any]) -> bool:
+        """
+        Add a packet to the ring, called from the producer thread.
+        
+        Args:
+            packet: Packet information as passed to process_packet()
+            
+        Returns:
+            True if the packet was added, False if the ring is full
+        """
+        tail = self._tail
+        if tail - self._head > self._mask:
+            return False
+            
+        slot = tail & self._mask
+        size = packet.get("size")
+        protocol = packet.get("protocol")
+        self._sizes[slot] = size or 0
+        self._has_size[slot] = size is not None
+        self._errors[slot] = bool(packet.get("error"))
+        self._protocol_ids[slot] = 0 if protocol is None else protocol_id(protocol)
+        self._has_protocol[slot] = protocol is not None
+        self._response_times[slot] = packet.get("response_time", np.nan)
+        self._packets[slot] = packet
+        
+        # Publish the slot only once it is fully written
+        self._tail = tail + 1
+        return True
+        
+    def drain(self, max_packets: Optional[int] = None) -> Optional[PacketBatch]:
+        """
+        Remove the queued packets from the ring, called from the consumer thread.
+        
+        Args:
+            max_packets: Maximum number of packets to remove (optional)
+            
+        Returns:
+            The packets as a batch, or None if the ring is empty
+        """
+        head = self._head
+        count = self._tail - head
+        if max_packets is not None:
+            count = min(count, max_packets)
+        if count <= 0:
+            return None
+            
+        # Fancy indexing copies the slots, so they can be reused right away
+        slots = (head + np.arange(count)) & self._mask
+        response_times = self._response_times[slots]
+        has_size = self._has_size[slots]
+        has_protocol = self._has_protocol[slots]
+        batch = PacketBatch(
+            sizes=self._sizes[slots],
+            errors=self._errors[slots],
+            protocol_ids=self._protocol_ids[slots],
+            response_times=None if np.isnan(response_times).all() else response_times,
+            has_size=None if has_size.all() else has_size,
+            has_protocol=None if has_protocol.all() else has_protocol,
+            packets=self._packets[slots].tolist()
+        )
+        
+        # Drop the references to the source packets and release the slots
+        # to the producer
+        self._packets[slots] = None
+        self._head = head + count
+        return batch
+
+
 class MetricProcessor:
     """Base class for metric processors."""
     
+    __slots__ = ("metric_type", "current_value")
+    
+    # Storage format of serialized values, "msgpack" or "json"
+    serialization = "msgpack" if MSGPACK_AVAILABLE else "json"
+    
     def __init__(self, metric_type: str):
         """
         Initialize the metric processor.
@@ -73,16 +404,32 @@ class MetricProcessor:
         """
         raise NotImplementedError("Subclasses must implement process()")
         
+    def process_batch(self, batch: PacketBatch) -> None:
+        """
+        Process a batch of packets and update the metric.
+        
+        Processors override this with vectorized updates, the default
+        processes the packets one at a time.
+        
+        Args:
+            batch: Columnar batch of packets
+        """
+        for packet in batch.iter_packets():
+            self.process(packet)
+            
     def get_value(self) -> MetricValueT:
         """
         Get the current metric value.
         
+        The value may be the processor's own state rather than a copy, so
+        callers must treat it as read-only.
+        
         Returns:
             The current metric value
         """
         return self.current_value
         
-    def serialize(self, value: MetricValueT) -> str:
+    def serialize(self, value: Any) -> bytes:
         """
         Serialize a metric value for storage.
         
@@ -90,71 +437,155 @@ class MetricProcessor:
             value: Metric value to serialize
             
         Returns:
-            Serialized string representation
+            Serialized representation, MessagePack or UTF-8 encoded JSON
         """
-        return json.dumps(value)
+        if self.serialization == "msgpack":
+            return msgpack.packb(value, use_bin_type=True)
+        if ORJSON_AVAILABLE:
+            return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+        return json.dumps(value).encode("utf-8")
         
-    def deserialize(self, serialized: str) -> MetricValueT:
+    def deserialize(self, serialized: Union[str, bytes]) -> Any:
         """
         Deserialize a stored metric value.
         
+        JSON is always accepted so that samples stored before switching
+        to MessagePack remain readable. Stored samples are (timestamp,
+        value) arrays, which start with '[' as JSON and never as MessagePack.
+        
         Args:
-            serialized: Serialized string representation
+            serialized: Serialized representation
             
         Returns:
             Deserialized metric value
         """
+        if isinstance(serialized, bytes) and serialized[:1] not in (b"[", b"{"):
+            if not MSGPACK_AVAILABLE:
+                raise ValueError("MessagePack sample found but msgpack is not installed")
+            return msgpack.unpackb(serialized, raw=False)
+        if ORJSON_AVAILABLE:
+            return orjson.loads(serialized)
         return json.loads(serialized)
+        
+    def flatten_to_scalars(self, value: MetricValueT) -> ScalarsT:
+        """
+        Flatten a metric value into scalars for time series storage.
+        
+        Args:
+            value: Metric value to flatten
+            
+        Returns:
+            List of (suffix, value) pairs, one per time series
+        """
+        return _flatten_value(value)
+        
+    def unflatten_scalars(self, scalars: Dict[str, float]) -> MetricValueT:
+        """
+        Rebuild a metric value from scalars read back from time series.
+        
+        Args:
+            scalars: Mapping of suffix to value
+            
+        Returns:
+            The rebuilt metric value
+        """
+        return _unflatten_value(scalars)
 
 
 class CountMetricProcessor(MetricProcessor):
     """Simple packet count processor (original behavior)."""
     
+    __slots__ = ("_count",)
+    
     def __init__(self):
         super().__init__(MetricType.COUNT)
         
+    def reset(self) -> None:
+        """Reset the counter."""
+        self._count = 0
+        
     def process(self, packet: Dict[str, Any]) -> None:
         """Increment the counter by 1."""
-        self.current_value = int(self.current_value) + 1
+        self._count += 1
+        
+    def process_batch(self, batch: PacketBatch) -> None:
+        """Increment the counter by the batch size."""
+        self._count += len(batch)
+        
+    def get_value(self) -> MetricValueT:
+        """Get the packet count."""
+        return self._count
 
 
 class SizeMetricProcessor(MetricProcessor):
     """Packet size metric processor."""
     
+    __slots__ = ("_count", "_total", "_min", "_max")
+    
     def __init__(self):
         super().__init__(MetricType.SIZE)
         self.reset()
         
     def reset(self) -> None:
         """Reset size statistics."""
-        self.current_value = {
-            "min": None,
-            "max": None,
-            "avg": None,
-            "total": 0,
-            "count": 0
-        }
+        self._count = 0
+        self._total = 0
+        
+        # Sentinels so that the first packet always updates min/max
+        self._min = math.inf
+        self._max = -math.inf
         
     def process(self, packet: Dict[str, Any]) -> None:
         """Update size statistics with the packet."""
-        if "size" not in packet:
+        size = packet.get("size")
+        if size is None:
             return
             
-        size = packet["size"]
-        value = self.current_value
-        
         # Update count and total
-        value["count"] += 1
-        value["total"] += size
+        self._count += 1
+        self._total += size
         
-        # Update min/max
-        if value["min"] is None or size < value["min"]:
-            value["min"] = size
-        if value["max"] is None or size > value["max"]:
-            value["max"] = size
+        # Update min/max, a single compare each thanks to the sentinels
+        size_min = self._min
+        size_max = self._max
+        self._min = size if size < size_min else size_min
+        self._max = size if size > size_max else size_max
             
-        # Update average
-        value["avg"] = value["total"] / value["count"]
+    def process_batch(self, batch: PacketBatch) -> None:
+        """Update size statistics with a batch of packets."""
+        count = batch.size_count
+        if not count:
+            return
+            
+        total, size_min, size_max, _, _ = batch.summary()
+        self._count += count
+        self._total += total
+        self._min = min(self._min, size_min)
+        self._max = max(self._max, size_max)
+        
+    def get_value(self) -> MetricValueT:
+        """
+        Get the current metric value.
+        
+        Returns:
+            Size statistics, with the average computed on demand
+        """
+        count = self._count
+        return {
+            "min": self._min if count else None,
+            "max": self._max if count else None,
+            "avg": self._total / count if count else None,
+            "total": self._total,
+            "count": count
+        }
+        
+    def flatten_to_scalars(self, value: MetricValueT) -> ScalarsT:
+        """Emit min/max/avg/count, the running total is not stored."""
+        return [
+            (field, float(value[field]))
+            for field in ("min", "max", "avg", "count")
+            if value.get(field) is not None
+        ]
 
 
 class ProtocolMetricProcessor(MetricProcessor):
@@ -166,26 +597,36 @@ class ProtocolMetricProcessor(MetricProcessor):
         
     def reset(self) -> None:
         """Reset protocol distribution."""
-        self.current_value = {
-            "protocols": {},
-            "total": 0
-        }
+        # Packet counts indexed by protocol id
+        self._counts: List[int] = [0] * MAX_PROTOCOLS
+        self._total = 0
         
     def process(self, packet: Dict[str, Any]) -> None:
         """Update protocol distribution with the packet."""
-        if "protocol" not in packet:
+        protocol = packet.get("protocol")
+        if protocol is None:
             return
             
-        protocol = packet["protocol"]
-        value = self.current_value
-        
-        # Update protocol count
-        if protocol not in value["protocols"]:
-            value["protocols"][protocol] = 0
-        value["protocols"][protocol] += 1
+        # Update protocol count, registering new protocols on first sight
+        pid = _protocol_ids.get(protocol)
+        if pid is None:
+            pid = protocol_id(protocol)
+        self._counts[pid] += 1
         
         # Update total
-        value["total"] += 1
+        self._total += 1
+        
+    def process_batch(self, batch: PacketBatch) -> None:
+        """Update protocol distribution with a batch of packets."""
+        if not len(batch):
+            return
+            
+        batch_counts = batch.summary()[4]
+        counts = self._counts
+        for pid in np.flatnonzero(batch_counts):
+            counts[pid] += int(batch_counts[pid])
+            
+        self._total += batch.protocol_count
         
     def get_value(self) -> MetricValueT:
         """
@@ -194,58 +635,177 @@ class ProtocolMetricProcessor(MetricProcessor):
         Returns:
             Dictionary with protocol counts and percentages
         """
-        value = self.current_value
+        total = self._total
         
         # Calculate percentages
         result = {
             "protocols": {},
-            "total": value["total"]
+            "total": total
         }
         
-        if value["total"] > 0:
-            for protocol, count in value["protocols"].items():
-                result["protocols"][protocol] = {
-                    "count": count,
-                    "percentage": (count / value["total"]) * 100
-                }
-                
+        if total > 0:
+            protocols = result["protocols"]
+            counts = self._counts
+            scale = 100.0 / total
+            for pid in range(len(_protocol_names)):
+                count = counts[pid]
+                if count:
+                    protocols[_protocol_names[pid]] = {
+                        "count": count,
+                        "percentage": count * scale
+                    }
+                    
+        return result
+        
+    def flatten_to_scalars(self, value: MetricValueT) -> ScalarsT:
+        """Emit one count per protocol plus the total, percentages are derived."""
+        scalars = [
+            (f"protocols.{protocol}", float(info["count"]))
+            for protocol, info in value["protocols"].items()
+        ]
+        scalars.append(("total", float(value["total"])))
+        return scalars
+        
+    def unflatten_scalars(self, scalars: Dict[str, float]) -> MetricValueT:
+        """Rebuild protocol counts and recompute their percentages."""
+        total = int(scalars.get("total", 0))
+        result = {
+            "protocols": {},
+            "total": total
+        }
+        
+        for suffix, count in scalars.items():
+            if not suffix.startswith("protocols."):
+                continue
+            result["protocols"][suffix[len("protocols."):]] = {
+                "count": int(count),
+                "percentage": (count / total) * 100 if total else 0.0
+            }
+            
         return result
 
 
 class ErrorRateMetricProcessor(MetricProcessor):
     """Error rate metric processor."""
     
+    __slots__ = ("_errors", "_total")
+    
     def __init__(self):
         super().__init__(MetricType.ERROR_RATE)
         self.reset()
         
     def reset(self) -> None:
         """Reset error rate statistics."""
-        self.current_value = {
-            "errors": 0,
-            "total": 0,
-            "rate": 0.0
-        }
+        self._errors = 0
+        self._total = 0
         
     def process(self, packet: Dict[str, Any]) -> None:
         """Update error rate with the packet."""
-        value = self.current_value
-        
-        # Update total
-        value["total"] += 1
+        self._total += 1
         
         # Check for error
-        if "error" in packet and packet["error"]:
-            value["errors"] += 1
+        if packet.get("error"):
+            self._errors += 1
+            
+    def process_batch(self, batch: PacketBatch) -> None:
+        """Update error rate with a batch of packets."""
+        self._errors += batch.summary()[3]
+        self._total += len(batch)
+        
+    def get_value(self) -> MetricValueT:
+        """
+        Get the current metric value.
+        
+        Returns:
+            Error statistics, with the rate computed on demand
+        """
+        return {
+            "errors": self._errors,
+            "total": self._total,
+            "rate": (self._errors / self._total) * 100 if self._total else 0.0
+        }
+
+
+class StandardMetricsProcessor(MetricProcessor):
+    """
+    Fused processor for the standard count, size, protocol and error rate metrics.
+    
+    Each packet is read once and all four metrics are updated in a single
+    body instead of dispatching it to four processors. The metrics remain
+    available as regular processors, which hold the state and compute the
+    values, so they are stored and queried like any other processor.
+    """
+    
+    __slots__ = ("count", "size", "protocol", "error_rate")
+    
+    def __init__(self):
+        self.count = CountMetricProcessor()
+        self.size = SizeMetricProcessor()
+        self.protocol = ProtocolMetricProcessor()
+        self.error_rate = ErrorRateMetricProcessor()
+        super().__init__("standard")
+        
+    @property
+    def processors(self) -> Tuple[MetricProcessor, ...]:
+        """The processors holding the state of the fused metrics."""
+        return (self.count, self.size, self.protocol, self.error_rate)
+        
+    def reset(self) -> None:
+        """Reset all fused metrics."""
+        for processor in self.processors:
+            processor.reset()
             
-        # Update rate
-        if value["total"] > 0:
-            value["rate"] = (value["errors"] / value["total"]) * 100
+    def process(self, packet: Dict[str, Any]) -> None:
+        """Update all fused metrics with the packet."""
+        get = packet.get
+        
+        self.count._count += 1
+        
+        error_rate = self.error_rate
+        error_rate._total += 1
+        if get("error"):
+            error_rate._errors += 1
+            
+        size = get("size")
+        if size is not None:
+            sizes = self.size
+            sizes._count += 1
+            sizes._total += size
+            size_min = sizes._min
+            size_max = sizes._max
+            sizes._min = size if size < size_min else size_min
+            sizes._max = size if size > size_max else size_max
+            
+        protocol = get("protocol")
+        if protocol is not None:
+            pid = _protocol_ids.get(protocol)
+            if pid is None:
+                pid = protocol_id(protocol)
+            protocols = self.protocol
+            protocols._counts[pid] += 1
+            protocols._total += 1
+            
+    def process_batch(self, batch: PacketBatch) -> None:
+        """Update all fused metrics with a batch of packets."""
+        for processor in self.processors:
+            processor.process_batch(batch)
+            
+    def get_value(self) -> MetricValueT:
+        """
+        Get the current metric values.
+        
+        Returns:
+            Dictionary of the fused metric values by metric type
+        """
+        return {processor.metric_type: processor.get_value() for processor in self.processors}
 
 
 class ResponseTimeMetricProcessor(MetricProcessor):
     """Response time metric processor."""
     
+    # Number of most recent samples the percentiles are computed over
+    SAMPLE_WINDOW = 100
+    
     def __init__(self):
         super().__init__(MetricType.RESPONSE_TIME)
         self.reset()
@@ -259,10 +819,18 @@ class ResponseTimeMetricProcessor(MetricProcessor):
             "p50": None,  # 50th percentile (median)
             "p90": None,  # 90th percentile
             "p95": None,  # 95th percentile
-            "count": 0,
-            "samples": []
+            "count": 0
         }
         
+        # Circular buffer of recent samples and running sum for the average
+        self._samples = np.empty(self.SAMPLE_WINDOW, dtype=np.float32)
+        self._sum = 0.0
+        self._stale = False
+        
+        # Sentinels so that the first sample always updates min/max
+        self._min = math.inf
+        self._max = -math.inf
+        
     def process(self, packet: Dict[str, Any]) -> None:
         """Update response time statistics with the packet."""
         if "response_time" not in packet:
@@ -271,47 +839,85 @@ class ResponseTimeMetricProcessor(MetricProcessor):
         response_time = packet["response_time"]
         value = self.current_value
         
-        # Update samples list
-        value["samples"].append(response_time)
+        # Update samples buffer
+        self._samples[value["count"] % self.SAMPLE_WINDOW] = response_time
+        self._sum += response_time
         value["count"] += 1
         
+        # Update min/max, a single compare each thanks to the sentinels
+        time_min = self._min
+        time_max = self._max
+        self._min = response_time if response_time < time_min else time_min
+        self._max = response_time if response_time > time_max else time_max
+        
+        # Min/max, average and percentiles are exported when the value is read
+        self._stale = True
+        
+    def process_batch(self, batch: PacketBatch) -> None:
+        """Update response time statistics with a batch of packets."""
+        if batch.response_times is None:
+            return
+            
+        response_times = batch.response_times[~np.isnan(batch.response_times)]
+        n = len(response_times)
+        if not n:
+            return
+            
+        value = self.current_value
+        
+        # Only the most recent samples of the batch can stay in the buffer
+        recent = response_times[-self.SAMPLE_WINDOW:]
+        first = value["count"] + n - len(recent)
+        self._samples[(first + np.arange(len(recent))) % self.SAMPLE_WINDOW] = recent
+        self._sum += float(response_times.sum(dtype=np.float64))
+        value["count"] += n
+        
         # Update min/max
-        if value["min"] is None or response_time < value["min"]:
-            value["min"] = response_time
-        if value["max"] is None or response_time > value["max"]:
-            value["max"] = response_time
+        self._min = min(self._min, float(response_times.min()))
+        self._max = max(self._max, float(response_times.max()))
         
-        # Calculate statistics if we have enough samples
-        if len(value["samples"]) >= 5:
-            value["avg"] = statistics.mean(value["samples"])
+        self._stale = True
+        
+    def _update_statistics(self) -> None:
+        """Compute the average and percentiles of the collected samples."""
+        value = self.current_value
+        self._stale = False
+        
+        if value["count"]:
+            value["min"] = self._min
+            value["max"] = self._max
             
-            # Calculate percentiles
-            sorted_samples = sorted(value["samples"])
-            value["p50"] = sorted_samples[len(sorted_samples) // 2]
-            value["p90"] = sorted_samples[int(len(sorted_samples) * 0.9)]
-            value["p95"] = sorted_samples[int(len(sorted_samples) * 0.95)]
+        # Calculate statistics if we have enough samples
+        if value["count"] < 5:
+            return
             
-            # Keep samples list from growing too large
-            if len(value["samples"]) > 100:
-                value["samples"] = value["samples"][-100:]
+        value["avg"] = self._sum / value["count"]
+        
+        # Select the percentiles in linear time instead of sorting
+        n = min(value["count"], self.SAMPLE_WINDOW)
+        ranks = [n // 2, int(n * 0.9), int(n * 0.95)]
+        partitioned = np.partition(self._samples[:n], ranks)
+        value["p50"], value["p90"], value["p95"] = (float(partitioned[rank]) for rank in ranks)
     
     def get_value(self) -> MetricValueT:
         """
         Get the current metric value.
         
         Returns:
-            Response time statistics (without raw samples)
+            Response time statistics
         """
-        value = self.current_value.copy()
-        # Don't include samples in the returned value to keep it small
-        if "samples" in value:
-            del value["samples"]
-        return value
+        if self._stale:
+            self._update_statistics()
+        return self.current_value
 
 
 class ConnectionMetricProcessor(MetricProcessor):
     """Connection metrics processor."""
     
+    # Maximum number of open connections tracked for their duration, the
+    # least recently opened ones are dropped first
+    MAX_TRACKED_CONNECTIONS = 65536
+    
     def __init__(self):
         super().__init__(MetricType.CONNECTION)
         self.reset()
@@ -322,10 +928,12 @@ class ConnectionMetricProcessor(MetricProcessor):
             "new_connections": 0,
             "closed_connections": 0,
             "active_connections": 0,
-            "avg_duration": None,
-            "connection_map": {}  # Used internally to track connections
+            "avg_duration": None
         }
         
+        # Start times of open connections, used internally to track connections
+        self._connections: OrderedDict = OrderedDict()
+        
     def process(self, packet: Dict[str, Any]) -> None:
         """Update connection statistics with the packet."""
         # Check if this is a connection-related packet
@@ -340,47 +948,32 @@ class ConnectionMetricProcessor(MetricProcessor):
             value["new_connections"] += 1
             conn_id = conn_info.get("id")
             if conn_id:
-                value["connection_map"][conn_id] = {
-                    "start_time": conn_info.get("time", int(time.time())),
-                    "active": True
-                }
+                connections = self._connections
+                connections[conn_id] = conn_info.get("time", int(time.time()))
+                connections.move_to_end(conn_id)
+                if len(connections) > self.MAX_TRACKED_CONNECTIONS:
+                    connections.popitem(last=False)
             value["active_connections"] += 1
             
         # Handle closed connection
         elif conn_info.get("closed", False):
             value["closed_connections"] += 1
             conn_id = conn_info.get("id")
-            if conn_id and conn_id in value["connection_map"]:
-                conn = value["connection_map"][conn_id]
-                if conn["active"]:
-                    value["active_connections"] -= 1
-                    conn["active"] = False
-                    
-                    # Calculate duration
-                    start_time = conn["start_time"]
-                    end_time = conn_info.get("time", int(time.time()))
-                    duration = end_time - start_time
-                    
-                    # Update average duration
-                    if value["avg_duration"] is None:
-                        value["avg_duration"] = duration
-                    else:
-                        # Simple moving average
-                        alpha = 0.2  # Weight for new sample
-                        value["avg_duration"] = (alpha * duration) + ((1 - alpha) * value["avg_duration"])
-    
-    def get_value(self) -> MetricValueT:
-        """
-        Get the current metric value.
-        
-        Returns:
-            Connection statistics (without internal connection map)
-        """
-        value = self.current_value.copy()
-        # Don't include connection map in the returned value
-        if "connection_map" in value:
-            del value["connection_map"]
-        return value
+            start_time = self._connections.pop(conn_id, None) if conn_id else None
+            if start_time is not None:
+                value["active_connections"] -= 1
+                
+                # Calculate duration
+                end_time = conn_info.get("time", int(time.time()))
+                duration = end_time - start_time
+                
+                # Update average duration
+                if value["avg_duration"] is None:
+                    value["avg_duration"] = duration
+                else:
+                    # Simple moving average
+                    alpha = 0.2  # Weight for new sample
+                    value["avg_duration"] = (alpha * duration) + ((1 - alpha) * value["avg_duration"])
 
 
 class ServiceMetricProcessor(MetricProcessor):
@@ -424,23 +1017,66 @@ class ServiceMetricProcessor(MetricProcessor):
                     value["metrics"][metric] = packet[metric]
 
 
+def make_plan(handlers: List[PacketHandlerT]) -> PacketHandlerT:
+    """
+    Build a single function calling each packet handler in turn.
+    
+    The calls are generated as straight-line code with the handlers bound
+    as default arguments, so processing a packet involves no loop over
+    the handlers and no lookups beyond local variables.
+    
+    Args:
+        handlers: Packet handlers, e.g. bound process() methods
+        
+    Returns:
+        A function taking a packet and passing it to every handler
+    """
+    if len(handlers) == 1:
+        return handlers[0]
+        
+    params = "".join(f", _h{i}=_h{i}" for i in range(len(handlers)))
+    body = "".join(f"\n    _h{i}(packet)" for i in range(len(handlers))) or "\n    pass"
+    namespace = {f"_h{i}": handler for i, handler in enumerate(handlers)}
+    exec(f"def plan(packet{params}):{body}", namespace)
+    return namespace["plan"]
+
+
 class MetricManager:
     """
     Manages metric collection, storage, and retrieval.
     
     This class coordinates the various metric processors and handles
     storage and retrieval of metric data from Redis.
+    
+    Metrics are stored either as JSON samples in a Redis list per key,
+    metric type and label, or - when the RedisTimeSeries module is used -
+    as one time series per scalar field of the metric value.
     """
     
-    def __init__(self, redis_client=None):
+    # Number of samples kept for each metric time series
+    SAMPLES_RETAINED = 1001
+    
+    # Downsampled labels derived server-side from the 's' time series,
+    # mapped to their bucket size in seconds
+    TIMESERIES_COMPACTIONS = {"m": 60, "h": 3600}
+    
+    def __init__(self, redis_client=None, use_timeseries: Optional[bool] = None):
         """
         Initialize the metric manager.
         
         Args:
             redis_client: Redis client for storing metrics
+            use_timeseries: Store metrics with RedisTimeSeries commands
+                instead of Redis lists, None to use them when the server
+                has the module loaded
         """
         self.redis_client = redis_client
+        self._auto_timeseries = use_timeseries is None
+        self.use_timeseries = use_timeseries
         self.processors: Dict[str, Dict[str, MetricProcessor]] = {}
+        self._plans: Dict[str, PacketHandlerT] = {}
+        self._standard_processors: Dict[str, StandardMetricsProcessor] = {}
+        self._timeseries_keys: Set[str] = set()
         self.initialize()
         
     def initialize(self) -> None:
@@ -455,8 +1091,36 @@ class MetricManager:
         Args:
             redis_client: Redis client instance
         """
+        if redis_client is not self.redis_client and self._auto_timeseries:
+            # Detect the time series module again for the new server
+            self.use_timeseries = None
         self.redis_client = redis_client
         
+    def _timeseries_enabled(self) -> bool:
+        """
+        Check whether metrics are stored with RedisTimeSeries commands.
+        
+        In auto mode the server's module list is queried once per client.
+        
+        Returns:
+            True if the RedisTimeSeries storage is used
+        """
+        if self.use_timeseries is None:
+            self.use_timeseries = False
+            try:
+                for module in self.redis_client.execute_command("MODULE LIST") or ():
+                    if isinstance(module, dict):
+                        name = module.get(b"name", module.get("name"))
+                    else:
+                        name = dict(zip(module[::2], module[1::2])).get(b"name")
+                    if name in (b"timeseries", "timeseries"):
+                        self.use_timeseries = True
+                        break
+            except Exception as e:
+                logger.debug(f"Cannot list Redis modules, using Redis lists: {e}")
+            logger.info(f"Storing metrics with {'RedisTimeSeries' if self.use_timeseries else 'Redis lists'}")
+        return self.use_timeseries
+        
     def add_processor(self, key: str, processor: MetricProcessor) -> None:
         """
         Add a metric processor for a specific key.
@@ -469,6 +1133,45 @@ class MetricManager:
             self.processors[key] = {}
             
         self.processors[key][processor.metric_type] = processor
+        self._update_plan(key)
+        
+    def add_standard_processors(self, key: str) -> None:
+        """
+        Add the standard count, size, protocol and error rate processors for a key.
+        
+        The processors are fed packets by a single StandardMetricsProcessor.
+        
+        Args:
+            key: The message key
+        """
+        standard = StandardMetricsProcessor()
+        self._standard_processors[key] = standard
+        
+        key_processors = self.processors.setdefault(key, {})
+        for processor in standard.processors:
+            key_processors[processor.metric_type] = processor
+        self._update_plan(key)
+        
+    def _update_plan(self, key: str) -> None:
+        """
+        Rebuild the function that processes each packet of a key.
+        
+        Args:
+            key: The message key
+        """
+        handlers = []
+        fused = ()
+        standard = self._standard_processors.get(key)
+        if standard is not None:
+            fused = standard.processors
+            if any(processor in fused for processor in self.processors[key].values()):
+                handlers.append(standard.process)
+                
+        handlers.extend(
+            processor.process for processor in self.processors[key].values()
+            if processor not in fused
+        )
+        self._plans[key] = make_plan(handlers)
         
     def process_packet(self, key: str, packet: Dict[str, Any]) -> None:
         """
@@ -478,17 +1181,51 @@ class MetricManager:
             key: The message key associated with this packet
             packet: The packet information to process
         """
+        plan = self._plans.get(key)
+        
         # If we don't have processors for this key, add standard ones
-        if key not in self.processors:
-            self.add_processor(key, CountMetricProcessor())
-            self.add_processor(key, SizeMetricProcessor())
-            self.add_processor(key, ProtocolMetricProcessor())
-            self.add_processor(key, ErrorRateMetricProcessor())
+        if plan is None:
+            self.add_standard_processors(key)
+            plan = self._plans[key]
             
         # Process the packet with each processor
+        plan(packet)
+            
+    def process_batch(self, key: str, batch: PacketBatch) -> None:
+        """
+        Process a batch of packets for a specific key.
+        
+        Args:
+            key: The message key associated with these packets
+            batch: Columnar batch of packets
+        """
+        # If we don't have processors for this key, add standard ones
+        if key not in self.processors:
+            self.add_standard_processors(key)
+            
+        # Process the batch with each processor
         for processor in self.processors[key].values():
-            processor.process(packet)
+            processor.process_batch(batch)
+            
+    def drain_ring(self, key: str, ring: PacketRing, max_packets: Optional[int] = None) -> int:
+        """
+        Process the packets queued in a ring buffer for a specific key.
+        
+        Args:
+            key: The message key associated with the packets
+            ring: Ring buffer filled by the capture thread
+            max_packets: Maximum number of packets to process (optional)
             
+        Returns:
+            Number of packets processed
+        """
+        batch = ring.drain(max_packets)
+        if batch is None:
+            return 0
+            
+        self.process_batch(key, batch)
+        return len(batch)
+        
     def get_metric_value(self, key: str, metric_type: str) -> MetricValueT:
         """
         Get the current value of a specific metric for a key.
@@ -539,23 +1276,175 @@ class MetricManager:
         timestamp = int(time.time())
         timestamp = timestamp - (timestamp % interval)
         
-        # Store metrics for each key
+        if self._timeseries_enabled():
+            self._store_timeseries(interval, label, timestamp)
+            return
+        
+        # Store metrics for each key, all in one round trip
+        pipe = self.redis_client.pipeline(transaction=False)
         for key, processors in self.processors.items():
             for metric_type, processor in processors.items():
-                # Get the metric value
-                value = processor.get_value()
-                
                 # Create a Redis key for this metric
                 redis_key = f"{key}:{metric_type}:{label}"
                 
-                # Serialize the metric value
-                serialized = processor.serialize(value)
-                
-                # Store as a time series
-                self.redis_client.lpush(redis_key, f"[{timestamp}, {serialized}]")
+                # Store the (timestamp, value) sample as a time series
+                pipe.lpush(redis_key, processor.serialize((timestamp, processor.get_value())))
                 
                 # Trim the list to a reasonable size
-                self.redis_client.ltrim(redis_key, 0, 1000)
+                pipe.ltrim(redis_key, 0, self.SAMPLES_RETAINED - 1)
+        pipe.execute()
+                
+    def _store_timeseries(self, interval: int, label: str, timestamp: int) -> None:
+        """
+        Store metrics as RedisTimeSeries samples.
+        
+        Each metric value is flattened into scalars and written with one
+        a single TS.MADD covering every key and metric type.
+        
+        Args:
+            interval: The sampling interval in seconds
+            label: The label for the interval ('s', 'm', 'h')
+            timestamp: The interval-aligned timestamp in seconds
+        """
+        if label in self.TIMESERIES_COMPACTIONS:
+            # Downsampled series are maintained by the server's compaction rules
+            return
+            
+        timestamp_ms = timestamp * 1000
+        args = []
+        new_series = []
+        
+        for key, processors in self.processors.items():
+            for metric_type, processor in processors.items():
+                for suffix, scalar in processor.flatten_to_scalars(processor.get_value()):
+                    ts_key = f"{key}:{metric_type}:{label}:{suffix}"
+                    if ts_key not in self._timeseries_keys:
+                        new_series.append((key, metric_type, suffix))
+                    args.extend((ts_key, timestamp_ms, scalar))
+                    
+        if not args:
+            return
+            
+        if new_series:
+            self._create_timeseries(new_series, interval, label)
+            
+        replies = self.redis_client.execute_command("TS.MADD", *args)
+        for ts_key, reply in zip(args[::3], replies or ()):
+            if isinstance(reply, Exception):
+                # The series was removed behind our back, recreate it next time
+                logger.warning(f"Failed to add sample to {ts_key}: {reply}")
+                self._timeseries_keys.discard(ts_key)
+        
+    def _create_timeseries(self, series: List[Tuple[str, str, str]], interval: int, label: str) -> None:
+        """
+        Create time series, and the compaction rules of 's' series, on first write.
+        
+        Args:
+            series: List of (key, metric type, suffix) tuples to create
+            interval: The sampling interval in seconds
+            label: The label for the interval
+        """
+        pipe = self.redis_client.pipeline(transaction=False)
+        for key, metric_type, suffix in series:
+            ts_key = f"{key}:{metric_type}:{label}:{suffix}"
+            self._queue_create_timeseries(pipe, ts_key, interval, key, metric_type, label, suffix)
+            
+            if label != "s":
+                continue
+                
+            for dest_label, bucket in self.TIMESERIES_COMPACTIONS.items():
+                dest_key = f"{key}:{metric_type}:{dest_label}:{suffix}"
+                self._queue_create_timeseries(pipe, dest_key, bucket, key, metric_type, dest_label, suffix)
+                
+                # Metric values accumulate between resets, so the last sample
+                # of a bucket is the value at the end of that interval
+                pipe.execute_command(
+                    "TS.CREATERULE", ts_key, dest_key, "AGGREGATION", "last", bucket * 1000
+                )
+                
+        # Series and rules left over from a previous run already exist
+        pipe.execute(raise_on_error=False)
+        
+        for key, metric_type, suffix in series:
+            self._timeseries_keys.add(f"{key}:{metric_type}:{label}:{suffix}")
+            
+    def _queue_create_timeseries(self, pipe, ts_key: str, interval: int, key: str,
+                                 metric_type: str, label: str, suffix: str) -> None:
+        """Queue a TS.CREATE for one series on a pipeline."""
+        pipe.execute_command(
+            "TS.CREATE", ts_key,
+            "RETENTION", interval * 1000 * self.SAMPLES_RETAINED,
+            "DUPLICATE_POLICY", "LAST",
+            "LABELS", "key", key, "metric", metric_type, "label", label, "field", suffix
+        )
+        
+    def get_samples(self, key: str, metric_type: str, label: str = "s",
+                    count: int = 50) -> TimeSeriesT:
+        """
+        Get the most recent stored samples of a metric.
+        
+        Args:
+            key: The message key
+            metric_type: The type of metric to retrieve
+            label: The label for the interval ('s', 'm', 'h')
+            count: Maximum number of samples to return
+            
+        Returns:
+            List of (timestamp, value) samples, oldest first
+        """
+        if not self.redis_client:
+            logger.warning("Cannot read metrics: Redis client not set")
+            return []
+            
+        if self._timeseries_enabled():
+            return self._get_timeseries_samples(key, metric_type, label, count)
+            
+        processor = _metric_prototype(metric_type)
+        samples = []
+        for raw_sample in reversed(self.redis_client.lrange(f"{key}:{metric_type}:{label}", 0, count - 1)):
+            try:
+                timestamp, value = processor.deserialize(raw_sample)
+            except (TypeError, ValueError) as e:
+                logger.debug(f"Skipping malformed sample for {key}:{metric_type}:{label}: {e}")
+                continue
+            samples.append((timestamp, value))
+            
+        return samples
+        
+    def _get_timeseries_samples(self, key: str, metric_type: str, label: str,
+                                count: int) -> TimeSeriesT:
+        """
+        Get the most recent samples of a metric from RedisTimeSeries.
+        
+        Args:
+            key: The message key
+            metric_type: The type of metric to retrieve
+            label: The label for the interval
+            count: Maximum number of samples to return
+            
+        Returns:
+            List of (timestamp, value) samples, oldest first
+        """
+        reply = self.redis_client.execute_command(
+            "TS.MREVRANGE", "-", "+", "COUNT", count,
+            "FILTER", f"key={key}", f"metric={metric_type}", f"label={label}"
+        )
+        
+        # Regroup the per-field series into per-timestamp scalars
+        prefix = f"{key}:{metric_type}:{label}:"
+        fields_by_time: DefaultDict[int, Dict[str, float]] = defaultdict(dict)
+        for ts_key, _labels, series_samples in reply:
+            if isinstance(ts_key, bytes):
+                ts_key = ts_key.decode("utf-8")
+            suffix = ts_key[len(prefix):]
+            for timestamp_ms, scalar in series_samples:
+                fields_by_time[int(timestamp_ms) // 1000][suffix] = float(scalar)
+                
+        processor = _metric_prototype(metric_type)
+        return [
+            (timestamp, processor.unflatten_scalars(fields_by_time[timestamp]))
+            for timestamp in sorted(fields_by_time)[-count:]
+        ]
         
     def reset_metrics(self) -> None:
         """Reset all metric processors."""
@@ -595,6 +1484,27 @@ def create_metric_processor(metric_type: str, **kwargs) -> MetricProcessor:
         raise ValueError(f"Unknown metric type: {metric_type}")
 
 
+# Processors used to decode stored metric values, by metric type
+_metric_prototypes: Dict[str, MetricProcessor] = {}
+
+def _metric_prototype(metric_type: str) -> MetricProcessor:
+    """
+    Get a processor used to decode stored values of a metric type.
+    
+    Args:
+        metric_type: Type of metric
+        
+    Returns:
+        A processor for the metric type, or a generic one for unknown types
+    """
+    if metric_type not in _metric_prototypes:
+        try:
+            _metric_prototypes[metric_type] = create_metric_processor(metric_type)
+        except ValueError:
+            _metric_prototypes[metric_type] = MetricProcessor(metric_type)
+    return _metric_prototypes[metric_type]
+
+
 def extract_bacnet_metrics(apdu) -> Dict[str, Any]:
     """
     Extract BACnet-specific metrics from an APDU.
@@ -605,18 +1515,25 @@ def extract_bacnet_metrics(apdu) -> Dict[str, Any]:
     Returns:
         Dictionary of extracted metrics
     """
+    # APDUs normally carry their data, so avoid a hasattr() probe per packet
+    try:
+        size = len(apdu.pduData)
+    except AttributeError:
+        size = 0
+        
     metrics = {
         "protocol": "BACnet",
-        "size": len(apdu.pduData) if hasattr(apdu, "pduData") else 0
+        "size": size
     }
     
     # Extract error information
-    if hasattr(apdu, "apduType") and apdu.apduType == 5:  # Error
+    if getattr(apdu, "apduType", None) == 5:  # Error
         metrics["error"] = True
         
     # Extract service information if available
-    if hasattr(apdu, "apduService"):
-        metrics["service"] = str(apdu.apduService)
+    service = getattr(apdu, "apduService", None)
+    if service is not None:
+        metrics["service"] = str(service)
         
     return metrics
 
@@ -624,12 +1541,14 @@ def extract_bacnet_metrics(apdu) -> Dict[str, Any]:
 # Singleton instance
 _metric_manager = None
 
-def get_metric_manager(redis_client=None) -> MetricManager:
+def get_metric_manager(redis_client=None, use_timeseries: Optional[bool] = None) -> MetricManager:
     """
     Get or create the singleton MetricManager instance.
     
     Args:
         redis_client: Redis client to use (optional)
+        use_timeseries: Store metrics with RedisTimeSeries when creating
+            the instance, None to detect the module (optional)
         
     Returns:
         The MetricManager instance
@@ -637,7 +1556,7 @@ def get_metric_manager(redis_client=None) -> MetricManager:
     global _metric_manager
     
     if _metric_manager is None:
-        _metric_manager = MetricManager(redis_client)
+        _metric_manager = MetricManager(redis_client, use_timeseries)
     elif redis_client is not None:
         _metric_manager.set_redis_client(redis_client)
         
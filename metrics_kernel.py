@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BACmon Metrics Kernel
+
+This module computes the per-batch statistics behind the standard packet
+metrics (packet sizes, error counts and the protocol histogram) in a single
+pass over a columnar packet batch.
+
+The fastest available implementation is used: the C extension built by
+metrics_native_build.py, then a numba JIT-compiled loop, and otherwise NumPy
+reductions, which take one pass per statistic.
+"""
+
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+try:
+    from _metrics_native import ffi as _native_ffi, lib as _native_lib
+    NATIVE_AVAILABLE = True
+except ImportError:
+    NATIVE_AVAILABLE = False
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Type aliases
+SummaryT = Tuple[int, int, int, int, np.ndarray]  # (total, min, max, errors, protocol counts)
+
+
+def _summarize_numpy(sizes: np.ndarray, errors: np.ndarray, protocol_ids: np.ndarray,
+                     protocol_counts: np.ndarray) -> Tuple[int, int, int, int]:
+    """NumPy implementation of the batch summary, one reduction per statistic."""
+    protocol_counts += np.bincount(protocol_ids, minlength=len(protocol_counts))[:len(protocol_counts)]
+    if not len(sizes):
+        return 0, 0, 0, int(np.count_nonzero(errors))
+    return int(sizes.sum(dtype=np.int64)), int(sizes.min()), int(sizes.max()), int(np.count_nonzero(errors))
+
+
+def _summarize_native(sizes: np.ndarray, errors: np.ndarray, protocol_ids: np.ndarray,
+                      protocol_counts: np.ndarray) -> Tuple[int, int, int, int]:
+    """C extension implementation of the batch summary."""
+    state = np.array([0, 0, np.iinfo(np.int64).max, np.iinfo(np.int64).min, 0], dtype=np.int64)
+    n = len(sizes)
+    _native_lib.update_size_count_error(
+        _native_ffi.from_buffer("uint32_t[]", sizes), _native_ffi.from_buffer("uint8_t[]", errors),
+        n, _native_ffi.from_buffer("int64_t[]", state)
+    )
+    _native_lib.update_protohist(
+        _native_ffi.from_buffer("uint8_t[]", protocol_ids), n,
+        _native_ffi.from_buffer("int64_t[]", protocol_counts)
+    )
+    return int(state[1]), int(state[2]), int(state[3]), int(state[4])
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _summarize_numba(sizes, errors, protocol_ids, protocol_counts):
+        """JIT-compiled implementation of the batch summary, a single fused loop."""
+        total = 0
+        size_min = sizes[0]
+        size_max = sizes[0]
+        error_count = 0
+        for i in range(sizes.shape[0]):
+            size = sizes[i]
+            total += size
+            if size < size_min:
+                size_min = size
+            if size > size_max:
+                size_max = size
+            if errors[i]:
+                error_count += 1
+            protocol_counts[protocol_ids[i]] += 1
+        return total, size_min, size_max, error_count
+
+
+if NATIVE_AVAILABLE:
+    _summarize = _summarize_native
+elif NUMBA_AVAILABLE:
+    _summarize = _summarize_numba
+else:
+    _summarize = _summarize_numpy
+
+
+def summarize_batch(sizes: np.ndarray, errors: np.ndarray, protocol_ids: np.ndarray,
+                    protocol_slots: int, has_size: Optional[np.ndarray] = None,
+                    has_protocol: Optional[np.ndarray] = None) -> SummaryT:
+    """
+    Compute the statistics of a packet batch used by the standard metrics.
+
+    Args:
+        sizes: Packet sizes, as uint32
+        errors: Packet error flags
+        protocol_ids: Packet protocol ids as uint8, each below protocol_slots
+        protocol_slots: Length of the protocol histogram
+        has_size: Flags of the packets with a size, all of them if None
+        has_protocol: Flags of the packets with a protocol, all of them if None
+
+    Returns:
+        Tuple of (size total, size min, size max, error count, protocol counts),
+        min and max are 0 for a batch without sizes
+    """
+    protocol_counts = np.zeros(protocol_slots, dtype=np.int64)
+    if not len(sizes):
+        return 0, 0, 0, 0, protocol_counts
+
+    if has_size is not None or has_protocol is not None:
+        # Packets without a size or protocol are left out of its statistics,
+        # so the columns no longer line up for the fused loop and are
+        # reduced one at a time
+        if has_size is not None:
+            sizes = sizes[has_size]
+        if has_protocol is not None:
+            protocol_ids = protocol_ids[has_protocol]
+        return (*_summarize_numpy(sizes, errors, protocol_ids, protocol_counts), protocol_counts)
+
+    total, size_min, size_max, error_count = _summarize(
+        np.ascontiguousarray(sizes, dtype=np.uint32), np.ascontiguousarray(errors, dtype=bool),
+        np.ascontiguousarray(protocol_ids, dtype=np.uint8), protocol_counts
+    )
+    return int(total), int(size_min), int(size_max), int(error_count), protocol_counts
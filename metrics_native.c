@@ -0,0 +1,54 @@
+/*
+ * BACmon Native Metrics Kernel
+ *
+ * Batch statistics behind the standard packet metrics, compiled into the
+ * _metrics_native extension by metrics_native_build.py. The loops are kept
+ * free of branches and cross-iteration dependencies other than the
+ * reductions so that the compiler can vectorize them.
+ */
+
+#include <stddef.h>
+#include <stdint.h>
+
+/*
+ * Accumulate packet sizes and error flags into state, laid out as
+ * {count, total, min, max, errors}. The caller initializes min and max
+ * to INT64_MAX and INT64_MIN before the first batch.
+ */
+void update_size_count_error(const uint32_t *sizes, const uint8_t *errors, size_t n, int64_t *state)
+{
+    int64_t total = 0;
+    int64_t size_min = state[2];
+    int64_t size_max = state[3];
+    int64_t error_count = 0;
+    size_t i;
+
+    for (i = 0; i < n; i++) {
+        int64_t size = sizes[i];
+        total += size;
+        size_min = size < size_min ? size : size_min;
+        size_max = size > size_max ? size : size_max;
+    }
+    for (i = 0; i < n; i++) {
+        error_count += errors[i] != 0;
+    }
+
+    state[0] += (int64_t) n;
+    state[1] += total;
+    state[2] = size_min;
+    state[3] = size_max;
+    state[4] += error_count;
+}
+
+/*
+ * Add protocol ids to a histogram, every id must be below the number of
+ * histogram slots.
+ */
+void update_protohist(const uint8_t *protocol_ids, size_t n, int64_t *hist)
+{
+    size_t i;
+
+    for (i = 0; i < n; i++) {
+        hist[protocol_ids[i]]++;
+    }
+}
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Build script for the BACmon native metrics kernel
+
+Compiles metrics_native.c into the _metrics_native extension module, which
+metrics_kernel uses in preference to numba and NumPy when it can be imported.
+The extension is optimized for the CPU of the build host, so build it on the
+host that runs BACmon:
+
+    pip install cffi
+    python metrics_native_build.py
+"""
+
+import os
+
+from cffi import FFI
+
+# Directory containing this script and metrics_native.c
+_SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ffibuilder = FFI()
+
+ffibuilder.cdef("""
+    void update_size_count_error(const uint32_t *sizes, const uint8_t *errors, size_t n, int64_t *state);
+    void update_protohist(const uint8_t *protocol_ids, size_t n, int64_t *hist);
+""")
+
+ffibuilder.set_source(
+    "_metrics_native",
+    """
+    #include <stddef.h>
+    #include <stdint.h>
+
+    void update_size_count_error(const uint32_t *sizes, const uint8_t *errors, size_t n, int64_t *state);
+    void update_protohist(const uint8_t *protocol_ids, size_t n, int64_t *hist);
+    """,
+    sources=["metrics_native.c"],
+    extra_compile_args=["-O3", "-march=native", "-ftree-vectorize"],
+)
+
+
+if __name__ == "__main__":
+    # Build next to metrics_kernel so that it can import the extension
+    os.chdir(_SOURCE_DIR)
+    ffibuilder.compile(verbose=True)
@@ -9,11 +9,31 @@ It encapsulates Redis client interactions and handles version differences and er
 handling in a consistent way.
 """
 
+import json
 import logging
 import os
+import queue
 import redis
+import socket
+import threading
 import time
-from typing import Any, Dict, List, Optional, Set, Tuple, Union
+import weakref
+from contextlib import contextmanager
+from redis.backoff import EqualJitterBackoff
+from redis.retry import Retry
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+# redis-py parses replies with hiredis, in C, whenever it is installed
+try:
+    from redis.utils import HIREDIS_AVAILABLE
+except ImportError:
+    HIREDIS_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -22,15 +42,174 @@ logger = logging.getLogger(__name__)
 KeyT = Union[str, bytes]
 ValueT = Union[str, bytes, int, float]
 
+# First byte of values stored by encode_value(), naming their format, values
+# without one are raw data as stored by the plain Redis commands
+VALUE_FORMAT_MSGPACK = b"\x01"
+VALUE_FORMAT_JSON = b"\x02"
+
+# Connection pools shared by RedisClient instances with the same settings,
+# and the number of instances using each of them
+_POOL_REGISTRY: Dict[Tuple, redis.BlockingConnectionPool] = {}
+_POOL_USERS: Dict[Tuple, int] = {}
+_POOL_LOCK = threading.Lock()
+
+# TCP keepalive probes after a minute of idling, so that connections dropped
+# by NAT or firewalls are noticed and replaced before they are needed, the
+# options are only set where the platform has them
+DEFAULT_KEEPALIVE_OPTIONS: Dict[int, int] = {
+    getattr(socket, name): value
+    for name, value in (('TCP_KEEPIDLE', 60), ('TCP_KEEPINTVL', 10), ('TCP_KEEPCNT', 3))
+    if hasattr(socket, name)
+}
+
+
+class _Retry(Retry):
+    """Retry policy that gives up right away on errors retrying cannot fix."""
+    
+    def call_with_retry(self, do, fail, *args, **kwargs):
+        def fail_unless_recoverable(error, *fail_args):
+            fail(error, *fail_args)
+            # Authentication errors are connection errors, but won't go away
+            if isinstance(error, redis.AuthenticationError):
+                raise error
+        return super().call_with_retry(do, fail_unless_recoverable, *args, **kwargs)
+
+
+def _release_pool(key: Tuple) -> None:
+    """
+    Release a shared connection pool, disconnecting it once it is unused.
+    
+    Args:
+        key: Registry key of the pool
+    """
+    with _POOL_LOCK:
+        _POOL_USERS[key] -= 1
+        if _POOL_USERS[key]:
+            return
+        del _POOL_USERS[key]
+        pool = _POOL_REGISTRY.pop(key)
+    
+    try:
+        pool.disconnect()
+    except Exception:
+        pass
+
+
+def encode_value(value: Any) -> bytes:
+    """
+    Encode a value for storage, as MessagePack or as JSON without msgpack.
+    
+    The encoding is prefixed with its format id, so that decode_value() can
+    tell it from raw data and values keep decoding after msgpack is
+    installed or removed. Keys can therefore be migrated one at a time.
+    
+    Args:
+        value: Value to encode, made of dicts, lists, strings and numbers
+        
+    Returns:
+        The format id followed by the encoded value
+    """
+    if MSGPACK_AVAILABLE:
+        return VALUE_FORMAT_MSGPACK + msgpack.packb(value, use_bin_type=True)
+    return VALUE_FORMAT_JSON + json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def decode_value(data: Optional[bytes]) -> Any:
+    """
+    Decode a value stored by encode_value().
+    
+    Args:
+        data: Stored value, None for a missing key
+        
+    Returns:
+        The decoded value, data itself if it is raw or None
+    """
+    if not isinstance(data, bytes):
+        return data
+    value_format = data[:1]
+    if value_format == VALUE_FORMAT_MSGPACK:
+        if not MSGPACK_AVAILABLE:
+            raise ValueError("MessagePack value found but msgpack is not installed")
+        return msgpack.unpackb(data[1:], raw=False)
+    if value_format == VALUE_FORMAT_JSON:
+        return json.loads(data[1:])
+    return data
+
+
+# Queue entries asking the write flusher to send its batch right away, or to
+# send it and stop
+_FLUSH = object()
+_STOP = object()
+
+
+def _run_write_flusher(write_queue: queue.Queue, client: redis.Redis, single_attempt_client: redis.Redis,
+                       batch_size: int, flush_interval: float) -> None:
+    """
+    Send queued writes in pipelines until asked to stop.
+    
+    A batch is sent once it holds batch_size commands, flush_interval seconds
+    after its first command was queued, or when a flush is requested. The
+    thread holds no reference to the RedisClient, so that the client can
+    still be garbage collected while it runs.
+    
+    Args:
+        write_queue: Queue of (method, args, kwargs) tuples and markers
+        client: redis-py client for batches of idempotent commands
+        single_attempt_client: redis-py client for batches with NON_IDEMPOTENT
+            commands, which must not be resent
+        batch_size: Maximum number of commands per pipeline
+        flush_interval: Maximum time in seconds a command waits in the queue
+    """
+    stop = False
+    while not stop:
+        entry = write_queue.get()
+        entries = [entry]
+        deadline = time.monotonic() + flush_interval
+        while entry is not _FLUSH and entry is not _STOP and len(entries) < batch_size:
+            try:
+                entry = write_queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            entries.append(entry)
+        stop = entry is _STOP
+        
+        commands = [entry for entry in entries if entry is not _FLUSH and entry is not _STOP]
+        if commands:
+            retryable = all(method not in RedisClient.NON_IDEMPOTENT for method, _, _ in commands)
+            pipe = (client if retryable else single_attempt_client).pipeline(transaction=False)
+            try:
+                for method, args, kwargs in commands:
+                    getattr(pipe, method)(*args, **kwargs)
+                errors = [result for result in pipe.execute(raise_on_error=False)
+                          if isinstance(result, Exception)]
+                if errors:
+                    logger.error(f"{len(errors)} of {len(commands)} queued writes failed: {errors[0]}")
+            except Exception as e:
+                logger.error(f"Failed to send {len(commands)} queued writes: {e}")
+            finally:
+                pipe.reset()
+        
+        for _ in entries:
+            write_queue.task_done()
+
 
 class RedisClient:
     """
     A wrapper around the Redis client to provide consistent interface and error handling.
     
     This class encapsulates all Redis operations used in BACmon and handles
-    connection management, retries, and error handling uniformly.
+    connection management, retries, and error handling uniformly. Redis
+    commands are forwarded to the redis-py client as is, only helpers that
+    do more than a single command are implemented here.
     """
     
+    # Commands that change the data relative to its current state, which are
+    # not retried since a command may have run before its connection failed
+    NON_IDEMPOTENT = frozenset({
+        'incr', 'incrby', 'incrbyfloat', 'decr', 'decrby', 'lpush', 'rpush',
+        'sadd', 'srem', 'hset', 'hincrby', 'delete', 'flushdb'
+    })
+    
     def __init__(
         self, 
         host: str = 'localhost',
@@ -42,7 +221,18 @@ class RedisClient:
         retry_on_timeout: bool = True,
         max_retries: int = 3,
         decode_responses: bool = False,
-        health_check_interval: int = 30
+        health_check_interval: int = 30,
+        backoff_base: float = 0.1,
+        backoff_cap: float = 20.0,
+        max_connections: int = 50,
+        pool_timeout: float = 1.0,
+        verify_on_connect: bool = True,
+        unix_socket_path: Optional[str] = None,
+        socket_keepalive: bool = True,
+        socket_keepalive_options: Optional[Dict[int, int]] = None,
+        client_name: Optional[str] = 'bacmon',
+        write_batch_size: int = 1000,
+        write_flush_interval: float = 0.05
     ):
         """
         Initialize the Redis client with the given parameters.
@@ -58,6 +248,28 @@ class RedisClient:
             max_retries: Maximum number of retries for operations
             decode_responses: Whether to decode Redis responses to strings
             health_check_interval: Interval for connection health checks
+            backoff_base: Delay before the first retry in seconds, doubled
+                per retry, of which a random half is added so that clients
+                retry out of step
+            backoff_cap: Maximum delay between retries in seconds
+            max_connections: Maximum number of connections of the pool
+            pool_timeout: Time to wait for a free connection of the pool
+                before raising a ConnectionError
+            verify_on_connect: Whether to ping the server right away, instead
+                of connecting on the first command
+            unix_socket_path: Path of the server's Unix domain socket, used
+                instead of host and port for a local server
+            socket_keepalive: Whether to enable TCP keepalive on connections
+            socket_keepalive_options: TCP keepalive socket options, defaults
+                to DEFAULT_KEEPALIVE_OPTIONS
+            client_name: Name set with CLIENT SETNAME on every connection,
+                shown by CLIENT LIST on the server
+            write_batch_size: Maximum number of queued writes sent in one
+                pipeline by enqueue_write()
+            write_flush_interval: Maximum time in seconds a queued write
+                waits before it is sent
+        
+        Clients with the same settings share one connection pool.
         """
         self.host = host
         self.port = port
@@ -69,197 +281,412 @@ class RedisClient:
         self.max_retries = max_retries
         self.decode_responses = decode_responses
         self.health_check_interval = health_check_interval
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.max_connections = max_connections
+        self.pool_timeout = pool_timeout
+        self.unix_socket_path = unix_socket_path
+        self.socket_keepalive = socket_keepalive
+        self.socket_keepalive_options = (
+            DEFAULT_KEEPALIVE_OPTIONS if socket_keepalive_options is None else socket_keepalive_options
+        )
+        self.client_name = client_name
+        self.write_batch_size = write_batch_size
+        self.write_flush_interval = write_flush_interval
+        
+        # Initialize Redis client, which takes its retry policy from the pool
+        self._finalizers: List[weakref.finalize] = []
+        self.connection_pool = self._acquire_pool(self.decode_responses, self.max_retries)
+        self._client = redis.Redis(connection_pool=self.connection_pool)
+        # Clients for other settings, created on first use under the lock so
+        # that concurrent callers share one client and its pool reference
+        self._decoded_client: Optional[redis.Redis] = None
+        self._single_attempt_client: Optional[redis.Redis] = None
+        self._raw_client: Optional[redis.Redis] = None
+        self._clients_lock = threading.Lock()
+        self._write_queue: Optional[queue.Queue] = None
+        self._write_queue_lock = threading.Lock()
+        
+        # Test connection
+        if verify_on_connect:
+            self.ping()
+        logger.debug(f"Redis connection established to {self.unix_socket_path or f'{self.host}:{self.port}'}/{self.db}"
+                     f" ({'hiredis' if HIREDIS_AVAILABLE else 'Python'} parser)")
+
+    def _acquire_pool(self, decode_responses: bool, max_retries: int) -> redis.BlockingConnectionPool:
+        """
+        Get the shared connection pool for the client settings.
+        
+        The pool is released when this client is garbage collected.
         
-        # Initialize Redis connection pool
-        self.connection_pool = redis.ConnectionPool(
-            host=self.host,
-            port=self.port,
+        Args:
+            decode_responses: Whether the connections decode responses to strings
+            max_retries: Maximum number of retries of failed commands
+            
+        Returns:
+            The connection pool
+        """
+        # Connection and timeout errors are retried by the connection layer
+        retry_on_error = [redis.ConnectionError, redis.BusyLoadingError]
+        if self.retry_on_timeout:
+            retry_on_error.append(redis.TimeoutError)
+        
+        pool_key = (
+            self.host, self.port, self.unix_socket_path, self.db, self.password, self.socket_timeout,
+            self.socket_connect_timeout, self.health_check_interval, decode_responses,
+            self.retry_on_timeout, max_retries, self.backoff_base, self.backoff_cap,
+            self.max_connections, self.pool_timeout, self.socket_keepalive,
+            tuple(sorted(self.socket_keepalive_options.items())), self.client_name
+        )
+        # A local server is reached through its Unix socket, bypassing TCP
+        if self.unix_socket_path:
+            address = {
+                'connection_class': redis.UnixDomainSocketConnection,
+                'path': self.unix_socket_path
+            }
+        else:
+            # Keepalive only applies to TCP connections
+            address = {
+                'host': self.host,
+                'port': self.port,
+                'socket_keepalive': self.socket_keepalive,
+                'socket_keepalive_options': self.socket_keepalive_options
+            }
+        
+        pool = self._get_pool(
+            pool_key,
+            **address,
             db=self.db,
             password=self.password,
             socket_timeout=self.socket_timeout,
             socket_connect_timeout=self.socket_connect_timeout,
             health_check_interval=self.health_check_interval,
-            decode_responses=self.decode_responses
+            client_name=self.client_name,
+            decode_responses=decode_responses,
+            retry=_Retry(
+                EqualJitterBackoff(cap=self.backoff_cap, base=self.backoff_base),
+                max_retries,
+                supported_errors=tuple(retry_on_error)
+            ),
+            retry_on_error=retry_on_error,
+            max_connections=self.max_connections,
+            timeout=self.pool_timeout
         )
+        self._finalizers.append(weakref.finalize(self, _release_pool, pool_key))
+        return pool
+    
+    def close(self) -> None:
+        """
+        Send the queued writes and release the connection pools of this client.
         
-        # Initialize Redis client
-        self._client = redis.Redis(
-            connection_pool=self.connection_pool,
-            retry_on_timeout=self.retry_on_timeout,
-            max_retries=self.max_retries
-        )
+        Shared pools are only disconnected once no other client uses them.
+        Closing is idempotent and also happens when the client is garbage
+        collected or at interpreter exit.
+        """
+        self.flush_writes()
+        for finalizer in self._finalizers:
+            finalizer()
+        self._write_queue = None
+    
+    @classmethod
+    def _get_pool(cls, key: Tuple, **kwargs: Any) -> redis.BlockingConnectionPool:
+        """
+        Get the shared connection pool for a set of settings, creating it if needed.
         
-        # Test connection
-        self.ping()
-        logger.debug(f"Redis connection established to {self.host}:{self.port}/{self.db}")
-
-    def __del__(self):
-        """Clean up resources when the object is destroyed."""
-        try:
-            self.connection_pool.disconnect()
-        except Exception:
-            pass
+        The pools are bounded, callers wait for a free connection when all
+        of them are in use instead of opening more.
+        
+        Every call must be paired with a call of _release_pool().
+        
+        Args:
+            key: Registry key of the pool, covering all settings in kwargs
+            **kwargs: Arguments for creating the pool
+            
+        Returns:
+            The connection pool
+        """
+        with _POOL_LOCK:
+            pool = _POOL_REGISTRY.get(key)
+            if pool is None:
+                pool = _POOL_REGISTRY[key] = redis.BlockingConnectionPool(**kwargs)
+            _POOL_USERS[key] = _POOL_USERS.get(key, 0) + 1
+            return pool
 
-    def _execute_with_retry(self, method_name: str, *args, **kwargs) -> Any:
+    def __getattr__(self, name: str) -> Any:
         """
-        Execute a Redis command with retry logic.
+        Forward Redis commands to the underlying redis-py client.
+        
+        Connection errors, and timeouts if enabled, are retried with jittered
+        exponential backoff by the connection layer of redis-py, so errors
+        raised by the commands are final. NON_IDEMPOTENT commands are sent
+        once, through connections without retries, so that a counter is never
+        incremented twice when the connection fails after the command ran.
+        The bound method is cached on the instance, so later calls bypass
+        this method entirely.
         
         Args:
-            method_name: Name of the Redis method to execute
-            *args: Positional arguments for the method
-            **kwargs: Keyword arguments for the method
+            name: Name of the Redis command method, e.g. 'get' or 'pipeline'
             
         Returns:
-            The result of the Redis command
+            The bound method of the redis-py client
+        """
+        if name.startswith('_'):
+            # Private attributes, e.g. _client before __init__ completed
+            raise AttributeError(name)
+        if name in self.NON_IDEMPOTENT:
+            method = getattr(self._get_single_attempt_client(), name)
+        else:
+            method = getattr(self._client, name)
+        self.__dict__[name] = method
+        return method
+    
+    def _get_single_attempt_client(self) -> redis.Redis:
+        """Get the redis-py client used for commands that must not be retried."""
+        if self._single_attempt_client is None:
+            with self._clients_lock:
+                if self._single_attempt_client is None:
+                    self._single_attempt_client = redis.Redis(
+                        connection_pool=self._acquire_pool(self.decode_responses, 0)
+                    )
+        return self._single_attempt_client
+    
+    def __dir__(self) -> List[str]:
+        """List the wrapper's own attributes and the forwarded Redis commands."""
+        return sorted(set(super().__dir__()) | set(dir(self._client)))
+    
+    @property
+    def decoded(self) -> redis.Redis:
+        """
+        A redis-py client for the same server that decodes responses to strings.
         
-        Raises:
-            redis.RedisError: If the command fails after all retries
+        Decoding happens in the connection layer, in C when hiredis is
+        installed, instead of per value in Python. Unless this client
+        decodes responses itself, the decoding client uses a pool of its own.
         """
-        method = getattr(self._client, method_name)
-        retries = 0
-        last_error = None
+        if self.decode_responses:
+            return self._client
+        if self._decoded_client is None:
+            with self._clients_lock:
+                if self._decoded_client is None:
+                    self._decoded_client = redis.Redis(
+                        connection_pool=self._acquire_pool(True, self.max_retries)
+                    )
+        return self._decoded_client
+    
+    def hgetall_str(self, key: KeyT) -> Dict[str, str]:
+        """Get all the fields and values in a hash, decoded to strings."""
+        return self.decoded.hgetall(key)
+    
+    def _sum_chunked(self, client: redis.Redis, command: str, prefix: Tuple,
+                     items: Tuple, chunk: int) -> int:
+        """
+        Run a variadic command over items in chunks, summing the integer replies.
         
-        while retries <= self.max_retries:
-            try:
-                return method(*args, **kwargs)
-            except (redis.ConnectionError, redis.TimeoutError) as e:
-                retries += 1
-                last_error = e
-                if retries <= self.max_retries:
-                    sleep_time = 0.1 * (2 ** retries)  # Exponential backoff
-                    logger.warning(f"Redis operation failed, retrying in {sleep_time:.2f}s: {e}")
-                    time.sleep(sleep_time)
-                else:
-                    logger.error(f"Redis operation failed after {retries} retries: {e}")
-                    raise
-            except redis.RedisError as e:
-                logger.error(f"Redis error during {method_name}: {e}")
-                raise
-        
-        # This should never happen, but just in case
-        if last_error:
-            raise last_error
-        else:
-            raise redis.RedisError(f"Unknown error in Redis operation {method_name}")
-
-    def ping(self) -> bool:
+        Args:
+            client: redis-py client to run the command with
+            command: Name of the command method, e.g. 'delete'
+            prefix: Arguments preceding the items, e.g. the key of a set
+            items: Items to pass to the command
+            chunk: Maximum number of items per command
+            
+        Returns:
+            Sum of the replies of all commands
+        """
+        if len(items) <= chunk:
+            return getattr(client, command)(*prefix, *items)
+        
+        pipe = client.pipeline(transaction=False)
+        method = getattr(pipe, command)
+        for start in range(0, len(items), chunk):
+            method(*prefix, *items[start:start + chunk])
+        return sum(pipe.execute())
+    
+    def delete(self, *keys: KeyT, chunk: int = 500) -> int:
         """
-        Test connection to Redis server.
+        Delete one or more keys.
+        
+        Long key lists are split into DEL commands of at most chunk keys,
+        sent in one pipeline, so that no single command blocks the server.
         
         Returns:
-            True if the connection is alive
-            
-        Raises:
-            redis.ConnectionError: If connection cannot be established
+            Number of keys deleted
         """
-        return self._execute_with_retry('ping')
-
-    # Key-value operations
-    def get(self, key: KeyT) -> Optional[bytes]:
-        """Get the value of a key."""
-        return self._execute_with_retry('get', key)
-    
-    def set(self, key: KeyT, value: ValueT, ex: Optional[int] = None, 
-            px: Optional[int] = None, nx: bool = False, xx: bool = False) -> bool:
-        """Set the value of a key with optional expiration."""
-        return self._execute_with_retry('set', key, value, ex=ex, px=px, nx=nx, xx=xx)
-    
-    def delete(self, *keys: KeyT) -> int:
-        """Delete one or more keys."""
-        return self._execute_with_retry('delete', *keys)
-    
-    def exists(self, *keys: KeyT) -> int:
-        """Check if one or more keys exist."""
-        return self._execute_with_retry('exists', *keys)
-    
-    def expire(self, key: KeyT, time: int) -> bool:
-        """Set a key's time to live in seconds."""
-        return self._execute_with_retry('expire', key, time)
-    
-    def ttl(self, key: KeyT) -> int:
-        """Get the time to live for a key in seconds."""
-        return self._execute_with_retry('ttl', key)
-
-    # Set operations
-    def sadd(self, key: KeyT, *members: ValueT) -> int:
-        """Add one or more members to a set."""
-        return self._execute_with_retry('sadd', key, *members)
-    
-    def smembers(self, key: KeyT) -> Set[bytes]:
-        """Get all members in a set."""
-        return self._execute_with_retry('smembers', key)
-    
-    def srem(self, key: KeyT, *members: ValueT) -> int:
-        """Remove one or more members from a set."""
-        return self._execute_with_retry('srem', key, *members)
-    
-    def sismember(self, key: KeyT, member: ValueT) -> bool:
-        """Check if member is in set."""
-        return self._execute_with_retry('sismember', key, member)
-
-    # List operations
-    def lpush(self, key: KeyT, *values: ValueT) -> int:
-        """Prepend one or more values to a list."""
-        return self._execute_with_retry('lpush', key, *values)
-    
-    def rpush(self, key: KeyT, *values: ValueT) -> int:
-        """Append one or more values to a list."""
-        return self._execute_with_retry('rpush', key, *values)
-    
-    def lrange(self, key: KeyT, start: int, end: int) -> List[bytes]:
-        """Get a range of elements from a list."""
-        return self._execute_with_retry('lrange', key, start, end)
-    
-    def llen(self, key: KeyT) -> int:
-        """Get the length of a list."""
-        return self._execute_with_retry('llen', key)
-    
-    def ltrim(self, key: KeyT, start: int, end: int) -> bool:
-        """Trim a list to the specified range."""
-        return self._execute_with_retry('ltrim', key, start, end)
-
-    # Hash operations
-    def hset(self, key: KeyT, field: ValueT, value: ValueT) -> int:
-        """Set the string value of a hash field."""
-        return self._execute_with_retry('hset', key, field, value)
+        return self._sum_chunked(self._get_single_attempt_client(), 'delete', (), keys, chunk)
+    
+    def exists(self, *keys: KeyT, chunk: int = 500) -> int:
+        """Count how many of the keys exist, in commands of at most chunk keys."""
+        return self._sum_chunked(self._client, 'exists', (), keys, chunk)
+    
+    def sadd(self, key: KeyT, *members: ValueT, chunk: int = 500) -> int:
+        """Add members to a set, in commands of at most chunk members."""
+        return self._sum_chunked(self._get_single_attempt_client(), 'sadd', (key,), members, chunk)
     
-    def hget(self, key: KeyT, field: ValueT) -> Optional[bytes]:
-        """Get the value of a hash field."""
-        return self._execute_with_retry('hget', key, field)
+    def srem(self, key: KeyT, *members: ValueT, chunk: int = 500) -> int:
+        """Remove members from a set, in commands of at most chunk members."""
+        return self._sum_chunked(self._get_single_attempt_client(), 'srem', (key,), members, chunk)
     
     def hmset(self, key: KeyT, mapping: Dict[ValueT, ValueT]) -> bool:
-        """Set multiple hash fields to multiple values."""
-        return self._execute_with_retry('hmset', key, mapping)
+        """Set multiple hash fields to multiple values, with HSET rather than the deprecated HMSET."""
+        self.hset(key, mapping=mapping)
+        return True
     
-    def hgetall(self, key: KeyT) -> Dict[bytes, bytes]:
-        """Get all the fields and values in a hash."""
-        return self._execute_with_retry('hgetall', key)
-
-    # Counter operations
-    def incr(self, key: KeyT, amount: int = 1) -> int:
-        """Increment the integer value of a key by the given amount."""
-        return self._execute_with_retry('incr', key, amount)
-    
-    def decr(self, key: KeyT, amount: int = 1) -> int:
-        """Decrement the integer value of a key by the given amount."""
-        return self._execute_with_retry('decr', key, amount)
+    def mget_many(self, keys: Iterable[KeyT], chunk: int = 500) -> List[Optional[bytes]]:
+        """
+        Get the values of any number of keys in a single round trip.
+        
+        The keys are split into MGET commands of at most chunk keys each,
+        which are sent together in one pipeline.
+        
+        Args:
+            keys: Keys to get
+            chunk: Maximum number of keys per MGET command
+            
+        Returns:
+            List of values, in the order of the keys, None for missing keys
+        """
+        keys = list(keys)
+        if len(keys) <= chunk:
+            return self.mget(keys) if keys else []
+        
+        pipe = self.pipeline(transaction=False)
+        for start in range(0, len(keys), chunk):
+            pipe.mget(keys[start:start + chunk])
+        
+        values = []
+        for chunk_values in pipe.execute():
+            values.extend(chunk_values)
+        return values
 
-    # Server operations
-    def info(self, section: Optional[str] = None) -> Dict[str, Any]:
-        """Get information and statistics about the server."""
-        return self._execute_with_retry('info', section)
+    @contextmanager
+    def pipeline_batch(self, transaction: bool = False) -> Iterator[Any]:
+        """
+        Queue commands in a pipeline and send them in one round trip on exit.
+        
+        The pipeline is executed when the block completes and discarded if
+        it raises. Like single commands, the whole batch is resent after a
+        connection error, so a batch may be applied twice if the connection
+        drops after the server ran it: prefer idempotent commands (SET,
+        HSET, LTRIM) over INCR or LPUSH where that matters. Use pipeline()
+        directly when the replies are needed.
+        
+        Args:
+            transaction: Whether to wrap the commands in MULTI/EXEC
+            
+        Yields:
+            Redis pipeline object to queue commands on
+        """
+        pipe = self._client.pipeline(transaction=transaction)
+        try:
+            yield pipe
+            pipe.execute()
+        finally:
+            pipe.reset()
     
-    def dbsize(self) -> int:
-        """Get the number of keys in the selected database."""
-        return self._execute_with_retry('dbsize')
+    def set_value(self, key: KeyT, value: Any, **kwargs: Any) -> Optional[bool]:
+        """
+        Store a value encoded with encode_value().
+        
+        Args:
+            key: Key to set
+            value: Value to store
+            **kwargs: Options of SET, e.g. ex or nx
+            
+        Returns:
+            The reply of SET
+        """
+        return self._client.set(key, encode_value(value), **kwargs)
     
-    def flushdb(self) -> bool:
-        """Remove all keys from the current database."""
-        return self._execute_with_retry('flushdb')
+    def get_value(self, key: KeyT) -> Any:
+        """Get a value stored by set_value(), None if the key does not exist."""
+        return decode_value(self._get_raw_client().get(key))
     
-    def type(self, key: KeyT) -> str:
-        """Get the type stored at key."""
-        return self._execute_with_retry('type', key)
+    def hset_values(self, name: KeyT, mapping: Dict[KeyT, Any]) -> int:
+        """
+        Store hash fields encoded with encode_value().
+        
+        Args:
+            name: Key of the hash
+            mapping: Field names and values
+            
+        Returns:
+            Number of fields added
+        """
+        return self.hset(name, mapping={field: encode_value(value) for field, value in mapping.items()})
+    
+    def hget_value(self, name: KeyT, field: KeyT) -> Any:
+        """Get a hash field stored by hset_values(), None if it does not exist."""
+        return decode_value(self._get_raw_client().hget(name, field))
+    
+    def rpush_values(self, key: KeyT, *values: Any) -> int:
+        """
+        Append values encoded with encode_value() to a list.
+        
+        Args:
+            key: Key of the list
+            *values: Values to append
+            
+        Returns:
+            Length of the list after the push
+        """
+        return self.rpush(key, *map(encode_value, values))
+    
+    def lrange_values(self, key: KeyT, start: int, end: int) -> List[Any]:
+        """Get a range of a list appended to by rpush_values()."""
+        return list(map(decode_value, self._get_raw_client().lrange(key, start, end)))
+    
+    def _get_raw_client(self) -> redis.Redis:
+        """Get a redis-py client returning bytes, for reading encoded values."""
+        if not self.decode_responses:
+            return self._client
+        if self._raw_client is None:
+            with self._clients_lock:
+                if self._raw_client is None:
+                    self._raw_client = redis.Redis(connection_pool=self._acquire_pool(False, self.max_retries))
+        return self._raw_client
+    
+    def enqueue_write(self, method: str, *args: Any, **kwargs: Any) -> None:
+        """
+        Queue a write to be sent in the background, without waiting for its reply.
+        
+        A flusher thread, started on the first call, sends the queued writes
+        in pipelines of up to write_batch_size commands at least every
+        write_flush_interval seconds, so many small writes share a round
+        trip. Failed writes are logged and dropped. Batches are resent after
+        a connection error unless they contain NON_IDEMPOTENT commands, so
+        idempotent commands are the safest choice here. When the queue is
+        full, the call waits for the flusher to catch up.
+        
+        Args:
+            method: Name of the Redis command method, e.g. 'set' or 'incr'
+            *args: Positional arguments of the command
+            **kwargs: Keyword arguments of the command
+        """
+        if not hasattr(redis.Redis, method):
+            raise AttributeError(f"Unknown Redis command: {method}")
+        self._get_write_queue().put((method, args, kwargs))
+    
+    def flush_writes(self) -> None:
+        """Send the queued writes right away and wait until they are done."""
+        if self._write_queue is not None:
+            self._write_queue.put(_FLUSH)
+            self._write_queue.join()
+    
+    def _get_write_queue(self) -> queue.Queue:
+        """Get the queue of enqueue_write(), starting its flusher thread if needed."""
+        with self._write_queue_lock:
+            if self._write_queue is None:
+                write_queue: queue.Queue = queue.Queue(maxsize=10 * self.write_batch_size)
+                threading.Thread(
+                    target=_run_write_flusher,
+                    args=(write_queue, self._client, self._get_single_attempt_client(),
+                          self.write_batch_size, self.write_flush_interval),
+                    name='redis-write-flusher',
+                    daemon=True
+                ).start()
+                # Stop the thread, after it sent the queued writes, with the client
+                self._finalizers.insert(0, weakref.finalize(self, write_queue.put, _STOP))
+                self._write_queue = write_queue
+            return self._write_queue
     
     def get_timestamp(self) -> int:
         """Get the current timestamp."""
@@ -285,46 +712,88 @@ class RedisClient:
             Memory usage in bytes, or None if not available
         """
         try:
-            return self._execute_with_retry('memory_usage', key)
+            return self._client.memory_usage(key)
         except (redis.RedisError, AttributeError):
             # MEMORY USAGE command not available in older Redis versions
             return None
     
-    def scan_keys(self, pattern: str = "*", count: int = 1000) -> List[str]:
+    def iter_keys_bytes(self, pattern: str = "*", count: int = 1000,
+                        max_count: int = 65536) -> Iterator[KeyT]:
+        """
+        Iterate over the keys matching a pattern as returned by the server.
+        
+        The keys are bytes unless the client decodes responses, ready to be
+        passed back to commands such as delete() without re-encoding.
+        
+        The count hint is doubled, up to max_count, while SCAN returns on
+        average less than a tenth of it per call, so that a narrow pattern
+        over a large database takes fewer round trips.
+        
+        Args:
+            pattern: Pattern to match keys against
+            count: Initial hint for number of elements to return per iteration
+            max_count: Maximum hint for number of elements per iteration
+            
+        Yields:
+            Matching keys, one SCAN batch at a time
+            
+        Raises:
+            redis.RedisError: If a SCAN command fails
+        """
+        scan = self._client.scan
+        cursor = 0
+        returned_total = 0
+        cursor_iters = 0
+        while True:
+            cursor, batch_keys = scan(cursor, match=pattern, count=count)
+            yield from batch_keys
+            
+            if cursor == 0:
+                break
+            
+            returned_total += len(batch_keys)
+            cursor_iters += 1
+            if count < max_count and returned_total * 10 < count * cursor_iters:
+                count = min(count * 2, max_count)
+    
+    def iter_keys(self, pattern: str = "*", count: int = 1000, max_count: int = 65536) -> Iterator[str]:
+        """
+        Iterate over the keys matching a pattern, one SCAN batch at a time.
+        
+        Args:
+            pattern: Pattern to match keys against
+            count: Initial hint for number of elements to return per iteration
+            max_count: Maximum hint for number of elements per iteration
+            
+        Yields:
+            Matching keys, decoded to strings
+            
+        Raises:
+            redis.RedisError: If a SCAN command fails
+        """
+        keys = self.iter_keys_bytes(pattern, count, max_count)
+        if self.decode_responses:
+            return keys
+        return map(bytes.decode, keys)
+    
+    def scan_keys(self, pattern: str = "*", count: int = 1000, max_count: int = 65536) -> List[str]:
         """
         Scan for keys matching a pattern.
         
         Args:
             pattern: Pattern to match keys against
-            count: Hint for number of elements to return per iteration
+            count: Initial hint for number of elements to return per iteration
+            max_count: Maximum hint for number of elements per iteration
             
         Returns:
             List of matching keys
         """
         try:
-            cursor = 0
-            keys = []
-            while True:
-                cursor, batch_keys = self._execute_with_retry('scan', cursor, match=pattern, count=count)
-                if isinstance(batch_keys, list):
-                    keys.extend([key.decode('utf-8') if isinstance(key, bytes) else str(key) for key in batch_keys])
-                
-                if cursor == 0:
-                    break
-            return keys
+            return list(self.iter_keys(pattern, count, max_count))
         except Exception as e:
             logger.error(f"Failed to scan keys with pattern {pattern}: {e}")
             return []
     
-    def pipeline(self):
-        """
-        Create a Redis pipeline for batch operations.
-        
-        Returns:
-            Redis pipeline object
-        """
-        return self._client.pipeline()
-    
     def get_connection_info(self) -> Dict[str, Any]:
         """
         Get information about the Redis connection.
@@ -335,12 +804,21 @@ class RedisClient:
         return {
             'host': self.host,
             'port': self.port,
+            'unix_socket_path': self.unix_socket_path,
             'db': self.db,
             'socket_timeout': self.socket_timeout,
             'socket_connect_timeout': self.socket_connect_timeout,
             'max_retries': self.max_retries,
+            'backoff_base': self.backoff_base,
+            'backoff_cap': self.backoff_cap,
+            'max_connections': self.max_connections,
+            'pool_timeout': self.pool_timeout,
+            'socket_keepalive': self.socket_keepalive,
+            'client_name': self.client_name,
             'decode_responses': self.decode_responses,
-            'health_check_interval': self.health_check_interval
+            'health_check_interval': self.health_check_interval,
+            'hiredis': HIREDIS_AVAILABLE,
+            'msgpack': MSGPACK_AVAILABLE
         }
 
 
@@ -368,6 +846,17 @@ def create_redis_client(config=None) -> RedisClient:
         'socket_connect_timeout': 5.0,
         'retry_on_timeout': True,
         'max_retries': 3,
+        'backoff_base': 0.1,
+        'backoff_cap': 20.0,
+        'max_connections': 50,
+        'pool_timeout': 1.0,
+        'verify_on_connect': True,
+        'unix_socket_path': None,
+        'socket_keepalive': True,
+        'socket_keepalive_options': None,
+        'client_name': 'bacmon',
+        'write_batch_size': 1000,
+        'write_flush_interval': 0.05,
         'decode_responses': False,  # Keep binary responses for compatibility with existing code
         'health_check_interval': 30
     }
@@ -9,17 +9,38 @@ rate monitoring system, including data compression, retention policies,
 time-series optimizations, and memory management.
 """
 
+import bisect
+import fnmatch
 import json
 import logging
+import operator
+import re
+import statistics
+import struct
 import time
 import zlib
-from collections import defaultdict, deque
+from collections import OrderedDict, defaultdict, deque
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Set, Tuple, Union, Callable
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union, Callable
 import math
 import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 
+import numpy as np
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import zstandard as zstd
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 # Type aliases
@@ -28,6 +49,40 @@ ValueT = Union[int, float, str, bytes]
 TimeSeriesPoint = Tuple[TimestampT, ValueT]
 AggregationFunc = Callable[[List[ValueT]], ValueT]
 
+# Redis key of the shared zstd dictionary, so that every process compressing
+# or reading time-series data uses the same one. Every dictionary is also kept
+# under this key followed by ":" and its id, which zstd frames record, so
+# data compressed with an earlier one stays readable
+COMPRESSION_DICTIONARY_KEY = "redis_optimizer:zstd_dictionary"
+
+# Marker of data stored uncompressed
+RAW_MARKER = b'RAW:'
+
+# Marker of points encoded with MessagePack, points without it are JSON
+MSGPACK_MARKER = b'MPCK:'
+
+# Marker of list entries holding a block of points, and the fixed-width
+# point layouts of blocks by their format code, other blocks are JSON
+BLOCK_MARKER = b'BLOCK:'
+BLOCK_FORMATS = {
+    b'q': struct.Struct('<qq'),  # Integer timestamps and values
+    b'd': struct.Struct('<dd')   # Numeric timestamps and values
+}
+
+# Integer types bounding the values quantized in blocks, by their name.
+# Quantized blocks hold the scale of their values, flags and the number of
+# points, then the timestamps in milliseconds and the values multiplied by
+# the scale as zig-zag varints. Timestamps are stored as differences to the
+# previous one, values too with DELTA_VALUES
+VALUE_DTYPES = {'int16': np.dtype('<i2'), 'int32': np.dtype('<i4')}
+DELTA_BLOCK_CODE = b'z'
+DELTA_HEADER = struct.Struct('<IBI')
+DELTA_VALUES = 0x01
+
+# Time-series storage types, and the field of stream entries holding the point
+STORAGE_TYPES = ("list", "stream")
+STREAM_FIELD = "p"
+
 
 @dataclass
 class RetentionPolicy:
@@ -43,6 +98,18 @@ class RetentionPolicy:
     aggregation_func: str = "avg"  # avg, max, min, sum, count, first, last
     compression_enabled: bool = True
     auto_cleanup: bool = True
+    # "window" aggregates points older than duration_seconds into windows of
+    # resolution_seconds, "binary_ladder" into windows starting at
+    # resolution_seconds and doubling in size with age
+    policy_type: str = "window"
+    # Integer type values are stored as in blocks, "int16" or "int32" after
+    # multiplying them by value_scale, "float64" to never quantize them, or
+    # None to quantize them only when they are integers that fit
+    value_dtype: Optional[str] = None
+    value_scale: int = 1
+    # Whether to store differences between consecutive values in blocks,
+    # for counters
+    value_delta_encode: bool = False
 
 
 @dataclass
@@ -58,24 +125,283 @@ class StorageStats:
     data_points_aggregated: int = 0
 
 
+@dataclass(eq=False)
+class TimeSeriesBatch:
+    """
+    Time-series points held as separate arrays of timestamps and values.
+    
+    Timestamps and values are each kept in an integer or float array when
+    they are all numbers, and in an object array otherwise. Points are
+    only materialized as (timestamp, value) tuples by to_points().
+    """
+    ts: np.ndarray
+    val: np.ndarray
+    
+    @classmethod
+    def from_points(cls, points: Iterable[TimeSeriesPoint]) -> 'TimeSeriesBatch':
+        """Create a batch from (timestamp, value) tuples."""
+        points = list(points)
+        return cls(
+            cls._to_array([timestamp for timestamp, _ in points]),
+            cls._to_array([value for _, value in points])
+        )
+    
+    @classmethod
+    def concatenate(cls, batches: List['TimeSeriesBatch']) -> 'TimeSeriesBatch':
+        """Join batches in order, the result of no batches is empty."""
+        if not batches:
+            return cls.from_points([])
+        if len(batches) == 1:
+            return batches[0]
+        return cls(
+            np.concatenate([batch.ts for batch in batches]),
+            np.concatenate([batch.val for batch in batches])
+        )
+    
+    @staticmethod
+    def _to_array(items: List[Any]) -> np.ndarray:
+        """Get items as an int64 or float64 array when they are numbers, else as an object array."""
+        try:
+            if all(type(item) is int for item in items):
+                return np.array(items, dtype=np.int64)
+            if all(type(item) in (int, float) for item in items):
+                return np.array(items, dtype=np.float64)
+        except OverflowError:
+            pass
+        
+        # Filled one by one, so that sequences stay single items
+        array = np.empty(len(items), dtype=object)
+        for i, item in enumerate(items):
+            array[i] = item
+        return array
+    
+    def __len__(self) -> int:
+        return len(self.ts)
+    
+    def __getitem__(self, index: Any) -> 'TimeSeriesBatch':
+        """Select points by a slice, boolean mask or index array."""
+        return TimeSeriesBatch(self.ts[index], self.val[index])
+    
+    def copy(self) -> 'TimeSeriesBatch':
+        """Get a batch with copies of the arrays."""
+        return TimeSeriesBatch(self.ts.copy(), self.val.copy())
+    
+    def between(
+        self,
+        start_time: Optional[TimestampT] = None,
+        end_time: Optional[TimestampT] = None
+    ) -> 'TimeSeriesBatch':
+        """Keep the points within the optional time range."""
+        if start_time is None and end_time is None:
+            return self
+        mask = np.ones(len(self.ts), dtype=bool)
+        if start_time is not None:
+            mask &= self.ts >= start_time
+        if end_time is not None:
+            mask &= self.ts <= end_time
+        return self[mask]
+    
+    def numeric_values(self) -> np.ndarray:
+        """Get the values as an int64 or float64 array, non-numeric values as 0."""
+        if self.val.dtype.kind in 'iu':
+            return self.val.astype(np.int64)
+        if self.val.dtype != object:
+            return self.val.astype(np.float64)
+        return np.fromiter(
+            (float(value) if isinstance(value, (int, float, str)) else 0 for value in self.val),
+            dtype=np.float64, count=len(self.val)
+        )
+    
+    def to_points(self) -> List[TimeSeriesPoint]:
+        """Get the points as (timestamp, value) tuples."""
+        return list(zip(self.ts.tolist(), self.val.tolist()))
+
+
+class CompressionDictionaryError(Exception):
+    """Compressed data needs a zstd dictionary that cannot be loaded."""
+
+
 class DataCompressor:
     """Handles data compression and decompression for Redis storage."""
     
-    def __init__(self, compression_level: int = 6, min_size_threshold: int = 100):
+    def __init__(
+        self,
+        compression_level: int = 6,
+        min_size_threshold: int = 100,
+        zstd_level: int = 3,
+        dict_data: Optional[bytes] = None,
+        dict_samples: Optional[List[bytes]] = None,
+        dict_size: int = 16384
+    ):
         """
         Initialize the data compressor.
         
+        Data is compressed with zstd when python-zstandard is installed, and
+        with zlib otherwise. A zstd dictionary trained on typical records
+        makes even small records such as single time-series points compress
+        well, data compressed with one can only be read with the same one.
+        zstd frames record the id of their dictionary, every dictionary set
+        stays available for decompression and unknown ones are fetched with
+        dictionary_loader.
+        
         Args:
             compression_level: zlib compression level (1-9, higher = better compression)
             min_size_threshold: Minimum data size in bytes before compression is applied
+            zstd_level: zstd compression level (1-22, higher = better compression)
+            dict_data: Serialized zstd dictionary, e.g. from dictionary_bytes
+            dict_samples: Sample records to train a zstd dictionary on, if
+                dict_data is not given
+            dict_size: Maximum size in bytes of a trained dictionary
         """
         self.compression_level = compression_level
         self.min_size_threshold = min_size_threshold
-        self.stats = {'compressed': 0, 'decompressed': 0, 'bytes_saved': 0}
+        self.zstd_level = zstd_level
+        # bytes_in and bytes_out count the data given to and returned by
+        # compress_data(), markers included
+        self.stats = {'compressed': 0, 'decompressed': 0, 'bytes_saved': 0, 'bytes_in': 0, 'bytes_out': 0}
+        self._stats_lock = threading.Lock()
+        
+        # zstd contexts cannot be used by two threads at once, each thread
+        # creates its own, see _zstd_compressor() and _zstd_decompressor()
+        self._zstd_enabled = False
+        self._zstd_dict = None
+        self._zstd_generation = 0
+        self._zstd_dicts: Dict[int, Any] = {}  # Dictionaries by id
+        self._local = threading.local()
+        # Called with the id of a dictionary that is not known yet, returns
+        # the serialized dictionary or None
+        self.dictionary_loader: Optional[Callable[[int], Optional[bytes]]] = None
+        # Decompression functions by the first four bytes of their marker,
+        # with the marker length, None for uncompressed data
+        self._decompressors: Dict[bytes, Tuple[int, Optional[Callable[[Any], bytes]]]] = {
+            RAW_MARKER: (4, None),
+            b'ZLIB': (5, zlib.decompress),
+            b'ZSTD': (5, self._zstd_decompress)
+        }
+        if ZSTD_AVAILABLE:
+            if dict_data is None and dict_samples:
+                dict_data = self.train_dictionary(dict_samples, dict_size)
+            self.set_dictionary(dict_data)
+    
+    @staticmethod
+    def train_dictionary(samples: List[bytes], dict_size: int = 16384) -> Optional[bytes]:
+        """
+        Train a zstd dictionary on sample records.
+        
+        Args:
+            samples: Sample records, a few hundred or more
+            dict_size: Maximum size of the dictionary in bytes
+            
+        Returns:
+            The serialized dictionary, None if zstd is unavailable or there
+            are too few samples to train on
+        """
+        if not ZSTD_AVAILABLE:
+            return None
+        try:
+            return zstd.train_dictionary(dict_size, samples).as_bytes()
+        except Exception as e:
+            logger.warning(f"Failed to train compression dictionary: {e}")
+            return None
+    
+    def set_dictionary(self, dict_data: Optional[bytes]) -> None:
+        """
+        Use a zstd dictionary for compression, earlier ones stay readable.
+        
+        Args:
+            dict_data: Serialized dictionary, None to compress without one
+        """
+        if not ZSTD_AVAILABLE:
+            return
+        self._zstd_dict = self._zstd_dicts[self.add_dictionary(dict_data)] if dict_data else None
+        self._zstd_generation += 1
+        self._zstd_enabled = True
+    
+    def add_dictionary(self, dict_data: bytes) -> int:
+        """
+        Make a zstd dictionary available for decompression.
+        
+        Args:
+            dict_data: Serialized dictionary
+            
+        Returns:
+            The id of the dictionary, recorded in the frames compressed with it
+            
+        Raises:
+            ValueError: If the data is not a trained zstd dictionary with an id
+        """
+        dictionary = zstd.ZstdCompressionDict(dict_data)
+        dict_id = dictionary.dict_id()
+        if not dict_id:
+            raise ValueError("Compression dictionaries must be zstd dictionaries with an id")
+        self._zstd_dicts[dict_id] = dictionary
+        return dict_id
+    
+    def _zstd_compressor(self) -> Optional[Any]:
+        """
+        Get the zstd compressor of the calling thread.
+        
+        Returns:
+            The compressor for the dictionary in use, None without zstandard
+        """
+        if not self._zstd_enabled:
+            return None
+        compressor = getattr(self._local, 'compressor', None)
+        if compressor is None or compressor[0] != self._zstd_generation:
+            compressor = self._local.compressor = (
+                self._zstd_generation,
+                zstd.ZstdCompressor(level=self.zstd_level, dict_data=self._zstd_dict, write_dict_id=True)
+            )
+        return compressor[1]
+    
+    def _zstd_decompressor(self, dict_id: int) -> Any:
+        """
+        Get the zstd decompressor of the calling thread for a dictionary.
+        
+        Args:
+            dict_id: Id of the dictionary, 0 for data compressed without one
+            
+        Returns:
+            The decompressor
+            
+        Raises:
+            CompressionDictionaryError: If the dictionary is not known and
+                cannot be loaded
+        """
+        decompressors = getattr(self._local, 'decompressors', None)
+        if decompressors is None:
+            decompressors = self._local.decompressors = {}
+        decompressor = decompressors.get(dict_id)
+        if decompressor is None:
+            dictionary = None
+            if dict_id:
+                dictionary = self._zstd_dicts.get(dict_id)
+                if dictionary is None and self.dictionary_loader is not None:
+                    dict_data = self.dictionary_loader(dict_id)
+                    if dict_data:
+                        self.add_dictionary(dict_data)
+                        dictionary = self._zstd_dicts.get(dict_id)
+                if dictionary is None:
+                    raise CompressionDictionaryError(
+                        f"zstd data needs compression dictionary {dict_id}, which cannot be loaded"
+                    )
+            decompressor = decompressors[dict_id] = zstd.ZstdDecompressor(dict_data=dictionary)
+        return decompressor
+    
+    def _count(self, **counts: int) -> None:
+        """Add to the statistics, which compressing threads share."""
+        with self._stats_lock:
+            for name, count in counts.items():
+                self.stats[name] += count
+    
+    @property
+    def dictionary_bytes(self) -> Optional[bytes]:
+        """The serialized zstd dictionary in use, None without one."""
+        return self._zstd_dict.as_bytes() if self._zstd_dict is not None else None
     
     def compress_data(self, data: Union[str, bytes]) -> bytes:
         """
-        Compress data using zlib compression.
+        Compress data using zstd, or zlib compression without zstd.
         
         Args:
             data: Data to compress (string or bytes)
@@ -87,23 +413,90 @@ class DataCompressor:
             data_bytes = data.encode('utf-8')
         else:
             data_bytes = data
-            
+        
+        compressed = self._compress_bytes(data_bytes)
+        self._count(bytes_in=len(data_bytes), bytes_out=len(compressed))
+        return compressed
+    
+    def compress_small(self, data_bytes: bytes) -> bytes:
+        """
+        Mark data known to be below min_size_threshold as uncompressed.
+        
+        Same as compress_data() for such data, without its checks.
+        """
+        self._count(bytes_in=len(data_bytes), bytes_out=len(data_bytes) + len(RAW_MARKER))
+        return RAW_MARKER + data_bytes
+    
+    @property
+    def compression_ratio(self) -> float:
+        """Share of the bytes given to compress_data() saved, negative when markers outweigh savings."""
+        if not self.stats['bytes_in']:
+            return 0.0
+        return 1 - self.stats['bytes_out'] / self.stats['bytes_in']
+    
+    def _compress_bytes(self, data_bytes: bytes) -> bytes:
+        """Compress data if it is large enough and compression saves space."""
         # Don't compress small data
         if len(data_bytes) < self.min_size_threshold:
-            return b'RAW:' + data_bytes
+            return RAW_MARKER + data_bytes
             
         try:
-            compressed = zlib.compress(data_bytes, self.compression_level)
+            compressor = self._zstd_compressor()
+            if compressor is not None:
+                marker = b'ZSTD:'
+                compressed = compressor.compress(data_bytes)
+            else:
+                marker = b'ZLIB:'
+                compressed = zlib.compress(data_bytes, self.compression_level)
             # Only use compression if it actually saves space
             if len(compressed) < len(data_bytes):
-                self.stats['compressed'] += 1
-                self.stats['bytes_saved'] += len(data_bytes) - len(compressed)
-                return b'ZLIB:' + compressed
+                self._count(compressed=1, bytes_saved=len(data_bytes) - len(compressed))
+                return marker + compressed
             else:
-                return b'RAW:' + data_bytes
+                return RAW_MARKER + data_bytes
         except Exception as e:
             logger.warning(f"Compression failed, storing raw data: {e}")
-            return b'RAW:' + data_bytes
+            return RAW_MARKER + data_bytes
+    
+    def decompress_bytes(self, data: bytes) -> bytes:
+        """
+        Decompress data based on compression marker, keeping it as bytes.
+        
+        Args:
+            data: Compressed data with marker
+            
+        Returns:
+            Decompressed data, data itself without a marker
+            
+        Raises:
+            ValueError: If compressed data cannot be decompressed
+            CompressionDictionaryError: If the zstd dictionary of the data
+                cannot be loaded
+        """
+        decompressor = self._decompressors.get(data[:4])
+        if decompressor is None:
+            # Legacy data without compression markers
+            return data
+        marker_length, decompress = decompressor
+        if decompress is None:
+            return data[marker_length:]
+        if data[marker_length - 1:marker_length] != b':':
+            return data
+        
+        try:
+            decompressed = decompress(data[marker_length:])
+        except CompressionDictionaryError:
+            raise
+        except Exception as e:
+            raise ValueError(f"Decompression failed: {e}") from e
+        self._count(decompressed=1)
+        return decompressed
+    
+    def _zstd_decompress(self, data: Any) -> bytes:
+        """Decompress zstd data with the dictionary recorded in its frame."""
+        if not self._zstd_enabled:
+            raise ValueError("zstd data found but zstandard is not installed")
+        return self._zstd_decompressor(zstd.get_frame_parameters(data).dict_id).decompress(data)
     
     def decompress_data(self, data: bytes) -> str:
         """
@@ -114,50 +507,225 @@ class DataCompressor:
             
         Returns:
             Decompressed string data
+            
+        Raises:
+            CompressionDictionaryError: If the zstd dictionary of the data
+                cannot be loaded
         """
         if not isinstance(data, bytes):
             return str(data)
-            
-        if data.startswith(b'ZLIB:'):
-            try:
-                compressed_data = data[5:]  # Remove 'ZLIB:' prefix
-                decompressed = zlib.decompress(compressed_data)
-                self.stats['decompressed'] += 1
-                return decompressed.decode('utf-8')
-            except Exception as e:
-                logger.error(f"Decompression failed: {e}")
-                return data.decode('utf-8', errors='replace')
-        elif data.startswith(b'RAW:'):
-            return data[4:].decode('utf-8')  # Remove 'RAW:' prefix
-        else:
-            # Legacy data without compression markers
-            try:
-                return data.decode('utf-8')
-            except UnicodeDecodeError:
-                return data.decode('utf-8', errors='replace')
+        
+        try:
+            return self.decompress_bytes(data).decode('utf-8')
+        except ValueError as e:
+            # UnicodeDecodeError is a ValueError too
+            if data.startswith((b'ZSTD:', b'ZLIB:')):
+                logger.error(str(e))
+            return data.decode('utf-8', errors='replace')
+
+
+# Vectorized versions of the standard aggregation functions, taking the values
+# sorted by window, the index of the first value of each window and the
+# number of values per window
+WINDOW_REDUCERS: Dict[str, Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray]] = {
+    'avg': lambda values, starts, counts: np.add.reduceat(values, starts) / counts,
+    'max': lambda values, starts, counts: np.maximum.reduceat(values, starts),
+    'min': lambda values, starts, counts: np.minimum.reduceat(values, starts),
+    'sum': lambda values, starts, counts: np.add.reduceat(values, starts),
+    'count': lambda values, starts, counts: counts,
+    'first': lambda values, starts, counts: values[starts],
+    'last': lambda values, starts, counts: values[starts + counts - 1]
+}
+
+# Number of aggregation results remembered, and for how long in seconds
+AGGREGATE_CACHE_SIZE = 1024
+AGGREGATE_CACHE_TTL = 300
+
+# Aggregation functions of binary ladder policies, whose results do not change
+# when aggregated again
+LADDER_AGGREGATIONS = ('sum', 'min', 'max', 'first', 'last')
+
+# Number of points stored per key after which the compression of the key is
+# checked, the factor it must reduce their size by, and the number of points
+# stored uncompressed otherwise before checking again
+ADAPTIVE_COMPRESSION_SAMPLES = 1000
+MIN_COMPRESSION_FACTOR = 1.05
+ADAPTIVE_COMPRESSION_PAUSE = 10000
+
+# Number of locks the keys are spread over, so that cleanups of different
+# keys rarely wait for each other
+CLEANUP_LOCK_STRIPES = 64
+
+# Retention policy types, windows of a fixed size or doubling with age
+POLICY_TYPES = ('window', 'binary_ladder')
+
+# Retention of a list of single points on the server, for window policies with
+# the standard aggregation functions. KEYS[1] is the series, ARGV the prefix of
+# new entries, whether to encode them with MessagePack ("1") or JSON, then the
+# cutoff time, window size and aggregation function of each policy, shortest
+# duration first. Returns the number of points processed, aggregated, removed
+# and left, or nil when an entry is compressed, a block or has a non-numeric
+# value to aggregate, in which case nothing is changed.
+RETENTION_SCRIPT = """
+local entries = redis.call('LRANGE', KEYS[1], 0, -1)
+local points = {}
+for i, raw in ipairs(entries) do
+    local data = raw
+    if string.sub(data, 1, 4) == 'RAW:' then
+        data = string.sub(data, 5)
+    end
+    local ok, point = false, nil
+    if string.sub(data, 1, 5) == 'MPCK:' then
+        ok, point = pcall(cmsgpack.unpack, string.sub(data, 6))
+    elseif string.sub(data, 1, 1) == '[' then
+        ok, point = pcall(cjson.decode, data)
+    end
+    if not ok or type(point) ~= 'table' or type(point[1]) ~= 'number' then
+        return nil
+    end
+    points[i] = {point[1], point[2], raw}
+end
+
+local processed, aggregated, removed = #points, 0, 0
+for p = 3, #ARGV, 3 do
+    local cutoff, window, func = tonumber(ARGV[p]), tonumber(ARGV[p + 1]), ARGV[p + 2]
+    local kept, windows, starts, old = {}, {}, {}, 0
+    for _, point in ipairs(points) do
+        if point[1] >= cutoff then
+            kept[#kept + 1] = point
+        else
+            old = old + 1
+            if func ~= 'remove' then
+                local value = point[2]
+                if type(value) ~= 'number' then
+                    return nil
+                end
+                -- Start, sum, count, min, max, first and last value
+                local start = math.floor(point[1] / window) * window
+                local w = windows[start]
+                if w == nil then
+                    w = {start, 0, 0, value, value, value, value}
+                    windows[start] = w
+                    starts[#starts + 1] = start
+                end
+                w[2] = w[2] + value
+                w[3] = w[3] + 1
+                w[4] = math.min(w[4], value)
+                w[5] = math.max(w[5], value)
+                w[7] = value
+            end
+        end
+    end
+    if old > 0 then
+        table.sort(starts)
+        for _, start in ipairs(starts) do
+            local w = windows[start]
+            local value
+            if func == 'avg' then value = w[2] / w[3]
+            elseif func == 'sum' then value = w[2]
+            elseif func == 'count' then value = w[3]
+            elseif func == 'min' then value = w[4]
+            elseif func == 'max' then value = w[5]
+            elseif func == 'first' then value = w[6]
+            else value = w[7] end
+            kept[#kept + 1] = {start, value}
+        end
+        aggregated = aggregated + #starts
+        removed = removed + old
+        points = kept
+    end
+end
+
+if #points ~= processed then
+    redis.call('DEL', KEYS[1])
+    local batch = {}
+    for i, point in ipairs(points) do
+        local entry = point[3]
+        if entry == nil then
+            if ARGV[2] == '1' then
+                entry = ARGV[1] .. 'MPCK:' .. cmsgpack.pack({point[1], point[2]})
+            else
+                entry = ARGV[1] .. cjson.encode({point[1], point[2]})
+            end
+        end
+        batch[#batch + 1] = entry
+        if #batch == 1000 or i == #points then
+            redis.call('RPUSH', KEYS[1], unpack(batch))
+            batch = {}
+        end
+    end
+end
+return {processed, aggregated, removed, #points}
+"""
 
 
 class TimeSeriesOptimizer:
     """Optimizes time-series data storage and retrieval in Redis."""
     
-    def __init__(self, redis_client, compressor: Optional[DataCompressor] = None):
+    def __init__(
+        self,
+        redis_client,
+        compressor: Optional[DataCompressor] = None,
+        block_size: int = 1,
+        storage: str = "list",
+        write_behind: bool = False
+    ):
         """
         Initialize the time-series optimizer.
         
+        Points are stored in a list by default, newest first. With a
+        block_size above 1, points are buffered per key and stored
+        block_size at a time as a single list entry, compressed together, so
+        that the compressor sees enough data to be effective. Buffered
+        points are only visible to other processes once their block is
+        stored, see flush_pending().
+        
+        With "stream" storage, points are stored in a Redis stream with
+        their timestamp as entry ID, so that time ranges are selected by the
+        server (XREVRANGE) instead of reading the whole series. This needs
+        Redis 7, timestamps increasing per key, and readers using this
+        class, and block_size does not apply.
+        
+        With write_behind, writes are queued with the client's
+        enqueue_write() and sent in batched pipelines by its flusher thread
+        instead of one round trip per point. Store calls then report success
+        once the write is queued, failed writes are only logged.
+        
         Args:
             redis_client: Redis client instance
             compressor: Data compressor instance
+            block_size: Number of points stored per list entry
+            storage: Storage type of the series, "list" or "stream"
+            write_behind: Whether to queue writes instead of sending them
         """
+        if storage not in STORAGE_TYPES:
+            raise ValueError(f"Unknown time-series storage type: {storage}")
         self.redis_client = redis_client
         self.compressor = compressor or DataCompressor()
-        self.aggregation_functions = {
-            'avg': lambda values: sum(values) / len(values) if values else 0,
-            'max': lambda values: max(values) if values else 0,
-            'min': lambda values: min(values) if values else 0,
-            'sum': lambda values: sum(values),
-            'count': lambda values: len(values),
-            'first': lambda values: values[0] if values else 0,
-            'last': lambda values: values[-1] if values else 0
+        self.storage = storage
+        self.block_size = block_size if storage == "list" else 1
+        self.write_behind = write_behind
+        # Block value type and scale of a key, set to the ones of its
+        # retention policy by RedisStorageOptimizer
+        self.value_format_for: Callable[[str], Tuple[Optional[str], int, bool]] = lambda key: (None, 1, False)
+        self._pending: Dict[str, List[TimeSeriesPoint]] = defaultdict(list)
+        # Recent aggregation results by their arguments, least recently used first
+        self._aggregate_cache: 'OrderedDict[Tuple, Tuple[float, TimeSeriesBatch]]' = OrderedDict()
+        self._aggregate_cache_lock = threading.Lock()
+        # Points, bytes before and after compression stored per key since the
+        # last check, and points left to store uncompressed per key
+        self._compression_samples: Dict[str, List[int]] = {}
+        self._uncompressed_keys: Dict[str, int] = {}
+        # Functions taking the values of a window, which is never empty.
+        # Standard ones are computed for all windows at once by WINDOW_REDUCERS
+        self.aggregation_functions: Dict[str, AggregationFunc] = {
+            'avg': statistics.fmean,
+            'max': max,
+            'min': min,
+            'sum': sum,
+            'count': len,
+            'first': operator.itemgetter(0),
+            'last': operator.itemgetter(-1)
         }
     
     def store_time_series_point(
@@ -171,39 +739,380 @@ class TimeSeriesOptimizer:
         """
         Store a single time-series data point efficiently.
         
+        Keys whose points are reduced by less than MIN_COMPRESSION_FACTOR
+        over ADAPTIVE_COMPRESSION_SAMPLES points are stored uncompressed
+        for the next ADAPTIVE_COMPRESSION_PAUSE points.
+        
         Args:
             key: Redis key for the time series
             timestamp: Data point timestamp
             value: Data point value
-            max_points: Maximum number of points to retain
+            max_points: Maximum number of points to retain, rounded up to
+                whole blocks
             use_compression: Whether to use compression
             
         Returns:
             True if stored successfully
         """
+        if self.block_size > 1:
+            pending = self._pending[key]
+            pending.append((timestamp, value))
+            if len(pending) < self.block_size:
+                return True
+            return self._store_pending(key, max_points, use_compression)
+        
         try:
-            # Format data point
-            data_point = json.dumps([timestamp, value])
+            data_point = self._encode_point(timestamp, value, self._use_compression(key, use_compression), key)
             
-            # Apply compression if enabled
-            if use_compression:
-                data_point = self.compressor.compress_data(data_point)
+            if self.storage == "stream":
+                # The entry ID is the timestamp in milliseconds, trimming is
+                # approximate so that it happens per stream node
+                self._send([('xadd', (key, {STREAM_FIELD: data_point}), {
+                    'id': self._stream_id(timestamp), 'maxlen': max_points or None, 'approximate': True
+                })])
+                return True
             
-            # Store the data point
-            pipeline = self.redis_client._client.pipeline()
-            pipeline.lpush(key, data_point)
+            # Store the data point, trimmed to max points if specified
+            commands = [('lpush', (key, data_point), {})]
+            if max_points:
+                commands.append(('ltrim', (key, 0, max_points - 1), {}))
+            self._send(commands)
+            return True
             
-            # Trim to max points if specified
+        except Exception as e:
+            logger.error(f"Failed to store time-series point for {key}: {e}")
+            return False
+    
+    def flush_pending(self, key: Optional[str] = None, use_compression: bool = True) -> bool:
+        """
+        Store the buffered points of a key, or of all keys, as partial blocks.
+        
+        Args:
+            key: Redis key for the time series, None for all keys
+            use_compression: Whether to use compression
+            
+        Returns:
+            True if all points were stored successfully
+        """
+        keys = [key] if key is not None else list(self._pending)
+        return all([self._store_pending(pending_key, None, use_compression) for pending_key in keys])
+    
+    def _store_pending(self, key: str, max_points: Optional[int], use_compression: bool) -> bool:
+        """Store the buffered points of a key as one block."""
+        points = self._pending.pop(key, None)
+        if not points:
+            return True
+        
+        try:
+            block = self._encode_block(
+                points, self._use_compression(key, use_compression), *self.value_format_for(key), key=key
+            )
+            commands = [('lpush', (key, block), {})]
             if max_points:
-                pipeline.ltrim(key, 0, max_points - 1)
+                commands.append(('ltrim', (key, 0, -(-max_points // self.block_size) - 1), {}))
+            self._send(commands)
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to store {len(points)} time-series points for {key}: {e}")
+            return False
+    
+    def _send(self, commands: List[Tuple[str, tuple, Dict[str, Any]]]) -> None:
+        """
+        Send write commands, queued with write_behind, in one round trip otherwise.
+        
+        Args:
+            commands: (method, args, kwargs) tuples of Redis commands
+        """
+        if self.write_behind:
+            for method, args, kwargs in commands:
+                self.redis_client.enqueue_write(method, *args, **kwargs)
+        elif len(commands) == 1:
+            method, args, kwargs = commands[0]
+            getattr(self.redis_client, method)(*args, **kwargs)
+        else:
+            pipeline = self.redis_client._client.pipeline()
+            for method, args, kwargs in commands:
+                getattr(pipeline, method)(*args, **kwargs)
+            pipeline.execute()
+    
+    def flush(self) -> None:
+        """Send the writes queued with write_behind and wait until they are done."""
+        if self.write_behind:
+            self.redis_client.flush_writes()
+    
+    def replace_time_series(self, key: str, points: List[TimeSeriesPoint], use_compression: bool = True) -> bool:
+        """
+        Replace the stored points of a key, including its buffered points.
+        
+        Args:
+            key: Redis key for the time series
+            points: Points in the order get_time_series_range() returns them,
+                newest first
+            use_compression: Whether to use compression
             
+        Returns:
+            True if stored successfully
+        """
+        self._pending.pop(key, None)
+        # Queued writes must not land on top of the new series
+        self.flush()
+        
+        if self.block_size > 1:
+            # Blocks hold their points oldest first
+            value_format = self.value_format_for(key)
+            entries = [
+                self._encode_block(points[i:i + self.block_size][::-1], use_compression, *value_format)
+                for i in range(0, len(points), self.block_size)
+            ]
+        else:
+            entries = [self._encode_point(timestamp, value, use_compression) for timestamp, value in points]
+        
+        try:
+            pipeline = self.redis_client._client.pipeline()
+            if self.storage == "stream":
+                # Stream entries must be added in time order, into a new key
+                # that then replaces the old one at once
+                new_key = f"{key}:replacing"
+                pipeline.delete(new_key)
+                for entry, (timestamp, _) in sorted(zip(entries, points), key=lambda item: item[1][0]):
+                    pipeline.xadd(new_key, {STREAM_FIELD: entry}, id=self._stream_id(timestamp))
+                if entries:
+                    pipeline.rename(new_key, key)
+                else:
+                    pipeline.delete(key)
+            else:
+                pipeline.delete(key)
+                if entries:
+                    pipeline.rpush(key, *entries)
             pipeline.execute()
             return True
             
         except Exception as e:
-            logger.error(f"Failed to store time-series point for {key}: {e}")
+            logger.error(f"Failed to replace time-series points for {key}: {e}")
             return False
     
+    @staticmethod
+    def _stream_id(timestamp: TimestampT) -> str:
+        """Get the stream entry ID of a point, numbered within its millisecond."""
+        return f"{int(timestamp * 1000)}-*"
+    
+    def _encode_point(
+        self,
+        timestamp: TimestampT,
+        value: ValueT,
+        use_compression: bool,
+        key: Optional[str] = None
+    ) -> Union[str, bytes]:
+        """
+        Encode a single point as a stored entry.
+        
+        Points are MessagePack encoded when msgpack is installed, which is
+        faster and more compact than JSON, and compressed on top of that.
+        The compression of the key is tracked when given.
+        """
+        if MSGPACK_AVAILABLE:
+            data_point = MSGPACK_MARKER + msgpack.packb((timestamp, value), use_bin_type=True)
+        else:
+            data_point = json.dumps([timestamp, value])
+        
+        # Apply compression if enabled
+        if use_compression:
+            return self._compress(data_point, key)
+        return data_point
+    
+    def _encode_block(
+        self,
+        points: List[TimeSeriesPoint],
+        use_compression: bool,
+        value_dtype: Optional[str] = None,
+        value_scale: int = 1,
+        value_delta: bool = False,
+        key: Optional[str] = None
+    ) -> bytes:
+        """
+        Encode points, oldest first, as a block list entry.
+        
+        Numeric values are quantized to value_dtype when possible, see
+        _quantize_block(), other numeric points are packed with a fixed
+        width, others as JSON. The whole block is compressed at once.
+        """
+        payload = self._quantize_block(points, value_dtype, value_scale, value_delta)
+        if payload is None:
+            if all(type(timestamp) is int and type(value) is int for timestamp, value in points):
+                code = b'q'
+            elif all(type(timestamp) in (int, float) and type(value) in (int, float) for timestamp, value in points):
+                code = b'd'
+            else:
+                code = b'j'
+            
+            if code in BLOCK_FORMATS:
+                pack = BLOCK_FORMATS[code].pack
+                payload = code + b''.join([pack(timestamp, value) for timestamp, value in points])
+            else:
+                payload = code + json.dumps(points).encode('utf-8')
+        
+        if use_compression:
+            return BLOCK_MARKER + self._compress(payload, key)
+        return BLOCK_MARKER + RAW_MARKER + payload
+    
+    def _use_compression(self, key: str, use_compression: bool) -> bool:
+        """Whether to compress the next entry of a key, counting down paused keys."""
+        remaining = self._uncompressed_keys.get(key)
+        if not use_compression or remaining is None:
+            return use_compression
+        if remaining <= 1:
+            del self._uncompressed_keys[key]
+        else:
+            self._uncompressed_keys[key] = remaining - 1
+        return False
+    
+    def _compress(self, payload: Union[str, bytes], key: Optional[str]) -> bytes:
+        """Compress an entry, pausing compression of the key if it does not pay off."""
+        if isinstance(payload, bytes) and len(payload) < self.compressor.min_size_threshold:
+            compressed = self.compressor.compress_small(payload)
+        else:
+            compressed = self.compressor.compress_data(payload)
+        if key is None:
+            return compressed
+        
+        samples = self._compression_samples.setdefault(key, [0, 0, 0])
+        samples[0] += 1
+        samples[1] += len(payload)
+        samples[2] += len(compressed)
+        if samples[0] >= ADAPTIVE_COMPRESSION_SAMPLES:
+            del self._compression_samples[key]
+            if samples[1] < MIN_COMPRESSION_FACTOR * samples[2]:
+                self._uncompressed_keys[key] = ADAPTIVE_COMPRESSION_PAUSE
+                logger.debug(f"Compression of {key} saves too little, storing it uncompressed")
+        return compressed
+    
+    @classmethod
+    def _quantize_block(
+        cls,
+        points: List[TimeSeriesPoint],
+        value_dtype: Optional[str],
+        value_scale: int,
+        value_delta: bool = False
+    ) -> Optional[bytes]:
+        """
+        Get the payload of a block of numeric points with integer values.
+        
+        Values are multiplied by value_scale and rounded within the range of
+        value_dtype, timestamps rounded to milliseconds. Without a
+        value_dtype, points are only quantized when nothing is lost and the
+        values fit an int32. Timestamps are stored as differences to the
+        previous one, values too with value_delta, as zig-zag varints.
+        
+        Returns:
+            The block payload, None if the points cannot be quantized
+        """
+        if value_dtype == 'float64' or not all(
+            type(timestamp) in (int, float) and type(value) in (int, float) for timestamp, value in points
+        ):
+            return None
+        
+        milliseconds = np.array([timestamp for timestamp, _ in points], dtype=np.float64) * 1000
+        values = np.array([value for _, value in points], dtype=np.float64) * value_scale
+        rounded_milliseconds = np.rint(milliseconds)
+        rounded_values = np.rint(values)
+        if value_dtype is None and not (
+            np.array_equal(rounded_milliseconds, milliseconds) and np.array_equal(rounded_values, values)
+        ):
+            return None
+        
+        limits = np.iinfo(VALUE_DTYPES[value_dtype or 'int32'])
+        if not (rounded_values.min() >= limits.min and rounded_values.max() <= limits.max):
+            return None
+        
+        quantized_values = rounded_values.astype(np.int64)
+        if value_delta:
+            quantized_values = np.diff(quantized_values, prepend=0)
+        return (
+            DELTA_BLOCK_CODE
+            + DELTA_HEADER.pack(value_scale, DELTA_VALUES if value_delta else 0, len(points))
+            + cls._encode_varints(np.diff(rounded_milliseconds.astype(np.int64), prepend=0))
+            + cls._encode_varints(quantized_values)
+        )
+    
+    @staticmethod
+    def _encode_varints(numbers: np.ndarray) -> bytes:
+        """Encode int64 numbers as zig-zag varints, 7 bits per byte, least significant first."""
+        unsigned = ((numbers << 1) ^ (numbers >> 63)).view(np.uint64)
+        lengths = np.ones(len(unsigned), dtype=np.int64)
+        for shift in range(7, 64, 7):
+            lengths += unsigned >= np.uint64(1 << shift)
+        offsets = np.cumsum(lengths) - lengths
+        
+        # The i-th byte of every number at least i + 1 bytes long, with the
+        # high bit set on all but the last byte
+        encoded = np.empty(int(lengths.sum()), dtype=np.uint8)
+        for i in range(int(lengths.max(initial=0))):
+            longer = lengths > i
+            chunk = (unsigned[longer] >> np.uint64(7 * i)) & np.uint64(0x7f)
+            more = (lengths[longer] > i + 1).astype(np.uint64) << np.uint64(7)
+            encoded[offsets[longer] + i] = chunk | more
+        return encoded.tobytes()
+    
+    @staticmethod
+    def _decode_varints(data: bytes) -> np.ndarray:
+        """
+        Decode zig-zag varints into int64 numbers.
+        
+        Raises:
+            ValueError: If the data ends within a varint or one is too long
+        """
+        encoded = np.frombuffer(data, dtype=np.uint8)
+        if not len(encoded):
+            return np.zeros(0, dtype=np.int64)
+        if encoded[-1] & 0x80:
+            raise ValueError("Truncated varint")
+        
+        ends = np.flatnonzero(encoded < 0x80)
+        starts = np.concatenate(([0], ends[:-1] + 1))
+        positions = np.arange(len(encoded)) - np.repeat(starts, ends - starts + 1)
+        if positions.max() > 9:
+            raise ValueError("Varint longer than 64 bits")
+        parts = (encoded & 0x7f).astype(np.uint64) << (7 * positions).astype(np.uint64)
+        unsigned = np.bitwise_or.reduceat(parts, starts)
+        return (unsigned >> np.uint64(1)).astype(np.int64) ^ -(unsigned & np.uint64(1)).astype(np.int64)
+    
+    def _decode_block(self, entry: bytes) -> TimeSeriesBatch:
+        """
+        Decode a block list entry, oldest first.
+        
+        Raises:
+            ValueError: If the block cannot be decoded
+        """
+        payload = self.compressor.decompress_bytes(entry[len(BLOCK_MARKER):])
+        code, data = payload[:1], payload[1:]
+        if code == DELTA_BLOCK_CODE:
+            if len(data) < DELTA_HEADER.size:
+                raise ValueError(f"Invalid time-series block of {len(data)} bytes")
+            scale, flags, count = DELTA_HEADER.unpack_from(data)
+            numbers = self._decode_varints(data[DELTA_HEADER.size:])
+            if len(numbers) != 2 * count:
+                raise ValueError(f"Invalid time-series block of {len(numbers)} numbers for {count} points")
+            values = numbers[count:]
+            if flags & DELTA_VALUES:
+                values = np.cumsum(values)
+            return self._quantized_batch(np.cumsum(numbers[:count]), values, scale)
+        if code in BLOCK_FORMATS:
+            # Fixed-width points are read straight into the arrays
+            dtype = np.int64 if code == b'q' else np.float64
+            if len(data) % BLOCK_FORMATS[code].size:
+                raise ValueError(f"Invalid time-series block of {len(data)} bytes")
+            pairs = np.frombuffer(data, dtype=np.dtype(dtype).newbyteorder('<')).reshape(-1, 2)
+            return TimeSeriesBatch(pairs[:, 0].astype(dtype), pairs[:, 1].astype(dtype))
+        return TimeSeriesBatch.from_points(tuple(point) for point in json.loads(data))
+    
+    @staticmethod
+    def _quantized_batch(milliseconds: np.ndarray, values: np.ndarray, scale: int) -> TimeSeriesBatch:
+        """Get the points of a quantized block, whole seconds and unscaled values as integers."""
+        timestamps = milliseconds // 1000 if not (milliseconds % 1000).any() else milliseconds / 1000
+        values = values.astype(np.int64) if scale == 1 else values / scale
+        return TimeSeriesBatch(timestamps, values)
+    
     def get_time_series_range(
         self,
         key: str,
@@ -223,43 +1132,115 @@ class TimeSeriesOptimizer:
             end_time: Optional end time filter
             
         Returns:
-            List of (timestamp, value) tuples
+            List of (timestamp, value) tuples, newest first
+        """
+        return self.get_time_series_batch(key, start_index, end_index, start_time, end_time).to_points()
+    
+    def get_time_series_batch(
+        self,
+        key: str,
+        start_index: int = 0,
+        end_index: int = -1,
+        start_time: Optional[TimestampT] = None,
+        end_time: Optional[TimestampT] = None
+    ) -> TimeSeriesBatch:
+        """
+        Retrieve time-series data points as arrays with optional time filtering.
+        
+        The indexes address list entries, which hold a block of points each
+        when the points are stored in blocks. Points buffered by this
+        optimizer come first when starting from the newest entry. With
+        stream storage, the time range is selected by the server and the
+        indexes address the entries within it.
+        
+        Args:
+            key: Redis key for the time series
+            start_index: Start index for range query
+            end_index: End index for range query
+            start_time: Optional start time filter
+            end_time: Optional end time filter
+            
+        Returns:
+            Batch of the points, newest first
         """
         try:
+            # Read the queued writes too
+            self.flush()
+            
             # Get raw data from Redis
-            raw_data = self.redis_client.lrange(key, start_index, end_index)
+            if self.storage == "stream":
+                raw_data = self._read_stream(key, start_index, end_index, start_time, end_time)
+            else:
+                raw_data = self.redis_client.lrange(key, start_index, end_index)
             
+            # Single points are collected and turned into a batch at once,
+            # blocks are decoded into batches of their own
+            batches = []
             points = []
+            if start_index == 0 and self._pending.get(key):
+                points.extend(reversed(self._pending[key]))
+            
             for raw_point in raw_data:
                 try:
-                    # Decompress if needed
-                    if isinstance(raw_point, bytes) and (
-                        raw_point.startswith(b'ZLIB:') or raw_point.startswith(b'RAW:')
-                    ):
-                        data_str = self.compressor.decompress_data(raw_point)
+                    if isinstance(raw_point, bytes) and raw_point.startswith(BLOCK_MARKER):
+                        # Blocks hold their points oldest first
+                        block = self._decode_block(raw_point)[::-1]
+                        if points:
+                            batches.append(TimeSeriesBatch.from_points(points))
+                            points = []
+                        batches.append(block)
                     else:
-                        data_str = raw_point.decode('utf-8') if isinstance(raw_point, bytes) else str(raw_point)
-                    
-                    # Parse the data point
-                    timestamp, value = json.loads(data_str)
-                    
-                    # Apply time filtering if specified
-                    if start_time is not None and timestamp < start_time:
-                        continue
-                    if end_time is not None and timestamp > end_time:
-                        continue
-                        
-                    points.append((timestamp, value))
-                    
+                        points.append(self._decode_point(raw_point))
                 except (json.JSONDecodeError, ValueError, TypeError) as e:
                     logger.warning(f"Failed to parse time-series point: {raw_point}, error: {e}")
                     continue
             
-            return points
+            if points:
+                batches.append(TimeSeriesBatch.from_points(points))
+            return TimeSeriesBatch.concatenate(batches).between(start_time, end_time)
             
         except Exception as e:
             logger.error(f"Failed to retrieve time-series range for {key}: {e}")
-            return []
+            return TimeSeriesBatch.from_points([])
+    
+    def _read_stream(
+        self,
+        key: str,
+        start_index: int,
+        end_index: int,
+        start_time: Optional[TimestampT],
+        end_time: Optional[TimestampT]
+    ) -> List[bytes]:
+        """Read the stored points of a stream within a time range, newest first."""
+        # Without negative indexes, no more entries than needed are read
+        count = end_index + 1 if start_index >= 0 and end_index >= 0 else None
+        entries = self.redis_client.xrevrange(
+            key,
+            max=int(end_time * 1000) if end_time is not None else "+",
+            min=int(start_time * 1000) if start_time is not None else "-",
+            count=count
+        )
+        entries = entries[start_index:end_index + 1 if end_index != -1 else None]
+        return [next(iter(fields.values())) for _, fields in entries]
+    
+    def _decode_point(self, raw_point: Union[str, bytes]) -> TimeSeriesPoint:
+        """
+        Decode a stored point.
+        
+        Raises:
+            ValueError: If the point cannot be decoded
+        """
+        # Decompress if needed
+        data = self.compressor.decompress_bytes(raw_point) if isinstance(raw_point, bytes) else raw_point
+        
+        # Parse the data point, JSON for points stored without msgpack
+        if isinstance(data, bytes) and data.startswith(MSGPACK_MARKER):
+            if not MSGPACK_AVAILABLE:
+                raise ValueError("MessagePack point found but msgpack is not installed")
+            timestamp, value = msgpack.unpackb(data[len(MSGPACK_MARKER):], raw=False)
+        else:
+            timestamp, value = json.loads(data)
+        return timestamp, value
     
     def aggregate_time_series(
         self,
@@ -280,31 +1261,167 @@ class TimeSeriesOptimizer:
         Returns:
             List of aggregated (timestamp, value) tuples
         """
-        if not source_points or aggregation_func not in self.aggregation_functions:
-            return []
+        return self.aggregate_batch(
+            key, TimeSeriesBatch.from_points(source_points), aggregation_func, time_window_seconds
+        ).to_points()
+    
+    def aggregate_batch(
+        self,
+        key: str,
+        source: TimeSeriesBatch,
+        aggregation_func: str,
+        time_window_seconds: int
+    ) -> TimeSeriesBatch:
+        """
+        Aggregate a batch of time-series data points into larger time windows.
+        
+        Results are remembered for AGGREGATE_CACHE_TTL seconds, and copies of
+        them returned again for the same key, window and function as long as
+        the number, first and last timestamp of the source points are
+        unchanged.
+        
+        Args:
+            key: Redis key for logging purposes
+            source: Source data points to aggregate
+            aggregation_func: Aggregation function name
+            time_window_seconds: Size of aggregation window in seconds
+            
+        Returns:
+            Batch of the aggregated points, oldest first
+        """
+        if not len(source) or aggregation_func not in self.aggregation_functions:
+            return TimeSeriesBatch.from_points([])
+        
+        current_time = time.time()
+        cache_key = (
+            key, time_window_seconds, aggregation_func,
+            len(source), source.ts[0], source.ts[-1]
+        )
+        with self._aggregate_cache_lock:
+            cached = self._aggregate_cache.get(cache_key)
+            if cached is not None and current_time - cached[0] < AGGREGATE_CACHE_TTL:
+                self._aggregate_cache.move_to_end(cache_key)
+                return cached[1].copy()
         
         try:
-            # Group points by time windows
-            time_windows = defaultdict(list)
+            # Calculate window start times
+            windows = (source.ts.astype(np.float64) // time_window_seconds).astype(np.int64) * time_window_seconds
+            aggregated = self._aggregate_windows(windows, source.numeric_values(), aggregation_func)
             
-            for timestamp, value in source_points:
-                # Calculate window start time
-                window_start = int(timestamp // time_window_seconds) * time_window_seconds
-                time_windows[window_start].append(float(value) if isinstance(value, (int, float, str)) else 0)
+            with self._aggregate_cache_lock:
+                self._aggregate_cache[cache_key] = (current_time, aggregated)
+                self._aggregate_cache.move_to_end(cache_key)
+                if len(self._aggregate_cache) > AGGREGATE_CACHE_SIZE:
+                    self._aggregate_cache.popitem(last=False)
+            return aggregated.copy()
             
-            # Apply aggregation function to each window
-            aggregated_points = []
-            func = self.aggregation_functions[aggregation_func]
+        except Exception as e:
+            logger.error(f"Failed to aggregate time-series data for {key}: {e}")
+            return TimeSeriesBatch.from_points([])
+    
+    def aggregate_time_series_ladder(
+        self,
+        key: str,
+        source_points: List[TimeSeriesPoint],
+        aggregation_func: str,
+        base_seconds: int,
+        reference_time: TimestampT
+    ) -> List[TimeSeriesPoint]:
+        """
+        Aggregate time-series data points into windows doubling in size with age.
+        
+        Args:
+            key: Redis key for logging purposes
+            source_points: Source data points to aggregate
+            aggregation_func: Aggregation function name
+            base_seconds: Size of the smallest aggregation window in seconds
+            reference_time: Time the ages of the points are relative to
             
-            for window_start, values in sorted(time_windows.items()):
-                aggregated_value = func(values)
-                aggregated_points.append((window_start, aggregated_value))
+        Returns:
+            List of aggregated (timestamp, value) tuples
+        """
+        return self.aggregate_batch_ladder(
+            key, TimeSeriesBatch.from_points(source_points), aggregation_func, base_seconds, reference_time
+        ).to_points()
+    
+    def aggregate_batch_ladder(
+        self,
+        key: str,
+        source: TimeSeriesBatch,
+        aggregation_func: str,
+        base_seconds: int,
+        reference_time: TimestampT
+    ) -> TimeSeriesBatch:
+        """
+        Aggregate a batch of time-series data points into windows doubling in size with age.
+        
+        Points up to 2 * base_seconds older than reference_time are
+        aggregated into windows of base_seconds, up to 4 * base_seconds into
+        windows of 2 * base_seconds, and so on, so that a series keeps a
+        number of points logarithmic in its age. Windows are aligned to
+        their size and therefore nested, so aggregating the result again
+        later merges it into the larger windows. Only aggregation functions
+        giving the same result when applied again, LADDER_AGGREGATIONS, can
+        be used.
+        
+        Args:
+            key: Redis key for logging purposes
+            source: Source data points to aggregate
+            aggregation_func: Aggregation function name
+            base_seconds: Size of the smallest aggregation window in seconds
+            reference_time: Time the ages of the points are relative to
+            
+        Returns:
+            Batch of the aggregated points, oldest first
+        """
+        if not len(source) or aggregation_func not in LADDER_AGGREGATIONS:
+            return TimeSeriesBatch.from_points([])
+        
+        try:
+            timestamps = source.ts.astype(np.float64)
             
-            return aggregated_points
+            # Window sizes of base_seconds * 2 ** i for ages from
+            # base_seconds * 2 ** i up to twice that
+            ages = np.maximum((reference_time - timestamps) / base_seconds, 1.0)
+            sizes = base_seconds * np.exp2(np.floor(np.log2(ages))).astype(np.int64)
+            windows = (timestamps // sizes).astype(np.int64) * sizes
+            return self._aggregate_windows(windows, source.numeric_values(), aggregation_func)
             
         except Exception as e:
             logger.error(f"Failed to aggregate time-series data for {key}: {e}")
-            return []
+            return TimeSeriesBatch.from_points([])
+    
+    def _aggregate_windows(self, windows: np.ndarray, values: np.ndarray, aggregation_func: str) -> TimeSeriesBatch:
+        """
+        Aggregate values by the start time of their window.
+        
+        Args:
+            windows: Window start time of each value
+            values: Values in the order of the points
+            aggregation_func: Aggregation function name
+            
+        Returns:
+            Batch of the window start times and aggregated values, oldest first
+        """
+        # Sort by window keeping the order of the points within each window
+        order = np.argsort(windows, kind='stable')
+        windows = windows[order]
+        values = values[order]
+        starts = np.flatnonzero(np.concatenate(([True], windows[1:] != windows[:-1])))
+        counts = np.diff(np.append(starts, len(windows)))
+        
+        reducer = WINDOW_REDUCERS.get(aggregation_func)
+        if reducer is not None:
+            aggregated_values = reducer(values, starts, counts)
+        else:
+            # Custom aggregation functions get each window's values as a list
+            func = self.aggregation_functions[aggregation_func]
+            value_list = values.tolist()
+            aggregated_values = TimeSeriesBatch._to_array([
+                func(value_list[start:end]) for start, end in zip(starts.tolist(), (starts + counts).tolist())
+            ])
+        
+        return TimeSeriesBatch(windows[starts], aggregated_values)
 
 
 class RetentionManager:
@@ -322,7 +1439,13 @@ class RetentionManager:
         self.optimizer = optimizer
         self.policies: Dict[str, List[RetentionPolicy]] = {}
         self.last_cleanup_times: Dict[str, float] = {}
-        self.cleanup_lock = threading.Lock()
+        # Compiled key patterns, and the policies found per key, rebuilt
+        # when policies are added
+        self._pattern_matchers: Dict[str, Callable[[str], Any]] = {}
+        self._key_policies: Dict[str, List[RetentionPolicy]] = {}
+        self._cleanup_locks = [threading.Lock() for _ in range(CLEANUP_LOCK_STRIPES)]
+        # Registered RETENTION_SCRIPT, None until first used
+        self._retention_script = None
     
     def add_retention_policy(self, key_pattern: str, policy: RetentionPolicy) -> None:
         """
@@ -332,50 +1455,92 @@ class RetentionManager:
             key_pattern: Pattern to match Redis keys (supports wildcards)
             policy: Retention policy configuration
         """
+        if policy.policy_type not in POLICY_TYPES:
+            raise ValueError(f"Unknown retention policy type: {policy.policy_type}")
+        if policy.policy_type == 'binary_ladder' and policy.aggregation_func not in LADDER_AGGREGATIONS:
+            raise ValueError(
+                f"Binary ladder policies aggregate with one of {', '.join(LADDER_AGGREGATIONS)}, "
+                f"not {policy.aggregation_func}"
+            )
+        if policy.value_dtype not in (None, 'float64', *VALUE_DTYPES):
+            raise ValueError(f"Unknown value type: {policy.value_dtype}")
+        if policy.value_scale < 1:
+            raise ValueError(f"Value scale must be positive, not {policy.value_scale}")
+        
         if key_pattern not in self.policies:
             self.policies[key_pattern] = []
         
-        # Insert policy in order of duration (shortest first)
+        # Insert policy in order of duration (shortest first), after
+        # policies of the same duration
         policies = self.policies[key_pattern]
-        insert_index = 0
-        for i, existing_policy in enumerate(policies):
-            if policy.duration_seconds < existing_policy.duration_seconds:
-                insert_index = i
-                break
-            insert_index = i + 1
-        
+        insert_index = bisect.bisect_right([p.duration_seconds for p in policies], policy.duration_seconds)
         policies.insert(insert_index, policy)
+        self._pattern_matchers[key_pattern] = self._compile_pattern(key_pattern)
+        self._key_policies.clear()
         logger.info(f"Added retention policy '{policy.name}' for pattern '{key_pattern}'")
     
     def get_applicable_policies(self, key: str) -> List[RetentionPolicy]:
         """
         Get retention policies applicable to a specific key.
         
+        The result is remembered per key until policies are added, as the
+        same keys are looked up on every cleanup.
+        
         Args:
             key: Redis key
             
         Returns:
             List of applicable retention policies
         """
-        applicable_policies = []
+        applicable_policies = self._key_policies.get(key)
+        if applicable_policies is None:
+            applicable_policies = []
+            for pattern, policies in self.policies.items():
+                if self._pattern_matchers[pattern](key):
+                    applicable_policies.extend(policies)
+            
+            # Sort by duration (shortest first)
+            applicable_policies.sort(key=lambda p: p.duration_seconds)
+            if len(self._key_policies) >= 4096:
+                self._key_policies.clear()
+            self._key_policies[key] = applicable_policies
+        
+        return list(applicable_policies)
+    
+    def get_value_format(self, key: str) -> Tuple[Optional[str], int, bool]:
+        """
+        Get the type, scale and delta encoding values of a key are stored with in blocks.
         
-        for pattern, policies in self.policies.items():
-            # Simple wildcard matching (supports * and ?)
-            if self._match_pattern(key, pattern):
-                applicable_policies.extend(policies)
+        They are the ones of the applicable policy of the shortest duration,
+        the one of the raw points.
         
-        # Sort by duration (shortest first)
-        applicable_policies.sort(key=lambda p: p.duration_seconds)
-        return applicable_policies
+        Args:
+            key: Redis key
+            
+        Returns:
+            Tuple of the value type name, scale and whether values are delta encoded
+        """
+        policies = self.get_applicable_policies(key)
+        if not policies:
+            return None, 1, False
+        return policies[0].value_dtype, policies[0].value_scale, policies[0].value_delta_encode
+    
+    @staticmethod
+    def _compile_pattern(pattern: str) -> Callable[[str], Any]:
+        """
+        Compile a key pattern to a match function.
+        
+        Patterns with * or ? are wildcard patterns, others match the key
+        exactly.
+        """
+        if '*' not in pattern and '?' not in pattern:
+            return re.compile(re.escape(pattern) + r'\Z').match
+        return re.compile(fnmatch.translate(pattern)).match
     
     def _match_pattern(self, key: str, pattern: str) -> bool:
         """Simple wildcard pattern matching."""
-        if '*' not in pattern and '?' not in pattern:
-            return key == pattern
-        
-        # Convert to regex-like matching
-        import fnmatch
-        return fnmatch.fnmatch(key, pattern)
+        matcher = self._pattern_matchers.get(pattern) or self._compile_pattern(pattern)
+        return matcher(key) is not None
     
     def apply_retention_policies(self, key: str, force: bool = False) -> Dict[str, Any]:
         """
@@ -404,56 +1569,65 @@ class RetentionManager:
             if not force and (current_time - last_cleanup) < 300:  # 5 minutes minimum between cleanups
                 return stats
             
-            with self.cleanup_lock:
+            with self._lock_for(key):
                 policies = self.get_applicable_policies(key)
                 if not policies:
                     return stats
                 
+                if self._apply_with_script(key, policies, current_time, stats):
+                    self.last_cleanup_times[key] = current_time
+                    return stats
+                
                 # Get current data
-                current_points = self.optimizer.get_time_series_range(key, 0, -1)
-                if not current_points:
+                current = self.optimizer.get_time_series_batch(key, 0, -1)
+                if not len(current):
                     return stats
                 
-                stats['data_points_processed'] = len(current_points)
+                stats['data_points_processed'] = len(current)
                 
                 # Process each retention policy level
-                retained_points = current_points.copy()
+                retained = current
                 
                 for policy in policies:
                     cutoff_time = current_time - policy.duration_seconds
                     
                     # Separate points into keep and aggregate/remove
-                    keep_points = []
-                    process_points = []
-                    
-                    for timestamp, value in retained_points:
-                        if timestamp >= cutoff_time:
-                            keep_points.append((timestamp, value))
-                        else:
-                            process_points.append((timestamp, value))
+                    old = retained.ts < cutoff_time
                     
-                    if process_points:
+                    if old.any():
+                        process = retained[old]
+                        keep = retained[~old]
+                        
                         # Aggregate old points if aggregation is configured
-                        if policy.aggregation_func != 'remove':
-                            aggregated = self.optimizer.aggregate_time_series(
+                        if policy.policy_type == 'binary_ladder':
+                            aggregated = self.optimizer.aggregate_batch_ladder(
                                 key,
-                                process_points,
+                                process,
+                                policy.aggregation_func,
+                                policy.resolution_seconds,
+                                cutoff_time
+                            )
+                        elif policy.aggregation_func != 'remove':
+                            aggregated = self.optimizer.aggregate_batch(
+                                key,
+                                process,
                                 policy.aggregation_func,
                                 policy.resolution_seconds
                             )
-                            keep_points.extend(aggregated)
-                            stats['data_points_aggregated'] += len(aggregated)
+                        else:
+                            aggregated = TimeSeriesBatch.from_points([])
+                        retained = TimeSeriesBatch.concatenate([keep, aggregated])
+                        stats['data_points_aggregated'] += len(aggregated)
                         
-                        stats['data_points_removed'] += len(process_points)
+                        stats['data_points_removed'] += len(process)
                     
-                    retained_points = keep_points
                     stats['processed_policies'] += 1
                 
                 # Update Redis with retained data
-                if len(retained_points) != len(current_points):
-                    self._update_redis_data(key, retained_points, policies[0] if policies else None)
+                if len(retained) != len(current):
+                    self._update_redis_data(key, retained.to_points(), policies[0] if policies else None)
                     stats['memory_freed_bytes'] = self._estimate_memory_saved(
-                        len(current_points), len(retained_points)
+                        len(current), len(retained)
                     )
                 
                 self.last_cleanup_times[key] = current_time
@@ -463,6 +1637,63 @@ class RetentionManager:
         
         return stats
     
+    def _lock_for(self, key: str) -> threading.Lock:
+        """Get the lock serializing the cleanups of a key."""
+        return self._cleanup_locks[hash(key) % CLEANUP_LOCK_STRIPES]
+    
+    def _apply_with_script(
+        self,
+        key: str,
+        policies: List[RetentionPolicy],
+        current_time: float,
+        stats: Dict[str, Any]
+    ) -> bool:
+        """
+        Apply window retention policies on the server with RETENTION_SCRIPT.
+        
+        The series is then neither read nor written back over the network.
+        Only lists of single points, without points buffered here, and
+        policies aggregating with standard functions are handled, new
+        entries are not compressed.
+        
+        Returns:
+            True if the policies were applied, False to apply them here
+        """
+        optimizer = self.optimizer
+        if optimizer.storage != "list" or optimizer.block_size > 1 or optimizer._pending.get(key):
+            return False
+        if any(
+            policy.policy_type != 'window'
+            or (policy.aggregation_func not in WINDOW_REDUCERS and policy.aggregation_func != 'remove')
+            for policy in policies
+        ):
+            return False
+        
+        args = [RAW_MARKER if policies[0].compression_enabled else b'', '1' if MSGPACK_AVAILABLE else '0']
+        for policy in policies:
+            args.extend([current_time - policy.duration_seconds, policy.resolution_seconds, policy.aggregation_func])
+        
+        try:
+            # Queued writes must be applied first
+            optimizer.flush()
+            if self._retention_script is None:
+                self._retention_script = self.redis_client._client.register_script(RETENTION_SCRIPT)
+            result = self._retention_script(keys=[key], args=args)
+        except Exception as e:
+            logger.debug(f"Retention script failed for {key}, applying policies locally: {e}")
+            return False
+        if result is None:
+            return False
+        
+        processed, aggregated, removed, remaining = (int(count) for count in result)
+        stats['processed_policies'] += len(policies)
+        stats['data_points_processed'] = processed
+        stats['data_points_aggregated'] += aggregated
+        stats['data_points_removed'] += removed
+        if remaining != processed:
+            stats['memory_freed_bytes'] = self._estimate_memory_saved(processed, remaining)
+        return True
+    
     def _update_redis_data(
         self,
         key: str,
@@ -470,20 +1701,8 @@ class RetentionManager:
         policy: Optional[RetentionPolicy]
     ) -> None:
         """Update Redis with processed data points."""
-        try:
-            # Clear existing data
-            self.redis_client.delete(key)
-            
-            # Store processed points
-            use_compression = policy.compression_enabled if policy else True
-            
-            for timestamp, value in reversed(points):  # Reverse to maintain order with lpush
-                self.optimizer.store_time_series_point(
-                    key, timestamp, value, use_compression=use_compression
-                )
-                
-        except Exception as e:
-            logger.error(f"Failed to update Redis data for {key}: {e}")
+        use_compression = policy.compression_enabled if policy else True
+        self.optimizer.replace_time_series(key, points, use_compression=use_compression)
     
     def _estimate_memory_saved(self, old_count: int, new_count: int) -> int:
         """Estimate memory saved by data reduction."""
@@ -508,23 +1727,104 @@ class RedisStorageOptimizer:
         # Initialize components
         self.compressor = DataCompressor(
             compression_level=self.config.get('compression_level', 6),
-            min_size_threshold=self.config.get('min_compression_size', 100)
+            min_size_threshold=self.config.get('min_compression_size', 100),
+            zstd_level=self.config.get('zstd_level', 3)
         )
+        self.dictionary_key = self.config.get('compression_dictionary_key', COMPRESSION_DICTIONARY_KEY)
+        self.compressor.dictionary_loader = self.fetch_compression_dictionary
+        self.load_compression_dictionary()
         
-        self.optimizer = TimeSeriesOptimizer(redis_client, self.compressor)
+        self.optimizer = TimeSeriesOptimizer(
+            redis_client,
+            self.compressor,
+            block_size=self.config.get('time_series_block_size', 1),
+            storage=self.config.get('time_series_storage', 'list'),
+            write_behind=self.config.get('time_series_write_behind', False)
+        )
         self.retention_manager = RetentionManager(redis_client, self.optimizer)
+        self.optimizer.value_format_for = self.retention_manager.get_value_format
         
-        # Statistics
+        # Statistics, updated by the threads of global cleanups under the lock
         self.stats = StorageStats()
+        self._stats_lock = threading.Lock()
         self.monitored_keys: Set[str] = set()
         
         # Background cleanup configuration
         self.auto_cleanup_enabled = self.config.get('auto_cleanup_enabled', True)
         self.cleanup_interval_seconds = self.config.get('cleanup_interval_seconds', 3600)  # 1 hour
+        # Keys optimized in parallel by global cleanups
+        self.cleanup_workers = self.config.get('cleanup_workers', 8)
         self.last_global_cleanup = 0.0
         
         logger.info("Redis storage optimizer initialized")
     
+    def load_compression_dictionary(self) -> bool:
+        """
+        Use the zstd dictionary shared through Redis, if one was stored.
+        
+        Returns:
+            True if a dictionary was loaded
+        """
+        if not ZSTD_AVAILABLE:
+            return False
+        try:
+            dict_data = self.redis_client.get(self.dictionary_key)
+        except Exception as e:
+            logger.warning(f"Failed to load compression dictionary: {e}")
+            return False
+        if not isinstance(dict_data, bytes):
+            return False
+        self.compressor.set_dictionary(dict_data)
+        logger.info(f"Loaded {len(dict_data)} byte compression dictionary")
+        return True
+    
+    def fetch_compression_dictionary(self, dict_id: int) -> Optional[bytes]:
+        """
+        Get a zstd dictionary shared through Redis by its id.
+        
+        Args:
+            dict_id: Id of the dictionary
+            
+        Returns:
+            The serialized dictionary, None if it was not stored or cannot be read
+        """
+        try:
+            dict_data = self.redis_client.get(f"{self.dictionary_key}:{dict_id}")
+        except Exception as e:
+            logger.error(f"Failed to load compression dictionary {dict_id}: {e}")
+            return None
+        return dict_data if isinstance(dict_data, bytes) else None
+    
+    def train_compression_dictionary(self, samples: List[bytes], dict_size: int = 16384) -> bool:
+        """
+        Train a zstd dictionary on sample records and share it through Redis.
+        
+        The dictionary replaces the shared one for compression, and is kept
+        under its id as well, so that data compressed with earlier
+        dictionaries stays readable.
+        
+        Args:
+            samples: Sample records, e.g. JSON encoded time-series points
+            dict_size: Maximum size of the dictionary in bytes
+            
+        Returns:
+            True if a dictionary was trained and stored
+        """
+        dict_data = self.compressor.train_dictionary(samples, dict_size)
+        if dict_data is None:
+            return False
+        dict_id = self.compressor.add_dictionary(dict_data)
+        try:
+            self.redis_client.mset({
+                f"{self.dictionary_key}:{dict_id}": dict_data,
+                self.dictionary_key: dict_data
+            })
+        except Exception as e:
+            logger.error(f"Failed to store compression dictionary: {e}")
+            return False
+        self.compressor.set_dictionary(dict_data)
+        return True
+    
     def add_default_retention_policies(self) -> None:
         """Add default retention policies for BACmon data."""
         # High-frequency data (seconds): keep 1 hour raw, then 1-minute aggregates for 24 hours
@@ -636,9 +1936,10 @@ class RedisStorageOptimizer:
             stats['retention_stats'] = retention_stats
             stats['optimization_applied'] = retention_stats['processed_policies'] > 0
             
-            # Update global statistics
-            self.stats.data_points_stored += retention_stats['data_points_processed']
-            self.stats.data_points_aggregated += retention_stats['data_points_aggregated']
+            # Update global statistics, keys are optimized by several threads
+            with self._stats_lock:
+                self.stats.data_points_stored += retention_stats['data_points_processed']
+                self.stats.data_points_aggregated += retention_stats['data_points_aggregated']
             
             return stats
             
@@ -672,22 +1973,33 @@ class RedisStorageOptimizer:
         try:
             logger.info(f"Starting global Redis cleanup on {len(self.monitored_keys)} keys")
             
-            for key in self.monitored_keys.copy():  # Copy to avoid modification during iteration
-                try:
-                    result = self.optimize_key(key, force=False)
-                    stats['keys_processed'] += 1
-                    
-                    # Aggregate retention statistics
-                    retention_stats = result.get('retention_stats', {})
-                    for stat_key, value in retention_stats.items():
-                        stats['total_retention_stats'][stat_key] += value
-                    
-                    if result.get('error'):
-                        stats['errors'].append({'key': key, 'error': result['error']})
+            # Keys are optimized in parallel, as the work mostly waits for
+            # Redis, by no more workers than the client has connections
+            workers = self.cleanup_workers
+            max_connections = getattr(self.redis_client, 'max_connections', None)
+            if isinstance(max_connections, int):
+                workers = min(workers, max_connections)
+            
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+                # Copy to avoid modification during iteration
+                futures = {executor.submit(self.optimize_key, key, False): key for key in list(self.monitored_keys)}
+                for future in as_completed(futures):
+                    key = futures[future]
+                    try:
+                        result = future.result()
+                        stats['keys_processed'] += 1
+                        
+                        # Aggregate retention statistics
+                        retention_stats = result.get('retention_stats', {})
+                        for stat_key, value in retention_stats.items():
+                            stats['total_retention_stats'][stat_key] += value
                         
-                except Exception as e:
-                    stats['errors'].append({'key': key, 'error': str(e)})
-                    logger.error(f"Failed to optimize key {key} during global cleanup: {e}")
+                        if result.get('error'):
+                            stats['errors'].append({'key': key, 'error': result['error']})
+                            
+                    except Exception as e:
+                        stats['errors'].append({'key': key, 'error': str(e)})
+                        logger.error(f"Failed to optimize key {key} during global cleanup: {e}")
             
             self.last_global_cleanup = current_time
             stats['duration_seconds'] = time.time() - current_time
@@ -710,11 +2022,7 @@ class RedisStorageOptimizer:
             compression_stats = self.compressor.stats.copy()
             
             # Calculate compression ratio
-            if compression_stats['compressed'] > 0:
-                self.stats.compression_ratio = (
-                    compression_stats['bytes_saved'] / 
-                    (compression_stats['bytes_saved'] + sum(compression_stats.values()))
-                )
+            self.stats.compression_ratio = self.compressor.compression_ratio
             
             return {
                 'storage_stats': {
@@ -734,7 +2042,8 @@ class RedisStorageOptimizer:
                             'duration_hours': policy.duration_seconds / 3600,
                             'resolution_seconds': policy.resolution_seconds,
                             'aggregation_func': policy.aggregation_func,
-                            'compression_enabled': policy.compression_enabled
+                            'compression_enabled': policy.compression_enabled,
+                            'policy_type': policy.policy_type
                         }
                         for policy in policies
                     ]
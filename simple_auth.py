@@ -7,19 +7,35 @@ Provides basic API key and session authentication for testing purposes.
 """
 
 import os
+import json
 import time
 import hashlib
 import secrets
 import functools
-from typing import Dict, Optional, Set, List, Any, Callable
+from collections import OrderedDict
+from typing import Dict, Optional, Set, List, Any, Callable, Tuple, FrozenSet, Iterable
 from datetime import datetime, timedelta
 
-# Simple in-memory storage for testing (use Redis in production)
-_sessions: Dict[str, Dict[str, Any]] = {}
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+# Simple in-memory storage for testing (use Redis in production), sessions
+# least recently accessed first, which are the first to expire
+_sessions: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
 _api_keys: Dict[str, Dict[str, Any]] = {}
+# Sessions recently read from Redis with the time they were read, oldest first
+_validation_cache: 'OrderedDict[str, Tuple[Dict[str, Any], float]]' = OrderedDict()
+# API key data by the SHA-256 digest of the key, looked up by validation
+_api_keys_by_hash: Dict[bytes, Dict[str, Any]] = {}
 
 # Default configuration
 DEFAULT_SESSION_TIMEOUT = 3600  # 1 hour
+DEFAULT_MAX_SESSIONS = 10000  # Sessions kept in memory at most
+VALIDATION_CACHE_TTL = 5.0  # Seconds a session read from Redis is reused
+VALIDATION_CACHE_MAX = 512  # Sessions read from Redis kept at most
 DEFAULT_API_KEYS = {
     'test_key_123': {
         'name': 'Test Key',
@@ -33,141 +49,186 @@ DEFAULT_API_KEYS = {
     }
 }
 
+def _hash_api_key(api_key: str) -> bytes:
+    """Get the SHA-256 digest of an API key."""
+    return hashlib.sha256(api_key.encode('utf-8')).digest()
+
+def _hash_session_token(session_token: str) -> str:
+    """Get the SHA-256 hex digest of a session token, which the session is
+    stored under so that only the client holds the token itself."""
+    return hashlib.sha256(session_token.encode('utf-8')).hexdigest()
+
+def _freeze_permissions(permissions: Iterable[str]) -> FrozenSet[str]:
+    """Get permissions as a frozenset, checked with a single hash lookup."""
+    return permissions if isinstance(permissions, frozenset) else frozenset(permissions)
+
+def _encode_session(session_data: Dict[str, Any]):
+    """Encode session data for Redis, as MessagePack or as JSON without msgpack."""
+    if MSGPACK_AVAILABLE:
+        return msgpack.packb(session_data, use_bin_type=True, default=sorted)
+    return json.dumps(session_data, default=sorted)
+
+def _decode_session(data) -> Dict[str, Any]:
+    """Decode session data stored by _encode_session()."""
+    # JSON objects start with '{', a MessagePack map never does
+    if data[:1] in (b'{', '{'):
+        return json.loads(data)
+    if not MSGPACK_AVAILABLE:
+        raise ValueError("MessagePack session found but msgpack is not installed")
+    return msgpack.unpackb(data, raw=False)
+
+def _load_api_keys():
+    """Load API keys from environment or use defaults."""
+    # Check for environment variable with API keys (JSON format)
+    env_keys = os.getenv('AUTH_API_KEYS')
+    if env_keys:
+        try:
+            _api_keys.update(json.loads(env_keys))
+        except (json.JSONDecodeError, TypeError):
+            pass
+    
+    # Use defaults if no custom keys provided
+    if not _api_keys:
+        _api_keys.update(DEFAULT_API_KEYS)
+    
+    _api_keys_by_hash.clear()
+    for key, data in _api_keys.items():
+        data = _api_keys[key] = dict(
+            data, permissions=_freeze_permissions(data['permissions']))
+        _api_keys_by_hash[_hash_api_key(key)] = data
+
+# Configuration from the environment, read once when the module is imported
+_ENV_SESSION_TIMEOUT = int(os.getenv('AUTH_SESSION_TIMEOUT', DEFAULT_SESSION_TIMEOUT))
+_ENV_MAX_SESSIONS = int(os.getenv('AUTH_MAX_SESSIONS', DEFAULT_MAX_SESSIONS))
+_ENV_ENABLED = os.getenv('AUTH_ENABLED', 'true').lower() == 'true'
+_load_api_keys()
+
 class SimpleAuth:
     """Simple authentication manager for BACmon testing."""
     
     def __init__(self, redis_client=None):
         """Initialize authentication manager."""
         self.redis_client = redis_client
-        self.session_timeout = int(os.getenv('AUTH_SESSION_TIMEOUT', DEFAULT_SESSION_TIMEOUT))
-        self.enabled = os.getenv('AUTH_ENABLED', 'true').lower() == 'true'
-        
-        # Load API keys from environment or defaults
-        self._load_api_keys()
-    
-    def _load_api_keys(self):
-        """Load API keys from environment or use defaults."""
-        global _api_keys
-        
-        # Check for environment variable with API keys (JSON format)
-        env_keys = os.getenv('AUTH_API_KEYS')
-        if env_keys:
-            try:
-                import json
-                _api_keys.update(json.loads(env_keys))
-            except (json.JSONDecodeError, TypeError):
-                pass
-        
-        # Use defaults if no custom keys provided
-        if not _api_keys:
-            _api_keys.update(DEFAULT_API_KEYS)
+        self.session_timeout = _ENV_SESSION_TIMEOUT
+        # Seconds between updates of the last access of a memory session
+        self.refresh_interval = self.session_timeout // 10
+        self.max_sessions = _ENV_MAX_SESSIONS
+        self.enabled = _ENV_ENABLED
     
     def create_session(self, user_id: str, permissions: List[str] = None) -> str:
         """Create a new session and return session token."""
         session_token = secrets.token_urlsafe(32)
+        session_id = _hash_session_token(session_token)
         session_data = {
             'user_id': user_id,
-            'permissions': permissions or ['read'],
-            'created': time.time(),
-            'last_access': time.time()
+            'permissions': _freeze_permissions(permissions or ['read']),
+            'created': time.time()
         }
         
         if self.redis_client:
-            # Store in Redis with expiration
+            # Store in Redis with expiration, extended on every access
             try:
-                import json
                 self.redis_client.set(
-                    f"session:{session_token}", 
-                    json.dumps(session_data), 
+                    f"session:{session_id}", 
+                    _encode_session(session_data), 
                     ex=self.session_timeout
                 )
+                return session_token
             except Exception:
-                # Fall back to memory storage
-                _sessions[session_token] = session_data
-        else:
-            # Store in memory
-            _sessions[session_token] = session_data
+                pass
         
+        # Store in memory, fall back to memory storage on Redis errors,
+        # dropping the least recently accessed session when full
+        session_data['last_access'] = time.time()
+        _sessions[session_id] = session_data
+        if len(_sessions) > self.max_sessions:
+            _sessions.popitem(last=False)
         return session_token
     
     def validate_session(self, session_token: str) -> Optional[Dict[str, Any]]:
         """Validate session token and return session data."""
         if not session_token:
             return None
-        
-        session_data = None
+        session_id = _hash_session_token(session_token)
         
         if self.redis_client:
+            # Reuse a session read moments ago, without a round trip
+            now = time.time()
+            cached = _validation_cache.get(session_id)
+            if cached and now - cached[1] < VALIDATION_CACHE_TTL:
+                return cached[0]
+            
             try:
-                import json
-                data = self.redis_client.get(f"session:{session_token}")
+                # Read the session and extend its expiration in one round
+                # trip, expired sessions are gone
+                pipe = self.redis_client.pipeline()
+                pipe.get(f"session:{session_id}")
+                pipe.expire(f"session:{session_id}", self.session_timeout)
+                data, _ = pipe.execute()
                 if data:
-                    session_data = json.loads(data)
+                    session_data = _decode_session(data)
+                    session_data['permissions'] = frozenset(session_data['permissions'])
+                    _validation_cache.pop(session_id, None)
+                    _validation_cache[session_id] = (session_data, now)
+                    if len(_validation_cache) > VALIDATION_CACHE_MAX:
+                        _validation_cache.popitem(last=False)
+                    return session_data
             except Exception:
                 pass
+            _validation_cache.pop(session_id, None)
         
         # Fall back to memory storage
-        if not session_data and session_token in _sessions:
-            session_data = _sessions[session_token]
-        
+        session_data = _sessions.get(session_id)
         if not session_data:
             return None
         
         # Check if session has expired
-        if time.time() - session_data['last_access'] > self.session_timeout:
+        now = time.time()
+        idle = now - session_data['last_access']
+        if idle > self.session_timeout:
             self.invalidate_session(session_token)
             return None
         
-        # Update last access time
-        session_data['last_access'] = time.time()
-        
-        if self.redis_client:
-            try:
-                import json
-                self.redis_client.set(
-                    f"session:{session_token}", 
-                    json.dumps(session_data), 
-                    ex=self.session_timeout
-                )
-            except Exception:
-                _sessions[session_token] = session_data
-        else:
-            _sessions[session_token] = session_data
-        
+        # Update last access time, only once in a while for busy sessions
+        if idle > self.refresh_interval:
+            session_data['last_access'] = now
+            _sessions.move_to_end(session_id)
         return session_data
     
     def invalidate_session(self, session_token: str):
         """Invalidate a session."""
+        session_id = _hash_session_token(session_token)
+        _validation_cache.pop(session_id, None)
         if self.redis_client:
             try:
-                self.redis_client.delete(f"session:{session_token}")
+                self.redis_client.delete(f"session:{session_id}")
             except Exception:
                 pass
         
-        if session_token in _sessions:
-            del _sessions[session_token]
+        if session_id in _sessions:
+            del _sessions[session_id]
     
     def validate_api_key(self, api_key: str) -> Optional[Dict[str, Any]]:
         """Validate API key and return key data."""
-        if not api_key or api_key not in _api_keys:
+        if not api_key:
             return None
         
-        return _api_keys[api_key]
+        # Keys are looked up by digest rather than as given, so that the time
+        # a lookup takes does not tell how much of a stored key was matched
+        return _api_keys_by_hash.get(_hash_api_key(api_key))
     
-    def has_permission(self, permissions: List[str], required_permission: str) -> bool:
+    def has_permission(self, permissions: FrozenSet[str], required_permission: str) -> bool:
         """Check if user has required permission."""
         return required_permission in permissions or 'admin' in permissions
     
     def cleanup_expired_sessions(self):
-        """Clean up expired sessions from memory storage."""
-        global _sessions
+        """Clean up expired sessions from memory storage, Redis expires its own."""
+        # Sessions are in order of last access, so only expired ones are visited
         current_time = time.time()
-        expired = [
-            token for token, data in _sessions.items()
-            if current_time - data['last_access'] > self.session_timeout
-        ]
-        
-        for token in expired:
+        while _sessions:
+            token, data = next(iter(_sessions.items()))
+            if current_time - data['last_access'] <= self.session_timeout:
+                break
             del _sessions[token]
 
 # Global auth instance
@@ -182,24 +243,30 @@ def get_auth_manager(redis_client=None) -> SimpleAuth:
 
 def require_auth(permission: str = 'read'):
     """Decorator to require authentication for API endpoints."""
+    # Resolved once, bottle's request and response are thread-local proxies
+    import bottle
+    request = bottle.request
+    response = bottle.response
+    # Permissions granting access, checked in one call instead of through
+    # has_permission() on every request
+    granting = frozenset((permission, 'admin'))
+    
     def decorator(func: Callable) -> Callable:
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            auth = get_auth_manager()
+            auth = _auth_instance or get_auth_manager()
             
             # Skip auth if disabled
             if not auth.enabled:
                 return func(*args, **kwargs)
             
-            import bottle
-            
             # Check for API key in header
-            api_key = bottle.request.get_header('X-API-Key')
+            api_key = request.get_header('X-API-Key')
             if api_key:
                 key_data = auth.validate_api_key(api_key)
-                if key_data and auth.has_permission(key_data['permissions'], permission):
+                if key_data and not granting.isdisjoint(key_data['permissions']):
                     # Add auth info to request for use in endpoint
-                    bottle.request.auth = {
+                    request.auth = {
                         'type': 'api_key',
                         'permissions': key_data['permissions'],
                         'name': key_data['name']
@@ -207,12 +274,12 @@ def require_auth(permission: str = 'read'):
                     return func(*args, **kwargs)
             
             # Check for session token in cookie
-            session_token = bottle.request.get_cookie('session_token')
+            session_token = request.get_cookie('session_token')
             if session_token:
                 session_data = auth.validate_session(session_token)
-                if session_data and auth.has_permission(session_data['permissions'], permission):
+                if session_data and not granting.isdisjoint(session_data['permissions']):
                     # Add auth info to request
-                    bottle.request.auth = {
+                    request.auth = {
                         'type': 'session',
                         'permissions': session_data['permissions'],
                         'user_id': session_data['user_id']
@@ -220,7 +287,7 @@ def require_auth(permission: str = 'read'):
                     return func(*args, **kwargs)
             
             # Authentication failed
-            bottle.response.status = 401
+            response.status = 401
             return {
                 'status': 'error',
                 'code': 401,
@@ -237,22 +304,24 @@ def require_admin():
 
 def login_required(func: Callable) -> Callable:
     """Decorator for web pages that require login."""
+    import bottle
+    request = bottle.request
+    redirect = bottle.redirect
+    
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        auth = get_auth_manager()
+        auth = _auth_instance or get_auth_manager()
         
         # Skip auth if disabled
         if not auth.enabled:
             return func(*args, **kwargs)
         
-        import bottle
-        
         # Check for session token
-        session_token = bottle.request.get_cookie('session_token')
+        session_token = request.get_cookie('session_token')
         if session_token:
             session_data = auth.validate_session(session_token)
             if session_data:
-                bottle.request.auth = {
+                request.auth = {
                     'type': 'session',
                     'permissions': session_data['permissions'],
                     'user_id': session_data['user_id']
@@ -260,7 +329,7 @@ def login_required(func: Callable) -> Callable:
                 return func(*args, **kwargs)
         
         # Redirect to login page
-        bottle.redirect('/login')
+        redirect('/login')
     
     return wrapper
 
@@ -274,7 +343,7 @@ def get_api_keys_info() -> Dict[str, Dict[str, Any]]:
     return {
         key: {
             'name': data['name'],
-            'permissions': data['permissions'],
+            'permissions': sorted(data['permissions']),
             'created': datetime.fromtimestamp(data['created']).isoformat()
         }
         for key, data in _api_keys.items()
@@ -11,9 +11,11 @@ all new endpoints work correctly and return properly formatted responses.
 import sys
 import logging
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import time
-from typing import Dict, Any, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple, Union
 
 # Configure logging
 logging.basicConfig(
@@ -22,29 +24,50 @@ logging.basicConfig(
 )
 logger = logging.getLogger('test_api_endpoints')
 
+# Endpoint tests requested at the same time, each mostly waiting on the server
+MAX_CONCURRENT_TESTS = 8
+
+# Fields of the standardized response format, and those every response of
+# the format must have
+STANDARD_FIELDS = frozenset(('status', 'timestamp', 'version'))
+REQUIRED_FIELDS = STANDARD_FIELDS | {'code'}
+
 class BACmonAPITester:
     """Test class for BACmon REST API endpoints."""
     
-    def __init__(self, base_url: str = "http://localhost:9090"):
-        """Initialize the API tester with base URL."""
+    def __init__(self, base_url: str = "http://localhost:9090",
+                 headers: Optional[Dict[str, str]] = None):
+        """Initialize the API tester with base URL and default headers."""
         self.base_url = base_url
-        self.session = requests.Session()
         self.test_results: Dict[str, bool] = {}
+        
+        # Keep connections to the server alive between tests
+        self.session = requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
     
-    def test_endpoint(self, endpoint: str, method: str = 'GET', 
-                     params: Optional[Dict[str, Any]] = None,
-                     expected_status: int = 200) -> bool:
+    def close(self) -> None:
+        """Close the connections to the server."""
+        self.session.close()
+    
+    def probe(self, endpoint: str, method: str = 'GET',
+              params: Optional[Dict[str, Any]] = None,
+              expected_status: Union[int, List[int]] = 200) -> Tuple[bool, int, str]:
         """
-        Test a single API endpoint.
+        Test a single API endpoint, without logging the result.
         
         Args:
             endpoint: The endpoint path (e.g., '/api/status')
             method: HTTP method ('GET', 'POST', etc.)
             params: Query parameters for GET or form data for POST
-            expected_status: Expected HTTP status code
+            expected_status: Expected HTTP status code, or a list of
+                acceptable ones
             
         Returns:
-            True if test passed, False otherwise
+            Whether the test passed, and the log level and message of its result
         """
         url = f"{self.base_url}{endpoint}"
         
@@ -54,45 +77,62 @@ class BACmonAPITester:
             elif method.upper() == 'POST':
                 response = self.session.post(url, data=params, timeout=10)
             else:
-                logger.error(f"Unsupported HTTP method: {method}")
-                return False
+                return False, logging.ERROR, f"Unsupported HTTP method: {method}"
             
             # Check status code
-            if response.status_code != expected_status:
-                logger.error(f"❌ {endpoint}: Expected status {expected_status}, got {response.status_code}")
-                return False
+            if isinstance(expected_status, list):
+                status_ok = response.status_code in expected_status
+            else:
+                status_ok = response.status_code == expected_status
+            if not status_ok:
+                return (False, logging.ERROR,
+                        f"❌ {endpoint}: Expected status {expected_status}, got {response.status_code}")
             
             # Try to parse JSON response
             try:
                 data = response.json()
                 
-                # Check for standardized response format
-                if 'status' in data and 'timestamp' in data and 'version' in data:
+                # Check for standardized response format, bodies that are not
+                # objects are legacy responses
+                if isinstance(data, dict) and data.keys() >= STANDARD_FIELDS:
                     if data['status'] == 'success' and 'data' in data:
-                        logger.info(f"✅ {endpoint}: Success with standardized format")
-                        return True
+                        return True, logging.INFO, f"✅ {endpoint}: Success with standardized format"
                     elif data['status'] == 'error' and 'error' in data:
-                        logger.info(f"✅ {endpoint}: Error response with standardized format")
-                        return True
+                        return True, logging.INFO, f"✅ {endpoint}: Error response with standardized format"
                     else:
-                        logger.warning(f"⚠️ {endpoint}: Unexpected response structure")
-                        return False
+                        return False, logging.WARNING, f"⚠️ {endpoint}: Unexpected response structure"
                 else:
                     # Legacy response format (might be OK for some endpoints)
-                    logger.info(f"✅ {endpoint}: Success with legacy format")
-                    return True
+                    return True, logging.INFO, f"✅ {endpoint}: Success with legacy format"
                     
             except json.JSONDecodeError:
                 if response.headers.get('content-type') == 'text/csv':
-                    logger.info(f"✅ {endpoint}: Success with CSV format")
-                    return True
+                    return True, logging.INFO, f"✅ {endpoint}: Success with CSV format"
                 else:
-                    logger.error(f"❌ {endpoint}: Invalid JSON response")
-                    return False
+                    return False, logging.ERROR, f"❌ {endpoint}: Invalid JSON response"
         
         except requests.exceptions.RequestException as e:
-            logger.error(f"❌ {endpoint}: Request failed - {e}")
-            return False
+            return False, logging.ERROR, f"❌ {endpoint}: Request failed - {e}"
+    
+    def test_endpoint(self, endpoint: str, method: str = 'GET', 
+                     params: Optional[Dict[str, Any]] = None,
+                     expected_status: Union[int, List[int]] = 200) -> bool:
+        """
+        Test a single API endpoint and log the result.
+        
+        Args:
+            endpoint: The endpoint path (e.g., '/api/status')
+            method: HTTP method ('GET', 'POST', etc.)
+            params: Query parameters for GET or form data for POST
+            expected_status: Expected HTTP status code, or a list of
+                acceptable ones
+            
+        Returns:
+            True if test passed, False otherwise
+        """
+        passed, level, message = self.probe(endpoint, method, params, expected_status)
+        logger.log(level, message)
+        return passed
     
     def run_all_tests(self) -> bool:
         """Run all API endpoint tests."""
@@ -136,20 +176,14 @@ class BACmonAPITester:
         passed = 0
         total = len(tests)
         
-        for test in tests:
-            endpoint, method, params, expected_status = test
-            
-            # Handle multiple acceptable status codes
-            if isinstance(expected_status, list):
-                result = False
-                for status in expected_status:
-                    if self.test_endpoint(endpoint, method, params, status):
-                        result = True
-                        break
-            else:
-                result = self.test_endpoint(endpoint, method, params, expected_status)
-            
-            self.test_results[endpoint] = result
+        # Run the requests concurrently on the tester's session, results are
+        # collected and logged in the order of the tests
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_TESTS) as executor:
+            results = list(executor.map(lambda test: self.probe(*test), tests))
+        
+        for test, (result, level, message) in zip(tests, results):
+            logger.log(level, message)
+            self.test_results[test[0]] = result
             if result:
                 passed += 1
         
@@ -173,14 +207,14 @@ def test_response_format():
     
     # Test a simple endpoint
     try:
-        response = requests.get(f"{tester.base_url}/api/status", timeout=10)
+        response = tester.session.get(f"{tester.base_url}/api/status", timeout=10)
         
         if response.status_code == 200:
             data = response.json()
             
             # Check required fields
-            required_fields = ['status', 'timestamp', 'version', 'code']
-            missing_fields = [field for field in required_fields if field not in data]
+            fields = data.keys() if isinstance(data, dict) else set()
+            missing_fields = sorted(REQUIRED_FIELDS - fields)
             
             if missing_fields:
                 logger.error(f"❌ Missing required fields: {missing_fields}")
@@ -209,6 +243,8 @@ def test_response_format():
     except Exception as e:
         logger.error(f"❌ Failed to test response format: {e}")
         return False
+    finally:
+        tester.close()
 
 def check_server_availability(base_url: str = "http://localhost:9090") -> bool:
     """Check if the BACmon server is running."""
@@ -237,7 +273,10 @@ if __name__ == "__main__":
     
     # Run all endpoint tests
     tester = BACmonAPITester()
-    success = tester.run_all_tests()
+    try:
+        success = tester.run_all_tests()
+    finally:
+        tester.close()
     
     if success:
         logger.info("\n🎉 All API tests completed successfully!")
@@ -10,10 +10,18 @@ in the BACmon API to ensure all validation functions work correctly.
 
 import sys
 import requests
+from requests.adapters import HTTPAdapter
 import json
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional, Tuple
 import time
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # Test configuration
 BASE_URL = 'http://localhost:8080'
 API_KEY = 'test_key_123'  # Test API key
@@ -21,6 +29,18 @@ HEADERS = {
     'X-API-Key': API_KEY,
     'Content-Type': 'application/json'
 }
+# Requests sent to the server at the same time
+MAX_CONCURRENT_TESTS = 8
+
+# Fields of the standardized response format, with their types
+FIELD_TYPES = {'status': str, 'timestamp': int, 'version': str, 'code': int}
+REQUIRED_FIELDS = frozenset(FIELD_TYPES)
+
+def parse_json(response: requests.Response) -> Any:
+    """Parse a JSON response, from its bytes with orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(response.content)
+    return response.json()
 
 class APIValidationTester:
     """Test class for API validation and error handling."""
@@ -29,81 +49,125 @@ class APIValidationTester:
         self.base_url = base_url
         self.headers = headers
         self.test_results = []
+        # Tests passed so far, counted as they are recorded
+        self.passed_count = 0
+        # Output of the current phase, written at once when it is done
+        self._out: List[str] = []
+        
+        # Keep connections to the server alive between tests
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
     
-    def test_endpoint(self, endpoint: str, params: Dict[str, str] = None, 
-                     expected_status: int = 200, expected_error_code: Optional[int] = None,
-                     test_name: str = "") -> bool:
-        """Test an API endpoint with given parameters."""
+    def emit(self, line: str = "") -> None:
+        """Add a line to the output of the current phase."""
+        self._out.append(line)
+    
+    def flush_output(self) -> None:
+        """Write the output of the current phase."""
+        if self._out:
+            sys.stdout.write('\n'.join(self._out) + '\n')
+            sys.stdout.flush()
+            self._out.clear()
+    
+    def close(self) -> None:
+        """Close the connections to the server."""
+        self.session.close()
+    
+    def probe(self, endpoint: str, params: Dict[str, str] = None,
+              expected_status: int = 200, expected_error_code: Optional[int] = None,
+              test_name: str = "", method: str = 'GET') -> Tuple[str, bool, str, str]:
+        """
+        Request an API endpoint and check the response, without reporting it.
+        
+        Responses must follow the standardized format, with fields of the
+        right types when successful. POST requests are only checked for their
+        status.
+        
+        Returns:
+            The test name, whether it passed, the details recorded for it and
+            the message printed for it
+        """
         try:
             url = f"{self.base_url}{endpoint}"
-            response = requests.get(url, params=params, headers=self.headers, timeout=10)
+            if method == 'POST':
+                response = self.session.post(url, timeout=10)
+                if response.status_code != expected_status:
+                    return (test_name, False, f"Wrong status {response.status_code}",
+                            f"Expected status {expected_status}, got {response.status_code}")
+                return test_name, True, "OK", "PASSED"
+            
+            response = self.session.get(url, params=params, timeout=10)
             
             # Parse JSON response
             try:
-                data = response.json()
+                data = parse_json(response)
             except json.JSONDecodeError:
-                print(f"❌ {test_name}: Invalid JSON response")
-                self.test_results.append((test_name, False, "Invalid JSON"))
-                return False
+                return test_name, False, "Invalid JSON", "Invalid JSON response"
             
             # Check response format
-            required_fields = ['status', 'timestamp', 'version', 'code']
-            for field in required_fields:
-                if field not in data:
-                    print(f"❌ {test_name}: Missing required field '{field}'")
-                    self.test_results.append((test_name, False, f"Missing {field}"))
-                    return False
+            missing_fields = REQUIRED_FIELDS.difference(data)
+            if missing_fields:
+                missing = ', '.join(sorted(missing_fields))
+                return test_name, False, f"Missing {missing}", f"Missing required fields {missing}"
             
             # Check status code
             if response.status_code != expected_status:
-                print(f"❌ {test_name}: Expected status {expected_status}, got {response.status_code}")
-                self.test_results.append((test_name, False, f"Wrong status {response.status_code}"))
-                return False
+                return (test_name, False, f"Wrong status {response.status_code}",
+                        f"Expected status {expected_status}, got {response.status_code}")
+            
+            # Check field types of successful responses
+            if response.status_code == 200 and not all(
+                    isinstance(data[field], field_type) for field, field_type in FIELD_TYPES.items()):
+                return test_name, False, "Wrong field types", "Incorrect field types"
             
             # Check error code if expected
             if expected_error_code is not None:
                 if 'error_code' not in data:
-                    print(f"❌ {test_name}: Expected error_code {expected_error_code}, but none found")
-                    self.test_results.append((test_name, False, "Missing error_code"))
-                    return False
+                    return (test_name, False, "Missing error_code",
+                            f"Expected error_code {expected_error_code}, but none found")
                 elif data['error_code'] != expected_error_code:
-                    print(f"❌ {test_name}: Expected error_code {expected_error_code}, got {data['error_code']}")
-                    self.test_results.append((test_name, False, f"Wrong error_code {data['error_code']}"))
-                    return False
+                    return (test_name, False, f"Wrong error_code {data['error_code']}",
+                            f"Expected error_code {expected_error_code}, got {data['error_code']}")
             
             # Success
-            print(f"✅ {test_name}: PASSED")
-            self.test_results.append((test_name, True, "OK"))
-            return True
+            return test_name, True, "OK", "PASSED"
             
         except requests.RequestException as e:
-            print(f"❌ {test_name}: Request failed - {e}")
-            self.test_results.append((test_name, False, f"Request error: {e}"))
-            return False
+            return test_name, False, f"Request error: {e}", f"Request failed - {e}"
+    
+    def record(self, result: Tuple[str, bool, str, str]) -> bool:
+        """Output and record the result of probe(), returning whether it passed."""
+        test_name, success, details, message = result
+        self.emit(f"{'✅' if success else '❌'} {test_name}: {message}")
+        self.test_results.append((test_name, success, details))
+        self.passed_count += success
+        return success
+    
+    def test_endpoint(self, endpoint: str, params: Dict[str, str] = None, 
+                     expected_status: int = 200, expected_error_code: Optional[int] = None,
+                     test_name: str = "") -> bool:
+        """Test an API endpoint with given parameters."""
+        passed = self.record(self.probe(endpoint, params, expected_status, expected_error_code, test_name))
+        self.flush_output()
+        return passed
     
     def run_validation_tests(self) -> bool:
         """Run comprehensive validation tests."""
-        print("🧪 Starting API Validation Tests\n")
-        
-        all_passed = True
+        self.emit("🧪 Starting API Validation Tests\n")
         
         # Test 1: Valid API calls should work
-        print("📋 Testing Valid API Calls:")
         valid_tests = [
             ("/api/alerts", {}, 200, None, "Valid alerts request"),
             ("/api/alerts", {"min_level": "warning"}, 200, None, "Valid alerts with min_level"),
             ("/api/extended_metrics", {"key": "test"}, 200, None, "Valid extended metrics"),
             ("/api/status", {}, 200, None, "Valid status request"),
+            ("/api/monitoring", {}, 200, None, "Valid monitoring request"),
         ]
         
-        for endpoint, params, expected_status, error_code, test_name in valid_tests:
-            if not self.test_endpoint(endpoint, params, expected_status, error_code, test_name):
-                all_passed = False
-        
-        print()
-        
         # Test 2: Parameter validation
-        print("🔍 Testing Parameter Validation:")
         param_tests = [
             # Invalid parameters
             ("/api/alerts", {"invalid_param": "test"}, 400, 4001, "Invalid parameter name"),
@@ -129,95 +193,40 @@ class APIValidationTester:
             ("/api/monitoring", {"start": "1000", "end": "500"}, 400, 4004, "Start after end"),
         ]
         
-        for endpoint, params, expected_status, error_code, test_name in param_tests:
-            if not self.test_endpoint(endpoint, params, expected_status, error_code, test_name):
-                all_passed = False
-        
-        print()
-        
-        # Test 3: UUID validation
-        print("🔑 Testing UUID Validation:")
+        # Test 3: UUID validation, acknowledge/resolve endpoints use POST
         uuid_tests = [
-            ("/api/alerts/invalid", {}, 400, 4003, "Invalid UUID format"),
-            ("/api/alerts/123", {}, 400, 4003, "Short UUID"),
-            ("/api/alerts//acknowledge", {}, 404, None, "Empty UUID"),
+            ("/api/alerts/invalid", {}, 400, 4003, "Invalid UUID format", 'GET'),
+            ("/api/alerts/123", {}, 400, 4003, "Short UUID", 'GET'),
+            ("/api/alerts//acknowledge", {}, 404, None, "Empty UUID", 'POST'),
         ]
         
-        for endpoint, params, expected_status, error_code, test_name in uuid_tests:
-            # Use POST for acknowledge/resolve endpoints
-            method = 'POST' if 'acknowledge' in endpoint or 'resolve' in endpoint else 'GET'
-            if method == 'POST':
-                try:
-                    url = f"{self.base_url}{endpoint}"
-                    response = requests.post(url, headers=self.headers, timeout=10)
-                    # Check for proper error response
-                    if response.status_code == expected_status:
-                        print(f"✅ {test_name}: PASSED")
-                        self.test_results.append((test_name, True, "OK"))
-                    else:
-                        print(f"❌ {test_name}: Expected status {expected_status}, got {response.status_code}")
-                        self.test_results.append((test_name, False, f"Wrong status {response.status_code}"))
-                        all_passed = False
-                except requests.RequestException as e:
-                    print(f"❌ {test_name}: Request failed - {e}")
-                    self.test_results.append((test_name, False, f"Request error: {e}"))
-                    all_passed = False
-            else:
-                if not self.test_endpoint(endpoint, params, expected_status, error_code, test_name):
-                    all_passed = False
-        
-        return all_passed
-    
-    def test_response_format(self) -> bool:
-        """Test that all responses follow the standardized format."""
-        print("\n📊 Testing Response Format Standardization:")
-        
-        endpoints_to_test = [
-            "/api/status",
-            "/api/alerts", 
-            "/api/extended_metrics?key=test",
-            "/api/monitoring",
+        groups = [
+            ("📋 Testing Valid API Calls:", valid_tests),
+            ("🔍 Testing Parameter Validation:", param_tests),
+            ("🔑 Testing UUID Validation:", uuid_tests),
         ]
         
-        all_passed = True
+        # The tests are independent, send them all at once and report the
+        # results in order
+        tests = [test for _, group_tests in groups for test in group_tests]
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_TESTS) as executor:
+            results = iter(list(executor.map(lambda test: self.probe(*test), tests)))
         
-        for endpoint in endpoints_to_test:
-            try:
-                url = f"{self.base_url}{endpoint}"
-                response = requests.get(url, headers=self.headers, timeout=10)
-                
-                if response.status_code != 200:
-                    continue  # Skip non-200 responses for format test
-                
-                data = response.json()
-                
-                # Check required format fields
-                required_fields = ['status', 'timestamp', 'version', 'code']
-                missing_fields = [field for field in required_fields if field not in data]
-                
-                if missing_fields:
-                    print(f"❌ {endpoint}: Missing fields {missing_fields}")
+        all_passed = True
+        for index, (title, group_tests) in enumerate(groups):
+            if index:
+                self.emit()
+            self.emit(title)
+            for _ in group_tests:
+                if not self.record(next(results)):
                     all_passed = False
-                else:
-                    # Check field types
-                    if (isinstance(data['status'], str) and
-                        isinstance(data['timestamp'], int) and
-                        isinstance(data['version'], str) and
-                        isinstance(data['code'], int)):
-                        print(f"✅ {endpoint}: Correct format")
-                    else:
-                        print(f"❌ {endpoint}: Incorrect field types")
-                        all_passed = False
-                        
-            except Exception as e:
-                print(f"❌ {endpoint}: Format test failed - {e}")
-                all_passed = False
         
+        self.flush_output()
         return all_passed
     
     def print_summary(self) -> None:
         """Print test summary."""
-        passed = sum(1 for _, success, _ in self.test_results if success)
+        passed = self.passed_count
         total = len(self.test_results)
         
         print(f"\n📋 Test Summary:")
@@ -258,13 +267,15 @@ def main():
     # Run tests
     tester = APIValidationTester(BASE_URL, HEADERS)
     
-    validation_passed = tester.run_validation_tests()
-    format_passed = tester.test_response_format()
-    
-    tester.print_summary()
+    try:
+        validation_passed = tester.run_validation_tests()
+        
+        tester.print_summary()
+    finally:
+        tester.close()
     
     # Exit with appropriate code
-    if validation_passed and format_passed:
+    if validation_passed:
         print("\n🎯 All validation and format tests passed!")
         sys.exit(0)
     else:
@@ -5,10 +5,28 @@ Tests v1/v2 API compatibility, versioned endpoints, and enhanced features.
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import time
 import sys
-from typing import Dict, Any, Optional
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Test groups run at the same time
+MAX_CONCURRENT_TESTS = 8
+
+def parse_json(response: requests.Response) -> Any:
+    """Parse a JSON response from its bytes, with orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(response.content)
+    return json.loads(response.content)
 
 class APIVersioningTester:
     """Test suite for API versioning functionality."""
@@ -21,14 +39,39 @@ class APIVersioningTester:
             'Content-Type': 'application/json'
         }
         self.test_results = []
+        # Output and results of the test group run by the current thread
+        self._local = threading.local()
+        # Results of GET requests by endpoint and extra headers, the same for
+        # the whole run, requested once even by concurrent test groups
+        self._response_cache: Dict[Tuple, Future] = {}
+        self._response_cache_lock = threading.Lock()
+        
+        # Keep connections to the server alive between tests
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+    
+    def close(self):
+        """Close the connections to the server."""
+        self.session.close()
+    
+    def output(self, line: str = ""):
+        """Print a line, or keep it for later when running a test group."""
+        lines = getattr(self._local, 'lines', None)
+        if lines is None:
+            print(line)
+        else:
+            lines.append(line)
     
     def log_test(self, test_name: str, success: bool, details: str = ""):
         """Log test result."""
         status = "PASS" if success else "FAIL"
-        print(f"[{status}] {test_name}")
+        self.output(f"[{status}] {test_name}")
         if details:
-            print(f"    {details}")
-        self.test_results.append({
+            self.output(f"    {details}")
+        getattr(self._local, 'results', self.test_results).append({
             'test': test_name,
             'success': success,
             'details': details
@@ -36,23 +79,38 @@ class APIVersioningTester:
     
     def make_request(self, endpoint: str, method: str = 'GET', headers: Optional[Dict] = None) -> tuple:
         """Make HTTP request and return (success, response_data, status_code)."""
+        if method != 'GET':
+            return self._send_request(endpoint, method, headers)
+        
+        key = (endpoint, tuple(sorted(headers.items())) if headers else ())
+        with self._response_cache_lock:
+            future = self._response_cache.get(key)
+            sender = future is None
+            if sender:
+                future = self._response_cache[key] = Future()
+        if sender:
+            future.set_result(self._send_request(endpoint, method, headers))
+        return future.result()
+    
+    def _send_request(self, endpoint: str, method: str, headers: Optional[Dict]) -> tuple:
+        """Send an HTTP request and return (success, response_data, status_code)."""
         try:
             url = f"{self.base_url}{endpoint}"
-            request_headers = self.headers.copy()
-            if headers:
-                request_headers.update(headers)
             
+            # The session sends the default headers, only overrides are passed
             if method == 'GET':
-                response = requests.get(url, headers=request_headers, timeout=10)
+                response = self.session.get(url, headers=headers, timeout=10)
             elif method == 'POST':
-                response = requests.post(url, headers=request_headers, timeout=10)
+                response = self.session.post(url, headers=headers, timeout=10)
             else:
                 return False, f"Unsupported method: {method}", 0
             
+            # Bodies that are not JSON are decoded as text from the same bytes,
+            # decoding errors of JSON parsers are ValueErrors as well
             try:
-                data = response.json()
-            except:
-                data = response.text
+                data = parse_json(response)
+            except ValueError:
+                data = response.content.decode(response.encoding or 'utf-8', 'replace')
             
             return True, data, response.status_code
         except Exception as e:
@@ -60,7 +118,7 @@ class APIVersioningTester:
     
     def test_api_info_endpoints(self):
         """Test API info endpoints for both versions."""
-        print("\n=== Testing API Info Endpoints ===")
+        self.output("\n=== Testing API Info Endpoints ===")
         
         # Test v1 API info
         success, data, status = self.make_request('/api/info')
@@ -90,7 +148,7 @@ class APIVersioningTester:
     
     def test_version_negotiation(self):
         """Test version negotiation via Accept headers."""
-        print("\n=== Testing Version Negotiation ===")
+        self.output("\n=== Testing Version Negotiation ===")
         
         # Test Accept header for v2
         headers = {'Accept': 'application/vnd.bacmon.v2+json'}
@@ -106,7 +164,7 @@ class APIVersioningTester:
     
     def test_backward_compatibility(self):
         """Test backward compatibility of existing endpoints."""
-        print("\n=== Testing Backward Compatibility ===")
+        self.output("\n=== Testing Backward Compatibility ===")
         
         # Test existing endpoints without version prefix
         endpoints = ['/api/status', '/api/alerts', '/api/metrics']
@@ -122,7 +180,7 @@ class APIVersioningTester:
     
     def test_versioned_status_endpoint(self):
         """Test versioned status endpoints."""
-        print("\n=== Testing Versioned Status Endpoints ===")
+        self.output("\n=== Testing Versioned Status Endpoints ===")
         
         # Test v1 status
         success, data, status = self.make_request('/api/v1/status')
@@ -147,7 +205,7 @@ class APIVersioningTester:
     
     def test_streaming_endpoints(self):
         """Test v2 streaming endpoints."""
-        print("\n=== Testing Streaming Endpoints (V2 Only) ===")
+        self.output("\n=== Testing Streaming Endpoints (V2 Only) ===")
         
         # Test v1 streaming (should fail)
         success, data, status = self.make_request('/api/v1/monitoring/stream')
@@ -158,13 +216,13 @@ class APIVersioningTester:
         
         # Test v2 streaming availability (just check if endpoint exists)
         try:
-            import requests
             url = f"{self.base_url}/api/v2/monitoring/stream"
-            response = requests.get(url, headers=self.headers, timeout=2, stream=True)
-            if response.status_code == 200 and 'text/event-stream' in response.headers.get('content-type', ''):
-                self.log_test("V2 Monitoring Stream Available", True, "Streaming endpoint accessible")
-            else:
-                self.log_test("V2 Monitoring Stream Available", False, f"Status: {response.status_code}")
+            # Closed right away, so that the connection is not held by the stream
+            with self.session.get(url, timeout=2, stream=True) as response:
+                if response.status_code == 200 and 'text/event-stream' in response.headers.get('content-type', ''):
+                    self.log_test("V2 Monitoring Stream Available", True, "Streaming endpoint accessible")
+                else:
+                    self.log_test("V2 Monitoring Stream Available", False, f"Status: {response.status_code}")
         except requests.exceptions.Timeout:
             self.log_test("V2 Monitoring Stream Available", True, "Endpoint exists (timeout expected for streaming)")
         except Exception as e:
@@ -172,7 +230,7 @@ class APIVersioningTester:
     
     def test_data_aggregation(self):
         """Test v2 data aggregation endpoint."""
-        print("\n=== Testing Data Aggregation (V2 Only) ===")
+        self.output("\n=== Testing Data Aggregation (V2 Only) ===")
         
         # Test v1 aggregation (should fail)
         success, data, status = self.make_request('/api/v1/data/aggregate?keys=test&function=avg')
@@ -197,7 +255,7 @@ class APIVersioningTester:
     
     def test_response_format_differences(self):
         """Test response format differences between versions."""
-        print("\n=== Testing Response Format Differences ===")
+        self.output("\n=== Testing Response Format Differences ===")
         
         # Get v1 response
         success1, data1, status1 = self.make_request('/api/v1/status')
@@ -221,7 +279,7 @@ class APIVersioningTester:
     
     def test_error_handling(self):
         """Test error handling across versions."""
-        print("\n=== Testing Error Handling ===")
+        self.output("\n=== Testing Error Handling ===")
         
         # Test invalid version
         success, data, status = self.make_request('/api/v99/status')
@@ -240,19 +298,41 @@ class APIVersioningTester:
         else:
             self.log_test("V2 Enhanced Error Format", False, f"Unexpected response: {status}")
     
+    def run_captured(self, test_group) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Run a test group, returning its output and results instead of
+        printing and recording them."""
+        self._local.lines = []
+        self._local.results = []
+        try:
+            test_group()
+            return self._local.lines, self._local.results
+        finally:
+            del self._local.lines, self._local.results
+    
     def run_all_tests(self):
         """Run all API versioning tests."""
         print("BACmon API Versioning Test Suite")
         print("=" * 50)
         
-        self.test_api_info_endpoints()
-        self.test_version_negotiation()
-        self.test_backward_compatibility()
-        self.test_versioned_status_endpoint()
-        self.test_streaming_endpoints()
-        self.test_data_aggregation()
-        self.test_response_format_differences()
-        self.test_error_handling()
+        test_groups = [
+            self.test_api_info_endpoints,
+            self.test_version_negotiation,
+            self.test_backward_compatibility,
+            self.test_versioned_status_endpoint,
+            self.test_streaming_endpoints,
+            self.test_data_aggregation,
+            self.test_response_format_differences,
+            self.test_error_handling,
+        ]
+        
+        # The groups are independent, run them at the same time and report
+        # them in order
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_TESTS) as executor:
+            outputs = list(executor.map(self.run_captured, test_groups))
+        for lines, results in outputs:
+            for line in lines:
+                print(line)
+            self.test_results.extend(results)
         
         # Summary
         print("\n" + "=" * 50)
@@ -287,7 +367,10 @@ def main():
     args = parser.parse_args()
     
     tester = APIVersioningTester(args.url, args.api_key)
-    success = tester.run_all_tests()
+    try:
+        success = tester.run_all_tests()
+    finally:
+        tester.close()
     
     sys.exit(0 if success else 1)
 
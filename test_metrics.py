@@ -0,0 +1,419 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test script for the Extended Metrics Module
+
+This script tests the metric processors and the MetricManager storage
+paths without requiring a running Redis server.
+"""
+
+import sys
+import unittest
+from unittest.mock import MagicMock
+from typing import Any, Dict, List
+
+# Import the metrics module
+try:
+    import numpy as np
+    import metrics
+    import metrics_kernel
+    from metrics import (
+        MetricManager, MetricType, CountMetricProcessor, SizeMetricProcessor,
+        ProtocolMetricProcessor, ErrorRateMetricProcessor, ResponseTimeMetricProcessor,
+        ConnectionMetricProcessor, StandardMetricsProcessor, PacketBatch, PacketRing
+    )
+except ImportError as e:
+    print(f"Cannot import metrics module: {e}")
+    print("Make sure metrics.py is in the current directory.")
+    sys.exit(1)
+
+
+class FakeRedisLists:
+    """Minimal in-memory stand-in for the Redis list commands used by metrics."""
+
+    def __init__(self):
+        self.lists: Dict[str, List[Any]] = {}
+
+    def lpush(self, key, *values):
+        self.lists.setdefault(key, [])[0:0] = reversed(values)
+        return len(self.lists[key])
+
+    def ltrim(self, key, start, end):
+        self.lists[key] = self.lists.get(key, [])[start:end + 1]
+        return True
+
+    def lrange(self, key, start, end):
+        items = self.lists.get(key, [])
+        return items[start:] if end == -1 else items[start:end + 1]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """Pipeline stand-in that applies commands to a FakeRedisLists on execute."""
+
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((name, args))
+
+    def execute(self):
+        return [getattr(self.redis_client, name)(*args) for name, args in self.commands]
+
+
+class TestMetricProcessors(unittest.TestCase):
+    """Test cases for the standard metric processors"""
+
+    def test_size_processor(self):
+        """Test size statistics"""
+        processor = SizeMetricProcessor()
+        for size in (10, 30, 20):
+            processor.process({"size": size})
+        processor.process({})
+
+        value = processor.get_value()
+        self.assertEqual(value["count"], 3)
+        self.assertEqual(value["min"], 10)
+        self.assertEqual(value["max"], 30)
+        self.assertEqual(value["avg"], 20)
+
+    def test_protocol_processor(self):
+        """Test protocol distribution percentages"""
+        processor = ProtocolMetricProcessor()
+        for protocol in ("BACnet", "BACnet", "BVLL", "BACnet"):
+            processor.process({"protocol": protocol})
+
+        value = processor.get_value()
+        self.assertEqual(value["total"], 4)
+        self.assertEqual(value["protocols"]["BACnet"]["count"], 3)
+        self.assertAlmostEqual(value["protocols"]["BVLL"]["percentage"], 25.0)
+
+    def test_protocol_overflow(self):
+        """Test that protocols beyond the id space are counted as other"""
+        saved = metrics.MAX_PROTOCOLS
+        metrics.MAX_PROTOCOLS = len(metrics._protocol_names)
+        try:
+            processor = ProtocolMetricProcessor()
+            processor.process({"protocol": "never-seen-before"})
+        finally:
+            metrics.MAX_PROTOCOLS = saved
+
+        value = processor.get_value()
+        self.assertNotIn("never-seen-before", value["protocols"])
+        self.assertEqual(value["protocols"][metrics.OTHER_PROTOCOL]["count"], 1)
+
+    def test_error_rate_processor(self):
+        """Test error rate percentage"""
+        processor = ErrorRateMetricProcessor()
+        for error in (True, False, False, False):
+            processor.process({"error": error})
+
+        value = processor.get_value()
+        self.assertEqual(value["errors"], 1)
+        self.assertEqual(value["total"], 4)
+        self.assertAlmostEqual(value["rate"], 25.0)
+
+    def test_response_time_processor(self):
+        """Test response time average and percentiles over the sample window"""
+        processor = ResponseTimeMetricProcessor()
+        for response_time in range(4):
+            processor.process({"response_time": response_time})
+        self.assertIsNone(processor.get_value()["p50"])
+
+        for response_time in range(4, 200):
+            processor.process({"response_time": response_time})
+
+        value = processor.get_value()
+        self.assertEqual(value["count"], 200)
+        self.assertEqual(value["min"], 0)
+        self.assertEqual(value["max"], 199)
+        self.assertAlmostEqual(value["avg"], 99.5)
+        # Percentiles only cover the last 100 samples
+        self.assertEqual(value["p50"], 150)
+        self.assertEqual(value["p90"], 190)
+        self.assertEqual(value["p95"], 195)
+        self.assertNotIn("samples", value)
+
+    def test_connection_processor(self):
+        """Test connection durations and the bound on tracked connections"""
+        processor = ConnectionMetricProcessor()
+        processor.MAX_TRACKED_CONNECTIONS = 2
+        for conn_id in ("a", "b", "c"):
+            processor.process({"connection": {"new": True, "id": conn_id, "time": 100}})
+        processor.process({"connection": {"closed": True, "id": "c", "time": 110}})
+        # "a" was evicted, so its duration is unknown
+        processor.process({"connection": {"closed": True, "id": "a", "time": 120}})
+        processor.process({"connection": {"closed": True, "id": "c", "time": 130}})
+
+        value = processor.get_value()
+        self.assertEqual(value["new_connections"], 3)
+        self.assertEqual(value["closed_connections"], 3)
+        self.assertEqual(value["active_connections"], 2)
+        self.assertEqual(value["avg_duration"], 10)
+        self.assertNotIn("connection_map", value)
+
+    def test_flatten_round_trip(self):
+        """Test flattening values to time series scalars and back"""
+        processor = ProtocolMetricProcessor()
+        for protocol in ("BACnet", "BVLL"):
+            processor.process({"protocol": protocol})
+        value = processor.get_value()
+
+        scalars = dict(processor.flatten_to_scalars(value))
+        self.assertEqual(scalars, {"protocols.BACnet": 1.0, "protocols.BVLL": 1.0, "total": 2.0})
+        self.assertEqual(processor.unflatten_scalars(scalars), value)
+
+        count = CountMetricProcessor()
+        count.process({})
+        self.assertEqual(count.unflatten_scalars(dict(count.flatten_to_scalars(count.get_value()))), 1)
+
+    def test_extract_bacnet_metrics(self):
+        """Test extracting packet information from APDU-like objects"""
+        class ErrorAPDU:
+            pduData = b"\x50\x00\x0c"
+            apduType = 5
+            apduService = 12
+
+        self.assertEqual(metrics.extract_bacnet_metrics(ErrorAPDU()), {
+            "protocol": "BACnet", "size": 3, "error": True, "service": "12"
+        })
+        self.assertEqual(metrics.extract_bacnet_metrics(object()), {"protocol": "BACnet", "size": 0})
+
+
+class TestMetricManager(unittest.TestCase):
+    """Test cases for metric storage and retrieval"""
+
+    def test_list_storage_round_trip(self):
+        """Test storing metrics in Redis lists and reading them back"""
+        redis_client = FakeRedisLists()
+        manager = MetricManager(redis_client)
+        manager.process_packet("total", {"size": 100, "protocol": "BACnet"})
+        manager.process_packet("total", {"size": 50, "protocol": "BACnet", "error": True})
+
+        manager.store_metrics(1, "s")
+
+        samples = manager.get_samples("total", MetricType.SIZE, "s")
+        self.assertEqual(len(samples), 1)
+        timestamp, value = samples[0]
+        self.assertIsInstance(timestamp, int)
+        self.assertEqual(value["min"], 50)
+        self.assertEqual(value["max"], 100)
+
+        _, count = manager.get_samples("total", MetricType.COUNT, "s")[0]
+        self.assertEqual(count, 2)
+
+    def test_legacy_json_samples(self):
+        """Test reading samples stored as JSON text alongside MessagePack ones"""
+        redis_client = FakeRedisLists()
+        manager = MetricManager(redis_client)
+        manager.process_packet("total", {"size": 100})
+        manager.store_metrics(1, "s")
+        redis_client.lpush("total:size:s", b'[1700000000, {"min": 1, "max": 2}]')
+
+        samples = manager.get_samples("total", MetricType.SIZE, "s")
+        self.assertEqual(len(samples), 2)
+        self.assertEqual(samples[0][1]["max"], 100)
+        self.assertEqual(samples[1], (1700000000, {"min": 1, "max": 2}))
+
+    def test_process_batch_matches_packets(self):
+        """Test that batch processing gives the same metrics as per-packet processing"""
+        packets = [
+            {"size": 10 + i % 7, "protocol": ("BACnet", "BVLL", "unknown")[i % 3], "error": i % 4 == 0}
+            for i in range(300)
+        ]
+        for i in range(0, 300, 2):
+            packets[i]["response_time"] = float(i % 50)
+        # Packets without a size, a protocol or both, and connection events
+        for i in range(0, 300, 5):
+            del packets[i]["size"]
+        for i in range(0, 300, 11):
+            del packets[i]["protocol"]
+        for i in range(0, 300, 30):
+            packets[i]["connection"] = {"new": True, "id": i, "time": i}
+            packets[i + 7]["connection"] = {"closed": True, "id": i, "time": i + 7}
+
+        per_packet = MetricManager()
+        batched = MetricManager()
+        ringed = MetricManager()
+        ring = PacketRing(capacity=128)
+        for manager in (per_packet, batched, ringed):
+            manager.add_processor("total", ResponseTimeMetricProcessor())
+            manager.add_processor("total", ConnectionMetricProcessor())
+        for packet in packets:
+            per_packet.process_packet("total", packet)
+        batched.process_batch("total", PacketBatch.from_packets(packets[:100]))
+        batched.process_batch("total", PacketBatch.from_packets(packets[100:]))
+        for start in range(0, 300, 100):
+            for packet in packets[start:start + 100]:
+                self.assertTrue(ring.push(packet))
+            ringed.drain_ring("total", ring)
+
+        expected = per_packet.get_all_metrics("total")
+        self.assertEqual(expected[MetricType.CONNECTION]["new_connections"], 10)
+        self.assertEqual(batched.get_all_metrics("total"), expected)
+        self.assertEqual(ringed.get_all_metrics("total"), expected)
+
+    def test_process_batch_missing_fields(self):
+        """Test that packets without a size or protocol are left out of their statistics"""
+        packets = [{"size": 10, "protocol": "BACnet"}, {"protocol": "BACnet"}, {"size": 30}]
+        for batch in (PacketBatch.from_packets(packets), PacketBatch.from_packets([packets[1]])):
+            manager = MetricManager()
+            manager.process_batch("total", batch)
+            for packet in batch.iter_packets():
+                manager.process_packet("packets", packet)
+            self.assertEqual(manager.get_all_metrics("total"), manager.get_all_metrics("packets"))
+
+        batch = PacketBatch.from_packets(packets)
+        batch.packets = None
+        self.assertEqual(list(batch.iter_packets()), [dict(packet, error=False) for packet in packets])
+
+        manager = MetricManager()
+        manager.process_batch("total", PacketBatch.from_packets(packets))
+        metrics_value = manager.get_all_metrics("total")
+        self.assertEqual(metrics_value[MetricType.SIZE]["min"], 10)
+        self.assertEqual(metrics_value[MetricType.SIZE]["avg"], 20)
+        self.assertEqual(metrics_value[MetricType.SIZE]["count"], 2)
+        self.assertEqual(metrics_value[MetricType.PROTOCOL]["protocols"], {"BACnet": {"count": 2, "percentage": 100.0}})
+
+    def test_summarize_batch(self):
+        """Test that the selected batch kernel agrees with the NumPy one"""
+        rng = np.random.default_rng(0)
+        sizes = rng.integers(0, 1500, 1000).astype(metrics.SIZE_DTYPE)
+        errors = rng.random(1000) < 0.1
+        protocol_ids = rng.integers(0, 8, 1000).astype(metrics.PROTOCOL_ID_DTYPE)
+
+        expected = np.zeros(metrics.MAX_PROTOCOLS, dtype=np.int64)
+        summary = metrics_kernel._summarize_numpy(sizes, errors, protocol_ids, expected)
+        total, size_min, size_max, error_count, protocol_counts = metrics_kernel.summarize_batch(
+            sizes, errors, protocol_ids, metrics.MAX_PROTOCOLS
+        )
+        self.assertEqual((total, size_min, size_max, error_count), summary)
+        np.testing.assert_array_equal(protocol_counts, expected)
+
+    def test_standard_processors(self):
+        """Test the fused standard processors alongside replaced and added ones"""
+        manager = MetricManager()
+        manager.process_packet("total", {"size": 10, "protocol": "BACnet"})
+        self.assertEqual(manager._plans["total"], manager._standard_processors["total"].process)
+
+        manager.add_processor("total", CountMetricProcessor())
+        manager.add_processor("total", ResponseTimeMetricProcessor())
+        manager.process_packet("total", {"size": 30, "protocol": "BACnet", "error": True})
+
+        self.assertEqual(manager.get_metric_value("total", MetricType.COUNT), 1)
+        self.assertEqual(manager.get_metric_value("total", MetricType.SIZE)["avg"], 20)
+        self.assertEqual(manager.get_metric_value("total", MetricType.ERROR_RATE)["rate"], 50.0)
+        self.assertEqual(manager.get_metric_value("total", MetricType.PROTOCOL)["total"], 2)
+
+    def test_packet_ring(self):
+        """Test handing packets to the metrics through a ring buffer"""
+        ring = PacketRing(capacity=4)
+        manager = MetricManager()
+
+        for size in (10, 20, 30):
+            self.assertTrue(ring.push({"size": size, "protocol": "BACnet"}))
+        self.assertEqual(manager.drain_ring("total", ring, max_packets=2), 2)
+
+        # Wrap around the end of the ring until it is full
+        for size in (40, 50, 60):
+            self.assertTrue(ring.push({"size": size, "protocol": "BVLL", "error": True}))
+        self.assertFalse(ring.push({"size": 70}))
+        self.assertEqual(manager.drain_ring("total", ring), 4)
+        self.assertEqual(manager.drain_ring("total", ring), 0)
+
+        metrics_value = manager.get_all_metrics("total")
+        self.assertEqual(metrics_value[MetricType.COUNT], 6)
+        self.assertEqual(metrics_value[MetricType.SIZE]["total"], 210)
+        self.assertEqual(metrics_value[MetricType.ERROR_RATE]["errors"], 3)
+        self.assertEqual(metrics_value[MetricType.PROTOCOL]["protocols"]["BVLL"]["count"], 3)
+
+        with self.assertRaises(ValueError):
+            PacketRing(capacity=3)
+
+    def test_large_packet_sizes(self):
+        """Test that sizes beyond 16 bits are kept by batches and the ring"""
+        packets = [{"size": 70000, "protocol": "BACnet"}, {"size": 100, "protocol": "BACnet"}]
+        ring = PacketRing(capacity=4)
+        for packet in packets:
+            self.assertTrue(ring.push(packet))
+
+        for batch in (PacketBatch.from_packets(packets), ring.drain()):
+            manager = MetricManager()
+            manager.process_batch("total", batch)
+            size = manager.get_metric_value("total", MetricType.SIZE)
+            self.assertEqual((size["min"], size["max"], size["total"]), (100, 70000, 70100))
+
+    def test_timeseries_storage(self):
+        """Test storing metrics with RedisTimeSeries commands"""
+        redis_client = MagicMock()
+        pipe = redis_client.pipeline.return_value
+        manager = MetricManager(redis_client, use_timeseries=True)
+        manager.add_processor("total", SizeMetricProcessor())
+        manager.process_packet("total", {"size": 100})
+        manager.process_packet("other", {"size": 10})
+
+        manager.store_metrics(1, "s")
+
+        commands = [call.args for call in pipe.execute_command.call_args_list]
+        created = [args[1] for args in commands if args[0] == "TS.CREATE"]
+        self.assertIn("total:size:s:avg", created)
+        self.assertIn("total:size:m:avg", created)
+        self.assertTrue(any(args[0] == "TS.CREATERULE" for args in commands))
+
+        # All keys and metric types go out in a single TS.MADD
+        redis_client.execute_command.assert_called_once()
+        madd = redis_client.execute_command.call_args.args
+        self.assertEqual(madd[0], "TS.MADD")
+        self.assertIn("total:size:s:max", madd)
+        self.assertIn("other:count:s:value", madd)
+
+        # Series are only created on the first write
+        pipe.execute_command.reset_mock()
+        redis_client.execute_command.reset_mock()
+        redis_client.execute_command.return_value = [1000] * 4 + [metrics.redis.ResponseError("gone")]
+        manager.store_metrics(1, "s")
+        pipe.execute_command.assert_not_called()
+        redis_client.execute_command.assert_called_once()
+        self.assertNotIn("other:count:s:value", manager._timeseries_keys)
+
+        # Downsampled labels are maintained by compaction rules
+        redis_client.execute_command.reset_mock()
+        manager.store_metrics(60, "m")
+        redis_client.execute_command.assert_not_called()
+
+    def test_timeseries_detection(self):
+        """Test detecting the RedisTimeSeries module once per client"""
+        redis_client = MagicMock()
+        redis_client.execute_command.return_value = [[b"name", b"timeseries", b"ver", 11000]]
+        manager = MetricManager(redis_client)
+        self.assertTrue(manager._timeseries_enabled())
+        self.assertTrue(manager._timeseries_enabled())
+        redis_client.execute_command.assert_called_once_with("MODULE LIST")
+
+        # Clients without the module or the command fall back to Redis lists
+        manager.set_redis_client(FakeRedisLists())
+        self.assertFalse(manager._timeseries_enabled())
+        self.assertFalse(MetricManager(redis_client, use_timeseries=False)._timeseries_enabled())
+
+    def test_timeseries_samples(self):
+        """Test regrouping RedisTimeSeries replies into metric values"""
+        redis_client = MagicMock()
+        redis_client.execute_command.return_value = [
+            [b"total:size:s:max", [], [[2000, b"100"], [1000, b"80"]]],
+            [b"total:size:s:min", [], [[2000, b"50"], [1000, b"80"]]],
+        ]
+        manager = MetricManager(redis_client, use_timeseries=True)
+
+        samples = manager.get_samples("total", MetricType.SIZE, "s")
+        self.assertEqual(samples, [
+            (1, {"max": 80, "min": 80}),
+            (2, {"max": 100, "min": 50}),
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
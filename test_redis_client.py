@@ -28,7 +28,9 @@ logger = logging.getLogger('test_redis_client')
 
 # Import the RedisClient
 try:
-    from redis_client import RedisClient, create_redis_client
+    from redis_client import (
+        DEFAULT_KEEPALIVE_OPTIONS, RedisClient, create_redis_client, decode_value, encode_value
+    )
     import redis
 except ImportError as e:
     logger.error(f"Cannot import required modules: {e}")
@@ -53,9 +55,10 @@ def test_redis_client_api() -> bool:
         'lpush', 'lrange', 'ltrim', 'incr', 'set_startup_time', 'set_daemon_version'
     ]
     
+    # Redis commands are forwarded to the redis-py client
     missing_methods: List[str] = []
     for method in required_methods:
-        if not hasattr(RedisClient, method):
+        if not hasattr(RedisClient, method) and not hasattr(redis.Redis, method):
             missing_methods.append(method)
     
     if missing_methods:
@@ -242,6 +245,92 @@ class TestRedisClientWithMocks(unittest.TestCase):
         # Verify connection_pool was used
         self.assertIn('connection_pool', self.redis_mock.call_args[1])
     
+    def test_shared_pool(self) -> None:
+        """Test that clients with the same settings share a connection pool."""
+        import gc
+        import redis_client
+        
+        client1 = RedisClient(db=7, max_connections=4)
+        client2 = RedisClient(db=7, max_connections=4)
+        client3 = RedisClient(db=8, max_connections=4)
+        self.assertIs(client1.connection_pool, client2.connection_pool)
+        self.assertIsNot(client1.connection_pool, client3.connection_pool)
+        self.assertIsInstance(client1.connection_pool, redis.BlockingConnectionPool)
+        self.assertEqual(client1.connection_pool.max_connections, 4)
+        
+        # The pool is only disconnected once its last client is gone
+        pool = client1.connection_pool
+        with patch.object(pool, 'disconnect') as disconnect:
+            del client1
+            gc.collect()
+            disconnect.assert_not_called()
+            del client2
+            gc.collect()
+            disconnect.assert_called_once()
+        self.assertNotIn(pool, redis_client._POOL_REGISTRY.values())
+        
+        # Closing releases the pool right away, and only once
+        pool = client3.connection_pool
+        with patch.object(pool, 'disconnect') as disconnect:
+            client3.close()
+            client3.close()
+            disconnect.assert_called_once()
+    
+    def test_unix_socket(self) -> None:
+        """Test connecting to a local server through its Unix socket."""
+        client = RedisClient(unix_socket_path="/tmp/redis.sock")
+        pool = client.connection_pool
+        self.assertIs(pool.connection_class, redis.UnixDomainSocketConnection)
+        self.assertEqual(pool.connection_kwargs['path'], "/tmp/redis.sock")
+        self.assertNotIn('host', pool.connection_kwargs)
+        self.assertIsNot(pool, self.client.connection_pool)
+        self.assertEqual(client.get_connection_info()['unix_socket_path'], "/tmp/redis.sock")
+        self.assertNotIn('socket_keepalive', pool.connection_kwargs)
+
+    def test_enqueue_write(self) -> None:
+        """Test that queued writes are sent in pipelines by the flusher thread."""
+        client = RedisClient(write_batch_size=2, write_flush_interval=10.0)
+        pipe = self.mock_client.pipeline.return_value
+        pipe.execute.return_value = [True, True]
+        client.enqueue_write('set', "key1", "value1")
+        client.enqueue_write('incr', "counter", amount=2)
+        client.enqueue_write('set', "key2", "value2")
+        client.flush_writes()
+        self.assertEqual(pipe.execute.call_count, 2)
+        pipe.execute.assert_called_with(raise_on_error=False)
+        pipe.incr.assert_called_once_with("counter", amount=2)
+        self.assertEqual(pipe.set.call_count, 2)
+        client.close()
+
+    def test_encoded_values(self) -> None:
+        """Test storing and reading values encoded with encode_value()."""
+        record = {'device': 1234, 'objects': ["analog-input", "binary-input"], 'rate': 2.5}
+        encoded = encode_value(record)
+        self.assertIn(encoded[:1], (b"\x01", b"\x02"))
+        self.assertEqual(decode_value(encoded), record)
+        # Raw data and missing keys are returned as is
+        self.assertEqual(decode_value(b"plain"), b"plain")
+        self.assertIsNone(decode_value(None))
+        
+        self.client.set_value("record", record, ex=60)
+        self.mock_client.set.assert_called_once_with("record", encoded, ex=60)
+        self.mock_client.get.return_value = encoded
+        self.assertEqual(self.client.get_value("record"), record)
+        self.mock_client.lrange.return_value = [encoded, b"plain"]
+        self.assertEqual(self.client.lrange_values("list", 0, -1), [record, b"plain"])
+
+    def test_keepalive_and_client_name(self) -> None:
+        """Test that TCP connections use keepalive and are named."""
+        kwargs = self.client.connection_pool.connection_kwargs
+        self.assertTrue(kwargs['socket_keepalive'])
+        self.assertEqual(kwargs['socket_keepalive_options'], DEFAULT_KEEPALIVE_OPTIONS)
+        self.assertEqual(kwargs['client_name'], 'bacmon')
+
+        client = RedisClient(client_name='bacmon-test', socket_keepalive=False)
+        self.assertIsNot(client.connection_pool, self.client.connection_pool)
+        self.assertFalse(client.connection_pool.connection_kwargs['socket_keepalive'])
+        self.assertEqual(client.get_connection_info()['client_name'], 'bacmon-test')
+
     def test_ping(self) -> None:
         """Test ping operation."""
         result: bool = self.client.ping()
@@ -250,6 +339,12 @@ class TestRedisClientWithMocks(unittest.TestCase):
         self.assertEqual(self.mock_client.ping.call_count, 2)
         self.assertTrue(result)
     
+    def test_verify_on_connect(self) -> None:
+        """Test that the initial ping can be skipped."""
+        self.mock_client.ping.reset_mock()
+        RedisClient(verify_on_connect=False)
+        self.mock_client.ping.assert_not_called()
+    
     def test_get(self) -> None:
         """Test get operation."""
         self.mock_client.get.return_value = b"test-value"
@@ -264,6 +359,104 @@ class TestRedisClientWithMocks(unittest.TestCase):
         self.mock_client.set.assert_called_once()
         self.assertTrue(result)
     
+    def test_hgetall_str(self) -> None:
+        """Test reading hashes through the decoding client."""
+        decoded_client = MagicMock()
+        decoded_client.hgetall.return_value = {"field": "value"}
+        self.redis_mock.return_value = decoded_client
+        
+        self.assertEqual(self.client.hgetall_str("test-hash"), {"field": "value"})
+        self.assertIs(self.client.decoded, decoded_client)
+        self.assertTrue(self.redis_mock.call_args[1]['connection_pool'].connection_kwargs['decode_responses'])
+        self.assertIsNot(self.client.decoded, self.client._client)
+    
+    def test_lazy_clients_created_once(self) -> None:
+        """Test that threads asking for a lazily created client share one."""
+        from concurrent.futures import ThreadPoolExecutor
+        
+        def create_client(**kwargs: Any) -> MagicMock:
+            # Widen the window between the check and the assignment
+            time.sleep(0.01)
+            return MagicMock()
+        
+        self.redis_mock.side_effect = create_client
+        getters = {
+            'decoded': lambda: self.client.decoded,
+            'single attempt': self.client._get_single_attempt_client,
+            'raw': RedisClient(decode_responses=True)._get_raw_client
+        }
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for name, getter in getters.items():
+                clients = list(executor.map(lambda _: getter(), range(8)))
+                self.assertTrue(all(client is clients[0] for client in clients), name)
+    
+    def test_hmset(self) -> None:
+        """Test that hmset is sent as HSET with a mapping."""
+        self.assertTrue(self.client.hmset("test-hash", {"field": "value"}))
+        self.mock_client.hset.assert_called_once_with("test-hash", mapping={"field": "value"})
+        self.mock_client.hmset.assert_not_called()
+    
+    def test_mget(self) -> None:
+        """Test mget and mset operations."""
+        self.mock_client.mget.return_value = [b"value1", None]
+        result: List[Optional[bytes]] = self.client.mget(["key1", "key2"])
+        self.mock_client.mget.assert_called_once_with(["key1", "key2"])
+        self.assertEqual(result, [b"value1", None])
+        
+        self.mock_client.mset.return_value = True
+        self.assertTrue(self.client.mset({"key1": "value1"}))
+        self.mock_client.mset.assert_called_once_with({"key1": "value1"})
+    
+    def test_mget_many(self) -> None:
+        """Test that mget_many splits keys into pipelined chunks in order."""
+        pipe = self.mock_client.pipeline.return_value
+        pipe.execute.return_value = [[b"0", b"1"], [b"2", None], [b"4"]]
+        result: List[Optional[bytes]] = self.client.mget_many([f"key{i}" for i in range(5)], chunk=2)
+        self.assertEqual(pipe.mget.call_count, 3)
+        pipe.mget.assert_called_with(["key4"])
+        self.assertEqual(result, [b"0", b"1", b"2", None, b"4"])
+        self.assertEqual(self.client.mget_many([]), [])
+    
+    def test_pipeline_batch(self) -> None:
+        """Test that pipeline batches are executed on exit only without errors."""
+        pipe = self.mock_client.pipeline.return_value
+        with self.client.pipeline_batch() as batch:
+            batch.set("key1", "value1")
+            batch.set("key2", "value2")
+        self.mock_client.pipeline.assert_called_once_with(transaction=False)
+        self.assertEqual(pipe.set.call_count, 2)
+        pipe.execute.assert_called_once()
+        
+        pipe.execute.reset_mock()
+        with self.assertRaises(ValueError):
+            with self.client.pipeline_batch() as batch:
+                raise ValueError("Test error")
+        pipe.execute.assert_not_called()
+        self.assertEqual(pipe.reset.call_count, 2)
+    
+    def test_iter_keys(self) -> None:
+        """Test iterating over keys across SCAN batches."""
+        self.mock_client.scan.side_effect = [(5, [b"key1", b"key2"]), (0, [b"key3"])]
+        keys = self.client.iter_keys("key*", count=2)
+        self.assertEqual(next(keys), "key1")
+        self.assertEqual(self.mock_client.scan.call_count, 1)
+        self.assertEqual(list(keys), ["key2", "key3"])
+        self.mock_client.scan.assert_called_with(5, match="key*", count=2)
+        
+        self.mock_client.scan.side_effect = [(0, [b"key1"])]
+        self.assertEqual(list(self.client.iter_keys_bytes()), [b"key1"])
+        
+        self.mock_client.scan.side_effect = redis.ConnectionError("Test error")
+        self.assertEqual(self.client.scan_keys(), [])
+
+    def test_iter_keys_adaptive_count(self) -> None:
+        """Test that the SCAN count grows while few keys match."""
+        self.mock_client.scan.side_effect = [(1, []), (2, [b"key1"]), (3, []), (0, [b"key2"])]
+        keys = list(self.client.iter_keys_bytes("key*", count=1000, max_count=3000))
+        self.assertEqual(keys, [b"key1", b"key2"])
+        counts = [call[1]['count'] for call in self.mock_client.scan.call_args_list]
+        self.assertEqual(counts, [1000, 2000, 3000, 3000])
+
     def test_delete(self) -> None:
         """Test delete operation."""
         self.mock_client.delete.return_value = 1
@@ -271,6 +464,16 @@ class TestRedisClientWithMocks(unittest.TestCase):
         self.mock_client.delete.assert_called_once_with("test-key")
         self.assertEqual(result, 1)
     
+    def test_delete_chunked(self) -> None:
+        """Test that long key lists are deleted in pipelined chunks."""
+        pipe = self.mock_client.pipeline.return_value
+        pipe.execute.return_value = [2, 2, 1]
+        result: int = self.client.delete(*[f"key{i}" for i in range(5)], chunk=2)
+        self.assertEqual(result, 5)
+        self.assertEqual(pipe.delete.call_count, 3)
+        pipe.delete.assert_called_with("key4")
+        self.mock_client.delete.assert_not_called()
+    
     def test_sadd(self) -> None:
         """Test sadd operation."""
         self.mock_client.sadd.return_value = 3
@@ -314,30 +517,76 @@ class TestRedisClientWithMocks(unittest.TestCase):
         self.assertEqual(result, 3)
     
     def test_retry_mechanism(self) -> None:
-        """Test that retry mechanism works."""
-        # Make the mock raise ConnectionError on first call, then succeed
-        self.mock_client.get.side_effect = [redis.ConnectionError("Test error"), b"test-value"]
+        """Test that connections retry with jittered backoff."""
+        retry = self.client.connection_pool.connection_kwargs['retry']
+        self.assertEqual(retry.get_retries(), self.client.max_retries)
+        self.assertIn(redis.ConnectionError, retry._supported_errors)
+        self.assertIn(redis.TimeoutError, retry._supported_errors)
         
-        # Should retry and succeed
-        result: Optional[bytes] = self.client.get("test-key")
-        self.assertEqual(self.mock_client.get.call_count, 2)
-        self.assertEqual(result, b"test-value")
+        # Equal jitter keeps half of the exponential delay and randomizes the rest
+        delays = {retry._backoff.compute(3) for _ in range(20)}
+        self.assertTrue(all(0.4 <= delay <= 0.8 for delay in delays))
+        self.assertGreater(len(delays), 1)
+        
+        # Delays stop doubling at the configured cap
+        client = RedisClient(backoff_base=1.0, backoff_cap=2.0)
+        backoff = client.connection_pool.connection_kwargs['retry']._backoff
+        self.assertTrue(1.0 <= backoff.compute(10) <= 2.0)
+        
+        # Errors that remain after the connection layer retries are raised
+        self.mock_client.get.side_effect = redis.ConnectionError("Test error")
+        with self.assertRaises(redis.ConnectionError):
+            self.client.get("test-key")
+        self.assertEqual(self.mock_client.get.call_count, 1)
+    
+    def test_command_forwarding(self) -> None:
+        """Test that commands are forwarded and cached on the instance."""
+        self.mock_client.hset.return_value = 1
+        self.assertEqual(self.client.hset("test-hash", "field", "value"), 1)
+        self.assertIs(self.client.__dict__['hset'], self.mock_client.hset)
+        self.assertIn('hset', dir(self.client))
+        with self.assertRaises(AttributeError):
+            self.client._missing
+    
+    def test_non_idempotent_commands(self) -> None:
+        """Test that non-idempotent commands are sent without retries."""
+        self.mock_client.incr.return_value = 1
+        self.assertEqual(self.client.incr("test-counter"), 1)
+        pool = self.redis_mock.call_args[1]['connection_pool']
+        self.assertIsNot(pool, self.client.connection_pool)
+        self.assertEqual(pool.connection_kwargs['retry'].get_retries(), 0)
+        
+        # Idempotent commands keep the retrying connections
+        self.client.get("test-key")
+        self.assertEqual(self.redis_mock.call_count, 2)
+    
+    def test_authentication_errors_not_retried(self) -> None:
+        """Test that authentication errors are raised without retrying."""
+        retry = self.client.connection_pool.connection_kwargs['retry']
+        do = MagicMock(side_effect=redis.AuthenticationError("Test error"))
+        fail = MagicMock()
+        with self.assertRaises(redis.AuthenticationError):
+            retry.call_with_retry(do, fail)
+        do.assert_called_once()
+        fail.assert_called_once()
+        
+        do = MagicMock(side_effect=[redis.ConnectionError("Test error"), b"test-value"])
+        with patch('redis.retry.sleep'):
+            self.assertEqual(retry.call_with_retry(do, fail), b"test-value")
     
     def test_set_startup_time(self) -> None:
         """Test set_startup_time method."""
         self.mock_client.set.return_value = True
         with patch('redis_client.time.time', return_value=12345):
             result: bool = self.client.set_startup_time()
-            # Include all expected parameters
-            self.mock_client.set.assert_called_once_with('startup_time', 12345, ex=None, px=None, nx=False, xx=False)
+            self.mock_client.set.assert_called_once_with('startup_time', 12345)
             self.assertTrue(result)
     
     def test_set_daemon_version(self) -> None:
         """Test set_daemon_version method."""
         self.mock_client.set.return_value = True
         result: bool = self.client.set_daemon_version("1.0.0")
-        # Include all expected parameters
-        self.mock_client.set.assert_called_once_with('daemon_version', "1.0.0", ex=None, px=None, nx=False, xx=False)
+        self.mock_client.set.assert_called_once_with('daemon_version', "1.0.0")
         self.assertTrue(result)
 
 def run_mock_tests() -> bool:
@@ -13,6 +13,7 @@ import sys
 import time
 import json
 import logging
+import zlib
 from typing import Dict, Any, List
 import unittest
 from unittest.mock import patch, MagicMock
@@ -89,8 +90,21 @@ def test_data_compression():
         
         # Test compression stats
         stats = compressor.stats
+        assert stats['bytes_in'] == len(small_data) + len(large_data)
+        assert stats['bytes_out'] == len(compressed_small) + len(compressed_large)
+        assert compressor.compression_ratio == 1 - stats['bytes_out'] / stats['bytes_in']
+        assert compressor.compress_small(b"[1000, 5]") == compressor.compress_data(b"[1000, 5]")
         logger.info(f"✓ Compression stats: {stats}")
         
+        # Keys whose points do not compress are stored uncompressed for a while
+        from redis_optimizer import TimeSeriesOptimizer, ADAPTIVE_COMPRESSION_SAMPLES
+        mock_redis = MagicMock()
+        optimizer = TimeSeriesOptimizer(mock_redis, compressor)
+        for i in range(ADAPTIVE_COMPRESSION_SAMPLES + 1):
+            optimizer.store_time_series_point("test:s", 1000 + i, i)
+        assert mock_redis.lpush.call_args_list[0][0][1].startswith(b'RAW:')
+        assert not mock_redis.lpush.call_args[0][1].startswith(b'RAW:')
+        
         return True
         
     except Exception as e:
@@ -98,6 +112,236 @@ def test_data_compression():
         return False
 
 
+def test_compression_dictionary():
+    """Test zstd compression with a dictionary shared through Redis."""
+    logger.info("Testing compression dictionary...")
+    
+    try:
+        from redis_optimizer import (
+            DataCompressor, RedisStorageOptimizer, CompressionDictionaryError, ZSTD_AVAILABLE
+        )
+        
+        if not ZSTD_AVAILABLE:
+            logger.info("✓ zstandard not installed, zlib compression is used")
+            return True
+        
+        samples = [json.dumps([1700000000 + i, i % 97 * 1.5]).encode() for i in range(1000)]
+        
+        # Train a dictionary and store it under the shared key and its id
+        store = {}
+        mock_redis = MagicMock()
+        mock_redis.get.side_effect = store.get
+        mock_redis.mset.side_effect = store.update
+        optimizer = RedisStorageOptimizer(mock_redis, {'min_compression_size': 20})
+        late_reader = RedisStorageOptimizer(mock_redis)
+        assert optimizer.train_compression_dictionary(samples)
+        dict_data = optimizer.compressor.dictionary_bytes
+        assert store[optimizer.dictionary_key] == dict_data
+        
+        point = json.dumps([1700001234, 42.5] * 4)
+        compressed = optimizer.compressor.compress_data(point)
+        assert compressed.startswith(b'ZSTD:')
+        
+        # A reader in another process loads the dictionary from Redis
+        reader_redis = MagicMock()
+        reader_redis.get.return_value = dict_data
+        reader = RedisStorageOptimizer(reader_redis)
+        assert reader.compressor.decompress_data(compressed) == point
+        
+        # Data compressed before retraining stays readable, also by a reader
+        # that started before any dictionary was stored
+        other_samples = [json.dumps({'ts': 1700000000 + i, 'device': i % 13}).encode() for i in range(1000)]
+        assert optimizer.train_compression_dictionary(other_samples)
+        assert optimizer.compressor.dictionary_bytes != dict_data
+        recompressed = optimizer.compressor.compress_data(point)
+        for compressor in (optimizer.compressor, late_reader.compressor, RedisStorageOptimizer(mock_redis).compressor):
+            assert compressor.decompress_data(compressed) == point
+            assert compressor.decompress_data(recompressed) == point
+        
+        # Data whose dictionary cannot be loaded is an error, not a bad point
+        try:
+            DataCompressor().decompress_data(compressed)
+            assert False, "missing dictionary not reported"
+        except CompressionDictionaryError:
+            pass
+        
+        # Data stored before switching to zstd stays readable
+        legacy = DataCompressor(min_size_threshold=20)
+        assert legacy.decompress_data(b'ZLIB:' + zlib.compress(point.encode())) == point
+        
+        logger.info("✓ Compression dictionary test passed")
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ Compression dictionary test failed: {e}")
+        return False
+
+
+def test_concurrent_compression():
+    """Test one compressor shared by the threads of a global cleanup."""
+    logger.info("Testing concurrent compression...")
+    
+    try:
+        from concurrent.futures import ThreadPoolExecutor
+        from redis_optimizer import DataCompressor
+        
+        compressor = DataCompressor(min_size_threshold=20)
+        payloads = [
+            json.dumps([[1700000000 + i * 60 + j, (i * j) % 101 * 0.5] for j in range(50 + i)]).encode()
+            for i in range(64)
+        ]
+        
+        def round_trip(payload):
+            for _ in range(20):
+                if compressor.decompress_bytes(compressor.compress_data(payload)) != payload:
+                    return False
+            return True
+        
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            assert all(executor.map(round_trip, payloads))
+        
+        # Statistics are counted by all threads without losing updates
+        assert compressor.stats['bytes_in'] == 20 * sum(len(payload) for payload in payloads)
+        assert compressor.stats['decompressed'] == compressor.stats['compressed'] == 20 * len(payloads)
+        
+        logger.info("✓ Concurrent compression test passed")
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ Concurrent compression test failed: {e}")
+        return False
+
+
+def test_time_series_blocks():
+    """Test storing time-series points in compressed blocks."""
+    logger.info("Testing time-series blocks...")
+    
+    try:
+        import numpy as np
+        from redis_optimizer import TimeSeriesOptimizer, DataCompressor, BLOCK_MARKER
+        
+        mock_redis = MagicMock()
+        pipeline = mock_redis._client.pipeline.return_value
+        optimizer = TimeSeriesOptimizer(mock_redis, DataCompressor(min_size_threshold=50), block_size=4)
+        
+        # Points are buffered until a block is full, then pushed at once
+        for i in range(4):
+            assert optimizer.store_time_series_point("test:s", 1000 + i, i * 10, max_points=10)
+        pipeline.lpush.assert_called_once()
+        pipeline.ltrim.assert_called_once_with("test:s", 0, 2)
+        block = pipeline.lpush.call_args[0][1]
+        assert block.startswith(BLOCK_MARKER)
+        
+        # Buffered points come first, newest first like single points
+        optimizer.store_time_series_point("test:s", 1004, 40.5)
+        mock_redis.lrange.return_value = [block, b'RAW:[999, 5]']
+        points = optimizer.get_time_series_range("test:s")
+        assert points == [(1004, 40.5), (1003, 30), (1002, 20), (1001, 10), (1000, 0), (999, 5)]
+        assert optimizer.get_time_series_range("test:s", start_time=1002, end_time=1003) == [(1003, 30), (1002, 20)]
+        
+        # Mixed values are stored as JSON blocks
+        optimizer.replace_time_series("test:s", [(1001, "b"), (1000, 1.5)])
+        entry = pipeline.rpush.call_args[0][1]
+        mock_redis.lrange.return_value = [entry]
+        assert optimizer.get_time_series_range("test:s") == [(1001, "b"), (1000, 1.5)]
+        
+        # Integer values are quantized, explicit types round them after
+        # scaling, timestamps and optionally values are delta encoded
+        quantized = optimizer._quantize_block([(1000, 1), (1001, 70000)], None, 1)
+        assert quantized[:1] == b'z' and len(quantized) == 1 + 9 + 3 + 2 + 1 + 3
+        assert optimizer._quantize_block([(1000, 1.5)], None, 1) is None
+        assert optimizer._quantize_block([(1000, 1.5)], 'int16', 1) is not None
+        assert optimizer._quantize_block([(1000, 70000)], 'int16', 1) is None
+        numbers = np.array([0, 1, -1, 63, -64, 64, 2 ** 40, -2 ** 63, 2 ** 63 - 1], dtype=np.int64)
+        assert optimizer._decode_varints(optimizer._encode_varints(numbers)).tolist() == numbers.tolist()
+        counter = [(1000 + i, 5000 + i) for i in range(4)]
+        delta_block = optimizer._encode_block(counter, False, None, 1, True)
+        assert len(delta_block) < len(optimizer._encode_block(counter, False))
+        assert optimizer._decode_block(delta_block).to_points() == counter
+        
+        optimizer.value_format_for = lambda key: ('int16', 10, False)
+        optimizer.replace_time_series("test:s", [(1000.5, 2.25), (1000, 1)], use_compression=False)
+        entry = pipeline.rpush.call_args[0][1]
+        assert entry[len(BLOCK_MARKER) + 4:][:1] == b'z'
+        mock_redis.lrange.return_value = [entry]
+        assert optimizer.get_time_series_range("test:s") == [(1000.5, 2.2), (1000.0, 1.0)]
+        
+        logger.info("✓ Time-series block test passed")
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ Time-series block test failed: {e}")
+        return False
+
+
+def test_time_series_streams():
+    """Test storing time-series points in Redis streams."""
+    logger.info("Testing time-series streams...")
+    
+    try:
+        from redis_optimizer import TimeSeriesOptimizer, DataCompressor
+        
+        mock_redis = MagicMock()
+        optimizer = TimeSeriesOptimizer(mock_redis, DataCompressor(), storage="stream")
+        
+        # Points are added with their timestamp as entry ID
+        assert optimizer.store_time_series_point("test:s", 1000, 5, max_points=100)
+        mock_redis.xadd.assert_called_once_with(
+            "test:s", {"p": optimizer._encode_point(1000, 5, True)}, id="1000000-*", maxlen=100, approximate=True
+        )
+        
+        # Time ranges are selected by the server
+        mock_redis.xrevrange.return_value = [
+            (b"1002000-0", {b"p": b'RAW:[1002, 7]'}),
+            (b"1001000-0", {b"p": b'[1001, 6]'})
+        ]
+        points = optimizer.get_time_series_range("test:s", start_time=1001, end_time=1002.5)
+        mock_redis.xrevrange.assert_called_once_with("test:s", max=1002500, min=1001000, count=None)
+        assert points == [(1002, 7), (1001, 6)]
+        
+        # Retention rewrites the stream in time order, then swaps it in
+        pipeline = mock_redis._client.pipeline.return_value
+        optimizer.replace_time_series("test:s", [(1002, 7), (960, 5.5)], use_compression=False)
+        ids = [call[1]['id'] for call in pipeline.xadd.call_args_list]
+        assert ids == ["960000-*", "1002000-*"]
+        pipeline.rename.assert_called_once_with("test:s:replacing", "test:s")
+        
+        logger.info("✓ Time-series stream test passed")
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ Time-series stream test failed: {e}")
+        return False
+
+
+def test_time_series_write_behind():
+    """Test queuing time-series writes on the client."""
+    logger.info("Testing time-series write-behind...")
+    
+    try:
+        from redis_optimizer import TimeSeriesOptimizer, DataCompressor
+        
+        mock_redis = MagicMock()
+        optimizer = TimeSeriesOptimizer(mock_redis, DataCompressor(), write_behind=True)
+        
+        assert optimizer.store_time_series_point("test:s", 1000, 5, max_points=100)
+        methods = [call[0][0] for call in mock_redis.enqueue_write.call_args_list]
+        assert methods == ['lpush', 'ltrim']
+        mock_redis._client.pipeline.assert_not_called()
+        
+        # Reads see the queued writes
+        mock_redis.lrange.return_value = []
+        optimizer.get_time_series_range("test:s")
+        mock_redis.flush_writes.assert_called_once()
+        
+        logger.info("✓ Time-series write-behind test passed")
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ Time-series write-behind test failed: {e}")
+        return False
+
+
 def test_retention_policies():
     """Test retention policy functionality."""
     logger.info("Testing retention policies...")
@@ -126,8 +370,34 @@ def test_retention_policies():
         applicable_policies = retention_manager.get_applicable_policies("test:data")
         assert len(applicable_policies) == 1
         assert applicable_policies[0].name == "test_policy"
+        assert retention_manager.get_applicable_policies("other:data") == []
+        
+        # Remembered policies are updated when policies are added
+        retention_manager.add_retention_policy("test:data", RetentionPolicy("exact_policy", 60, 1))
+        applicable_policies = retention_manager.get_applicable_policies("test:data")
+        assert [p.name for p in applicable_policies] == ["exact_policy", "test_policy"]
+        
+        # Policies of a pattern are kept by duration, in insertion order for equal ones
+        for name, duration in [("long", 7200), ("short", 60), ("same", 3600)]:
+            retention_manager.add_retention_policy("test:*", RetentionPolicy(name, duration, 60))
+        assert [p.name for p in retention_manager.policies["test:*"]] == ["short", "test_policy", "same", "long"]
         logger.info("✓ Policy matching test passed")
         
+        # Policies are applied on the server by a script, locally when the
+        # script cannot decode the entries
+        script = mock_redis._client.register_script.return_value
+        script.return_value = [10, 2, 6, 6]
+        stats = retention_manager.apply_retention_policies("test:data", force=True)
+        assert stats['data_points_removed'] == 6 and stats['data_points_aggregated'] == 2
+        assert script.call_args[1]['keys'] == ["test:data"]
+        mock_redis.lrange.assert_not_called()
+        
+        script.return_value = None
+        mock_redis.lrange.return_value = [b'RAW:[1000, 10]']
+        stats = retention_manager.apply_retention_policies("test:data", force=True)
+        assert stats['data_points_processed'] == 1
+        mock_redis.lrange.assert_called_once()
+        
         return True
         
     except Exception as e:
@@ -164,6 +434,16 @@ def test_time_series_optimization():
         )
         
         assert len(aggregated) == 2  # Should aggregate into 2 time windows
+        assert aggregated == [(960, 15.0), (1020, 35.0)]
+        assert optimizer.aggregate_time_series("test:key", test_points, "count", 60) == [(960, 2), (1020, 2)]
+        assert optimizer.aggregate_time_series("test:key", test_points, "last", 60) == [(960, 20.0), (1020, 40.0)]
+        
+        # Repeated aggregations of unchanged points are served from the cache
+        with patch.object(optimizer, '_aggregate_windows') as aggregate_windows:
+            assert optimizer.aggregate_time_series("test:key", test_points, "avg", 60) == aggregated
+            aggregate_windows.assert_not_called()
+            optimizer.aggregate_time_series("test:key", test_points + [(1120, 50)], "avg", 60)
+            aggregate_windows.assert_called_once()
         logger.info(f"✓ Aggregation test passed: {aggregated}")
         
         return True
@@ -173,6 +453,81 @@ def test_time_series_optimization():
         return False
 
 
+def test_binary_ladder_retention():
+    """Test aggregating into windows doubling in size with age."""
+    logger.info("Testing binary ladder retention...")
+    
+    try:
+        from redis_optimizer import RetentionPolicy, RetentionManager, TimeSeriesOptimizer
+        
+        optimizer = TimeSeriesOptimizer(MagicMock())
+        cutoff = 1700000000
+        points = [(cutoff - i, 1) for i in range(1, 86401)]  # One day of seconds
+        
+        aggregated = optimizer.aggregate_time_series_ladder("test:s", points, "sum", 60, cutoff)
+        assert len(aggregated) < 32
+        assert sum(value for _, value in aggregated) == len(points)
+        
+        # Aggregating again later merges windows without losing counts
+        again = optimizer.aggregate_time_series_ladder("test:s", aggregated, "sum", 60, cutoff + 3600)
+        assert len(again) <= len(aggregated)
+        assert sum(value for _, value in again) == len(points)
+        
+        # Averages cannot be aggregated again
+        retention_manager = RetentionManager(MagicMock(), optimizer)
+        try:
+            retention_manager.add_retention_policy(
+                "test:*", RetentionPolicy("ladder", 3600, 60, "avg", policy_type="binary_ladder")
+            )
+            return False
+        except ValueError:
+            pass
+        
+        logger.info(f"✓ Binary ladder test passed: {len(points)} points in {len(aggregated)} windows")
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ Binary ladder test failed: {e}")
+        return False
+
+
+def test_time_series_batch():
+    """Test holding time-series points as timestamp and value arrays."""
+    logger.info("Testing time-series batches...")
+    
+    try:
+        import numpy as np
+        from redis_optimizer import TimeSeriesBatch
+        
+        batch = TimeSeriesBatch.from_points([(1003, 30), (1002, 20), (1001, 10)])
+        assert batch.ts.dtype == np.int64 and batch.val.dtype == np.int64
+        assert len(batch) == 3
+        assert batch.between(1002, 1003).to_points() == [(1003, 30), (1002, 20)]
+        assert batch.between(end_time=1001).to_points() == [(1001, 10)]
+        
+        # Non-numeric values are kept as they are
+        mixed = TimeSeriesBatch.from_points([(1000.5, "a"), (1000, [1, 2])])
+        assert mixed.val.dtype == object
+        assert mixed.to_points() == [(1000.5, "a"), (1000.0, [1, 2])]
+        assert TimeSeriesBatch.concatenate([batch, mixed]).to_points()[-1] == (1000.0, [1, 2])
+        assert len(TimeSeriesBatch.concatenate([])) == 0
+        
+        # Cached aggregates are handed out as copies
+        from redis_optimizer import TimeSeriesOptimizer
+        optimizer = TimeSeriesOptimizer(MagicMock())
+        source = TimeSeriesBatch.from_points([(1000 + i, i) for i in range(120)])
+        first = optimizer.aggregate_batch("test:s", source, "sum", 60)
+        first.val[:] = -1
+        assert optimizer.aggregate_batch("test:s", source, "sum", 60).to_points() == [(960, 190), (1020, 2970), (1080, 3980)]
+        
+        logger.info("✓ Time-series batch test passed")
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ Time-series batch test failed: {e}")
+        return False
+
+
 def test_optimized_count_interval():
     """Test OptimizedCountInterval functionality."""
     logger.info("Testing OptimizedCountInterval...")
@@ -336,6 +691,16 @@ def test_memory_usage_estimation():
         assert 'monitored_keys' in stats
         assert 'retention_policies' in stats
         
+        # Global cleanups optimize every monitored key, failures are reported
+        optimizer.monitored_keys.update(["a:s", "b:s", "c:s"])
+        with patch.object(optimizer, 'optimize_key', side_effect=lambda key, force: (
+            {'retention_stats': {'data_points_removed': 1}} if key != "c:s" else {'error': 'failed'}
+        )):
+            cleanup = optimizer.run_global_cleanup(force=True)
+        assert cleanup['keys_processed'] == 3
+        assert cleanup['total_retention_stats']['data_points_removed'] == 2
+        assert cleanup['errors'] == [{'key': "c:s", 'error': 'failed'}]
+        
         logger.info(f"✓ Storage statistics test passed: {len(stats)} categories")
         return True
         
@@ -400,8 +765,15 @@ def main():
     tests = [
         ("Module Imports", test_imports),
         ("Data Compression", test_data_compression),
+        ("Compression Dictionary", test_compression_dictionary),
+        ("Concurrent Compression", test_concurrent_compression),
         ("Retention Policies", test_retention_policies),
         ("Time-Series Optimization", test_time_series_optimization),
+        ("Time-Series Blocks", test_time_series_blocks),
+        ("Time-Series Streams", test_time_series_streams),
+        ("Time-Series Write-Behind", test_time_series_write_behind),
+        ("Binary Ladder Retention", test_binary_ladder_retention),
+        ("Time-Series Batch", test_time_series_batch),
         ("Optimized Count Interval", test_optimized_count_interval),
         ("Storage Factory", test_storage_factory),
         ("Configuration Validation", test_configuration_validation),